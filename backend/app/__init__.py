@@ -92,7 +92,7 @@ from config import config
 import os
 
 # Import extensions from extensions module
-from app.extensions import db, migrate, jwt, ma
+from app.extensions import db, migrate, jwt, ma, cache, passwords, limiter
 from werkzeug.utils import secure_filename
 from flask_cors import CORS
 from flask import Flask, send_from_directory
@@ -188,7 +188,7 @@ def create_app(config_name=None):
     CORS(app, 
          origins=app.config['CORS_ORIGINS'],
          supports_credentials=True,
-         allow_headers=['Content-Type', 'Authorization'],
+         allow_headers=['Content-Type', 'Authorization', 'Idempotency-Key'],
          methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"])
     
     # Initialize extensions with app
@@ -196,6 +196,9 @@ def create_app(config_name=None):
     migrate.init_app(app, db)
     jwt.init_app(app)
     ma.init_app(app)
+    cache.init_app(app)
+    passwords.init_app(app)
+    limiter.init_app(app)
     
     # Create upload directory
     upload_dir = os.path.join(app.instance_path, app.config['UPLOAD_FOLDER'])
@@ -221,16 +224,16 @@ def create_app(config_name=None):
     def health_check():
         return {'status': 'healthy', 'message': 'Marché API is running'}
     
-    # Auto-create tables if they don't exist
-    with app.app_context():
-        # Import models here to avoid circular imports
-        from app.models.user import User
-        from app.models.vendor import Vendor
-        from app.models.product import Product
-        from app.models.order import Order
-        from app.models.category import Category
-        
-        db.create_all()
+    # No db.create_all() here: the schema belongs to the migrations (flask
+    # db upgrade), and tables created at startup would make their CREATEs fail
+    
+    # Release expired cart holds in the background
+    from app.services import hold_service
+    hold_service.init_app(app)
+    
+    # Resync the dashboard counters with the tables now and then
+    from app.services import stats_service
+    stats_service.init_app(app)
 
     # ✅ Add file serving for BOTH URL patterns
     @app.route('/uploads/products/<path:filename>')
@@ -2,9 +2,15 @@ from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
 from flask_jwt_extended import JWTManager
 from flask_marshmallow import Marshmallow
+from app.services.cache_service import ResponseCache
+from app.services.password_service import PasswordHasher
+from app.services.rate_limit_service import RateLimiter
 
 # Create single instances of extensions
 db = SQLAlchemy()
 migrate = Migrate()
 jwt = JWTManager()
-ma = Marshmallow()
\ No newline at end of file
+ma = Marshmallow()
+cache = ResponseCache()
+passwords = PasswordHasher()
+limiter = RateLimiter()
\ No newline at end of file
@@ -2,8 +2,10 @@ from .user import User
 from .vendor import Vendor
 from .product import Product
 from .category import Category
-from .order import Order, OrderItem
-from .cart import CartItem
+from .order import Order, OrderItem, VendorOrder
+from .cart import CartItem, CartHold
+from .idempotency import IdempotencyKey
+from .stats import DashboardCounter, DailySales
 from app.models.user import User
 from app.models.vendor import Vendor
 from app.models.product import Product
@@ -11,4 +13,4 @@ from app.models.order import Order
 # from app.extensions import db
 
 
-__all__ = ['User', 'Vendor', 'Product', 'Category', 'Order', 'OrderItem', 'CartItem']
\ No newline at end of file
+__all__ = ['User', 'Vendor', 'Product', 'Category', 'Order', 'OrderItem', 'VendorOrder', 'CartItem', 'CartHold', 'IdempotencyKey', 'DashboardCounter', 'DailySales']
\ No newline at end of file
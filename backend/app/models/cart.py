@@ -22,17 +22,52 @@ class CartItem(db.Model):
     def total_price(self):
         return float(self.product.price * self.quantity) if self.product else 0
     
-    def to_dict(self):
+    def to_dict(self, product_data=None, total_price=None):
+        """Convert cart item to dictionary
+
+        Pass ``product_data`` and ``total_price`` (see
+        app.services.cart_service.load_cart) to skip the product lazy load.
+        """
+        if product_data is None and self.product:
+            product_data = self.product.to_dict()
+        if total_price is None:
+            total_price = self.total_price
+
         return {
             'id': self.id,
             'user_id': self.user_id,
             'product_id': self.product_id,
             'quantity': self.quantity,
-            'total_price': self.total_price,
-            'product': self.product.to_dict() if self.product else None,
+            'total_price': float(total_price),
+            'product': product_data,
             'created_at': self.created_at.isoformat(),
             'updated_at': self.updated_at.isoformat()
         }
 
     def __repr__(self):
         return f"<CartItem {self.id}>"
+
+
+
+class CartHold(db.Model):
+    """Units of a product set aside for one user's cart until expires_at.
+
+    Every hold is counted in its product's ``reserved`` column; see
+    app.services.hold_service for how the two are kept in step.
+    """
+    __tablename__ = 'cart_holds'
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    product_id = db.Column(db.Integer, db.ForeignKey('products.id'), nullable=False)
+    quantity = db.Column(db.Integer, nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False)
+
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'product_id', name='unique_user_product_hold'),
+        # The sweeper takes the oldest expired holds first
+        db.Index('ix_cart_holds_expires', 'expires_at'),
+    )
+
+    def __repr__(self):
+        return f"<CartHold {self.user_id}/{self.product_id}>"
@@ -21,15 +21,22 @@ class Category(db.Model):
     def product_count(self):
         return self.products.filter_by(is_active=True).count()
     
-    def to_dict(self):
-        """Convert category to dictionary"""
+    def to_dict(self, product_count=None):
+        """Convert category to dictionary
+
+        ``product_count`` can be supplied by callers that computed it in bulk;
+        otherwise it is counted with a query.
+        """
+        if product_count is None:
+            product_count = self.product_count
+
         return {
             'id': self.id,
             'name': self.name,
             'description': self.description,
             'icon': self.icon,
             'is_active': self.is_active,
-            'product_count': self.product_count,
+            'product_count': product_count,
             # ✅ FIX: Add null checks for datetime fields
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None
@@ -0,0 +1,34 @@
+# idempotency.py
+from datetime import datetime
+from app.extensions import db
+
+
+class IdempotencyKey(db.Model):
+    """Outcome of a request sent with an Idempotency-Key header.
+
+    The row is inserted when the first request starts and filled in with
+    its response when it finishes; see app.services.idempotency_service.
+    """
+    __tablename__ = 'idempotency_keys'
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    key = db.Column(db.String(255), nullable=False)
+    endpoint = db.Column(db.String(100), nullable=False)
+    # Hash of the method, endpoint and body, to reject a reused key
+    request_hash = db.Column(db.String(64), nullable=False)
+    status_code = db.Column(db.Integer)
+    response_body = db.Column(db.Text)
+    # What the request created (an order id), committed with its writes
+    resource_id = db.Column(db.Integer)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    expires_at = db.Column(db.DateTime, nullable=False)
+
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'key', name='unique_user_idempotency_key'),
+        # Expired keys are purged in small batches through this index
+        db.Index('ix_idempotency_keys_expires', 'expires_at'),
+    )
+
+    def __repr__(self):
+        return f'<IdempotencyKey {self.key}>'
@@ -19,6 +19,12 @@ class PaymentMethod(Enum):
     BANK = 'trustBank'
     PAYPAL = 'paypal'
 
+# Each nextval() reserves a block of ORDER_NUMBER_BLOCK_SIZE order numbers
+# for one worker (see app.services.order_number_service)
+ORDER_NUMBER_BLOCK_SIZE = 50
+order_number_seq = db.Sequence('order_number_seq', increment=ORDER_NUMBER_BLOCK_SIZE, metadata=db.metadata)
+
+
 class Order(db.Model):
     __tablename__ = 'orders'
     
@@ -34,12 +40,22 @@ class Order(db.Model):
     total_amount = db.Column(db.Numeric(10, 2), nullable=False)
     shipping_address = db.Column(db.Text)  # JSON string
     notes = db.Column(db.Text)
+    # Id of the quote token the order was placed with; each is good for one order
+    quote_id = db.Column(db.String(32))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Relationships
     # items = db.relationship('OrderItem', backref='order', lazy='dynamic', cascade='all, delete-orphan')
+    __table_args__ = (
+        db.Index('ix_orders_user_created', 'user_id', 'created_at', 'id'),
+        db.Index('ix_orders_status_created', 'status', 'created_at', 'id'),
+        db.Index('ix_orders_created', 'created_at', 'id'),
+        db.UniqueConstraint('quote_id', name='unique_order_quote'),
+    )
+
     items = db.relationship('OrderItem', back_populates='order', lazy='dynamic', cascade='all, delete-orphan')
+    vendor_orders = db.relationship('VendorOrder', back_populates='order', lazy='dynamic', cascade='all, delete-orphan')
     # items = db.relationship('OrderItem', back_populates='order', lazy='dynamic', cascade='all, delete-orphan')
 
     @property
@@ -62,18 +78,36 @@ class Order(db.Model):
         """Get total number of items in order"""
         return sum(item.quantity for item in self.items)
     
+    def set_status(self, status):
+        """Change the order's status, and its vendor sub-orders' with it"""
+        from app.services.stats_service import record_order_status
+        from app.services.analytics_service import record_order_sales
+        
+        if status != self.status:
+            record_order_status(self, self.status, status)
+            record_order_sales(self, self.status, status)
+        self.status = status
+        VendorOrder.query.filter_by(order_id=self.id).update(
+            {'status': status, 'updated_at': datetime.utcnow()}, synchronize_session=False
+        )
+    
     def generate_order_number(self):
-        """Generate unique order number"""
-        import random
-        import string
+        """Assign the next unique order number (MRC + 10 digits)"""
+        from app.services.order_number_service import next_order_number
         
-        prefix = 'MRC'
-        suffix = ''.join(random.choices(string.digits, k=8))
-        self.order_number = f"{prefix}{suffix}"
+        self.order_number = next_order_number()
     
-    def to_dict(self):
-        """Convert order to dictionary"""
-        return {
+    def to_dict(self, items_data=None, item_count=None, summary=False):
+        """Convert order to dictionary
+
+        Callers serializing many orders pass pre-loaded ``items_data`` and
+        ``item_count`` (see app.services.order_serializer) to skip the
+        per-order item queries; ``summary`` leaves the items out.
+        """
+        if item_count is None:
+            item_count = self.item_count
+
+        data = {
             'id': self.id,
             'user_id': self.user_id,
             'order_number': self.order_number,
@@ -86,11 +120,16 @@ class Order(db.Model):
             'total_amount': float(self.total_amount),
             'shipping_address': self.shipping_address_dict,
             'notes': self.notes,
-            'item_count': self.item_count,
-            'items': [item.to_dict() for item in self.items],
+            'item_count': item_count,
             'created_at': self.created_at.isoformat(),
             'updated_at': self.updated_at.isoformat()
         }
+        if not summary:
+            if items_data is None:
+                items_data = [item.to_dict() for item in self.items]
+            data['items'] = items_data
+
+        return data
     
     def __repr__(self):
         return f'<Order {self.order_number}>'
@@ -99,18 +138,39 @@ class OrderItem(db.Model):
     __tablename__ = 'order_items'
     
     id = db.Column(db.Integer, primary_key=True)
-    order_id = db.Column(db.Integer, db.ForeignKey('orders.id'), nullable=False)
-    product_id = db.Column(db.Integer, db.ForeignKey('products.id'), nullable=False)
+    order_id = db.Column(db.Integer, db.ForeignKey('orders.id'), nullable=False, index=True)
+    product_id = db.Column(db.Integer, db.ForeignKey('products.id'), nullable=False, index=True)
     quantity = db.Column(db.Integer, nullable=False)
     unit_price = db.Column(db.Numeric(10, 2), nullable=False)
     total_price = db.Column(db.Numeric(10, 2), nullable=False)
+    # Snapshot of the product at checkout; order reads never touch the
+    # live product, vendor or category rows
+    product_name = db.Column(db.String(200))
+    product_image = db.Column(db.Text)
+    vendor_id = db.Column(db.Integer)
+    vendor_name = db.Column(db.String(255))
+    category_id = db.Column(db.Integer)
+    category_name = db.Column(db.String(50))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     order = db.relationship('Order', back_populates='items')
     product = db.relationship('Product', back_populates='order_items')
 
+    @staticmethod
+    def product_snapshot(product, vendor=None, category=None):
+        """Snapshot columns recording a product as it was sold"""
+        images = product.image_list
+        return {
+            'product_name': product.name,
+            'product_image': images[0] if images else None,
+            'vendor_id': product.vendor_id,
+            'vendor_name': vendor.name if vendor else None,
+            'category_id': product.category_id,
+            'category_name': category.name if category else None
+        }
+
     def to_dict(self):
-        """Convert order item to dictionary"""
+        """Convert order item to dictionary, with the product snapshot"""
         return {
             'id': self.id,
             'order_id': self.order_id,
@@ -118,9 +178,84 @@ class OrderItem(db.Model):
             'quantity': self.quantity,
             'unit_price': float(self.unit_price),
             'total_price': float(self.total_price),
-            'product': self.product.to_dict() if self.product else None,
+            'product': {
+                'id': self.product_id,
+                'name': self.product_name,
+                'image': self.product_image,
+                'images': [self.product_image] if self.product_image else [],
+                'vendor_id': self.vendor_id,
+                'category_id': self.category_id,
+                'vendor': {'id': self.vendor_id, 'name': self.vendor_name},
+                'category': {'id': self.category_id, 'name': self.category_name}
+            },
             'created_at': self.created_at.isoformat()
         }
     
     def __repr__(self):
-        return f'<OrderItem {self.id}>'
\ No newline at end of file
+        return f'<OrderItem {self.id}>'
+
+class VendorOrder(db.Model):
+    """One vendor's share of a checkout.
+
+    Written by create_order next to the order items, one row per vendor
+    in the order, so a vendor's order feed is an index range scan on
+    ``(vendor_id, created_at)`` instead of a search through every order's
+    items. Status follows the parent order (see Order.set_status).
+    """
+    __tablename__ = 'vendor_orders'
+
+    id = db.Column(db.Integer, primary_key=True)
+    order_id = db.Column(db.Integer, db.ForeignKey('orders.id'), nullable=False)
+    vendor_id = db.Column(db.Integer, db.ForeignKey('vendors.id'), nullable=False)
+    status = db.Column(db.Enum(OrderStatus), default=OrderStatus.PENDING, nullable=False)
+    subtotal = db.Column(db.Numeric(10, 2), nullable=False)
+    item_count = db.Column(db.Integer, nullable=False)
+    # Same as the parent order's, so the feed sorts like the order list
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        db.UniqueConstraint('order_id', 'vendor_id', name='unique_order_vendor'),
+        db.Index('ix_vendor_orders_vendor_created', 'vendor_id', 'created_at', 'id'),
+        db.Index('ix_vendor_orders_vendor_status_created', 'vendor_id', 'status', 'created_at', 'id'),
+    )
+
+    order = db.relationship('Order', back_populates='vendor_orders')
+
+    @staticmethod
+    def split(order, items):
+        """Rows for ``insert(VendorOrder)`` from an order's item rows"""
+        shares = {}
+        for item in items:
+            share = shares.setdefault(item['vendor_id'], {'subtotal': 0, 'item_count': 0})
+            share['subtotal'] += item['total_price']
+            share['item_count'] += item['quantity']
+
+        return [
+            {
+                'order_id': order.id,
+                'vendor_id': vendor_id,
+                'status': order.status,
+                'subtotal': share['subtotal'],
+                'item_count': share['item_count'],
+                'created_at': order.created_at,
+                'updated_at': order.created_at
+            }
+            for vendor_id, share in sorted(shares.items())
+        ]
+
+    def to_dict(self):
+        """Convert vendor order to dictionary"""
+        return {
+            'id': self.id,
+            'order_id': self.order_id,
+            'vendor_id': self.vendor_id,
+            'status': self.status.value,
+            'subtotal': float(self.subtotal),
+            'item_count': self.item_count,
+            'created_at': self.created_at.isoformat(),
+            'updated_at': self.updated_at.isoformat()
+        }
+
+    def __repr__(self):
+        return f'<VendorOrder {self.order_id}/{self.vendor_id}>'
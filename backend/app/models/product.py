@@ -123,7 +123,9 @@
 # product.py - FIXED VERSION
 from datetime import datetime
 import json
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from app.extensions import db
+from app.models.vendor import VendorStatus
 
 class Product(db.Model):
     __tablename__ = 'products'
@@ -136,12 +138,43 @@ class Product(db.Model):
     price = db.Column(db.Numeric(10, 2), nullable=False)
     images = db.Column(db.Text)  # JSON string of image URLs
     stock = db.Column(db.Integer, default=0)
+    # Units held by active cart holds (app.services.hold_service); always 0
+    # unless CART_HOLDS_ENABLED, so stock - reserved is what can be sold
+    reserved = db.Column(db.Integer, nullable=False, default=0, server_default='0')
     rating = db.Column(db.Float, default=0.0)
     review_count = db.Column(db.Integer, default=0)
     is_featured = db.Column(db.Boolean, default=False)
     is_active = db.Column(db.Boolean, default=True)
+    # is_active and the vendor is approved, kept in sync by refresh_listable()
+    # and refresh_vendor_listing() so storefront queries need no vendor join
+    is_listable = db.Column(db.Boolean, nullable=False, default=False, server_default=db.false())
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Maintained by Postgres on every insert/update, used by full-text search
+    search_vector = db.Column(TSVECTOR, db.Computed(
+        "setweight(to_tsvector('english', coalesce(name, '')), 'A') || "
+        "setweight(to_tsvector('english', coalesce(description, '')), 'B')",
+        persisted=True
+    ))
+
+    __table_args__ = (
+        db.Index('ix_products_search_vector', 'search_vector', postgresql_using='gin'),
+        # Storefront listings only ever show listable products, so the sort
+        # indexes are partial; id is the keyset pagination tie-breaker
+        db.Index('ix_products_listable_created', 'created_at', 'id', postgresql_where=db.text('is_listable')),
+        db.Index('ix_products_listable_price', 'price', 'id', postgresql_where=db.text('is_listable')),
+        db.Index('ix_products_listable_rating', 'rating', 'id', postgresql_where=db.text('is_listable')),
+        db.Index('ix_products_listable_name', 'name', 'id', postgresql_where=db.text('is_listable')),
+        db.Index('ix_products_listable_category', 'category_id', 'created_at', 'id', postgresql_where=db.text('is_listable')),
+        db.Index('ix_products_listable_featured', 'created_at', 'id', postgresql_where=db.text('is_listable AND is_featured')),
+        # Category product counts cover every active product
+        db.Index('ix_products_active_category', 'category_id', 'created_at', 'id', postgresql_where=db.text('is_active')),
+        # Vendor and admin lists include inactive products
+        db.Index('ix_products_vendor_created', 'vendor_id', 'created_at', 'id'),
+        db.Index('ix_products_created', 'created_at', 'id'),
+        # max(updated_at) is the catalog freshness probe behind ETags
+        db.Index('ix_products_updated', 'updated_at'),
+    )
 
     # Relationships
     vendor = db.relationship("Vendor", back_populates="products")
@@ -166,8 +199,37 @@ class Product(db.Model):
     def is_in_stock(self):
         return self.stock > 0
     
-    def to_dict(self):
-        """Convert product to dictionary - FIXED VERSION"""
+    @property
+    def available(self):
+        """Stock not held in anyone's cart"""
+        return (self.stock or 0) - (self.reserved or 0)
+    
+    def refresh_listable(self, vendor=None):
+        """Recompute is_listable after is_active or the vendor's status changed"""
+        vendor = vendor or self.vendor
+        is_active = True if self.is_active is None else self.is_active
+        self.is_listable = bool(is_active and vendor and vendor.status == VendorStatus.APPROVED)
+    
+    @classmethod
+    def refresh_vendor_listing(cls, vendor):
+        """Recompute is_listable for all of a vendor's products in one UPDATE"""
+        listable = cls.is_active if vendor.status == VendorStatus.APPROVED else False
+        cls.query.filter_by(vendor_id=vendor.id).update(
+            {cls.is_listable: listable}, synchronize_session=False
+        )
+    
+    def to_dict(self, vendor_data=None, category_data=None):
+        """Convert product to dictionary - FIXED VERSION
+
+        Callers serializing many products pass pre-loaded ``vendor_data`` and
+        ``category_data`` (see app.services.product_serializer) so the nested
+        dicts don't trigger per-row lazy loads.
+        """
+        if vendor_data is None and self.vendor:
+            vendor_data = self.vendor.to_dict()
+        if category_data is None and self.category:
+            category_data = self.category.to_dict()
+
         return {
             'id': self.id,
             'vendor_id': self.vendor_id,
@@ -182,8 +244,8 @@ class Product(db.Model):
             'is_featured': self.is_featured,
             'is_active': self.is_active,
             'is_in_stock': self.is_in_stock,
-            'vendor': self.vendor.to_dict() if self.vendor else None,
-            'category': self.category.to_dict() if self.category else None,
+            'vendor': vendor_data,
+            'category': category_data,
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None
         }
@@ -0,0 +1,44 @@
+# stats.py
+from app.extensions import db
+
+
+class DashboardCounter(db.Model):
+    """One shard of a running total shown on the admin dashboard.
+
+    Write paths add their deltas to a random shard of each counter, so
+    concurrent checkouts don't queue on a single row; a counter's value is
+    the sum of its shards. See app.services.stats_service.
+    """
+    __tablename__ = 'dashboard_counters'
+
+    name = db.Column(db.String(40), primary_key=True)
+    shard = db.Column(db.SmallInteger, primary_key=True)
+    value = db.Column(db.Numeric(14, 2), nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<DashboardCounter {self.name}[{self.shard}]>'
+
+
+class DailySales(db.Model):
+    """One day's sales of one vendor in one category.
+
+    Orders count from the day they were placed (UTC) once they are shipped
+    or delivered; revenue is the sum of the lines' prices, before tax and
+    shipping. Kept up to date as orders change status and rebuilt from
+    the order lines by app.services.analytics_service.rebuild_daily_sales.
+    """
+    __tablename__ = 'daily_sales'
+
+    day = db.Column(db.Date, primary_key=True)
+    vendor_id = db.Column(db.Integer, primary_key=True)
+    category_id = db.Column(db.Integer, primary_key=True)
+    orders = db.Column(db.Integer, nullable=False, default=0)
+    units = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(db.Numeric(14, 2), nullable=False, default=0)
+
+    __table_args__ = (
+        db.Index('ix_daily_sales_vendor_day', 'vendor_id', 'day'),
+    )
+
+    def __repr__(self):
+        return f'<DailySales {self.day} {self.vendor_id}/{self.category_id}>'
@@ -1,7 +1,6 @@
-from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime
 from enum import Enum
-from app.extensions import db
+from app.extensions import db, passwords
 
 class UserRole(Enum):
     CUSTOMER = 'customer'
@@ -21,9 +20,16 @@ class User(db.Model):
     role = db.Column(db.Enum(UserRole), default=UserRole.CUSTOMER, nullable=False)
     is_active = db.Column(db.Boolean, default=True)
     email_verified = db.Column(db.Boolean, default=False)
+    # Bumped to make the role and vendor claims of issued tokens stale
+    token_version = db.Column(db.Integer, nullable=False, default=1, server_default='1')
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    __table_args__ = (
+        db.Index('ix_users_created', 'created_at', 'id'),
+        db.Index('ix_users_role_created', 'role', 'created_at', 'id'),
+    )
+    
     # Remove relationships that cause circular imports
     # orders = db.relationship('Order', backref='customer', lazy='dynamic', cascade='all, delete-orphan')
     # cart_items = db.relationship('CartItem', backref='user', lazy='dynamic', cascade='all, delete-orphan')
@@ -32,11 +38,16 @@ class User(db.Model):
     
     def set_password(self, password):
         """Hash and set password"""
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = passwords.hash(password)
     
     def check_password(self, password):
-        """Check if provided password matches hash"""
-        return check_password_hash(self.password_hash, password)
+        """Check if provided password matches hash, upgrading a hash made
+        with an older PASSWORD_HASH_METHOD (the caller commits)"""
+        if not passwords.verify(self.password_hash, password):
+            return False
+        if passwords.needs_rehash(self.password_hash):
+            self.password_hash = passwords.hash(password)
+        return True
     
     @property
     def full_name(self):
@@ -1,6 +1,7 @@
 # vendor.py
 from datetime import datetime
 from enum import Enum
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from app.extensions import db
 
 
@@ -24,6 +25,18 @@ class Vendor(db.Model):
     status = db.Column(db.Enum(VendorStatus), default=VendorStatus.PENDING)
     created_at = db.Column(db.DateTime, default=db.func.current_timestamp())
     updated_at = db.Column(db.DateTime, default=db.func.current_timestamp(), onupdate=db.func.current_timestamp())
+    # Maintained by Postgres on every insert/update, used by full-text search
+    search_vector = db.Column(TSVECTOR, db.Computed(
+        "setweight(to_tsvector('english', coalesce(name, '')), 'A') || "
+        "setweight(to_tsvector('english', coalesce(description, '')), 'B')",
+        persisted=True
+    ))
+
+    __table_args__ = (
+        db.Index('ix_vendors_search_vector', 'search_vector', postgresql_using='gin'),
+        db.Index('ix_vendors_user_id', 'user_id'),
+        db.Index('ix_vendors_status_created', 'status', 'created_at', 'id'),
+    )
     
     # Relationships
     user = db.relationship("User", back_populates="vendor", uselist=False)
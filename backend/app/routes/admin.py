@@ -1,11 +1,16 @@
 from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
 from app.models.user import User, UserRole
 from app.models.vendor import Vendor, VendorStatus
 from app.models.product import Product
 from app.models.order import Order, OrderStatus
-from sqlalchemy import func, desc
-from app.extensions import db
+from app.services.product_serializer import serialize_products
+from app.services.order_serializer import serialize_orders, serialize_order
+from app.services.pagination_service import paginate, InvalidCursor
+from app.services.claims_service import admin_required, invalidate_claims, publish_claims
+from app.services import stats_service
+from app.services.analytics_service import parse_report_args, sales_report, InvalidReport
+from sqlalchemy import desc
+from app.extensions import db, cache
 from app.models.user import User
 
 # Import db from the main app module
@@ -13,70 +18,43 @@ from app import db
 
 admin_bp = Blueprint('admin', __name__)
 
-def require_admin():
-    """Decorator to require admin access"""
-    identity = get_jwt_identity()
-    
-    try:
-        user_id = int(identity)
-    except (ValueError, TypeError):
-        return jsonify({'error': 'Invalid token identity'}), 401
-    
-    user = User.query.get(user_id)
-    
-    if not user or user.role != UserRole.ADMIN:
-        return jsonify({'error': 'Admin access required'}), 403
-    
-    return user
-
 @admin_bp.route('/dashboard', methods=['GET'])
-@jwt_required()
+@admin_required
 def get_dashboard_stats():
     """Get admin dashboard statistics"""
-    user = require_admin()
-    if isinstance(user, tuple):  # Error response
-        return user
-    
-    # Get statistics
-    total_users = User.query.count()
-    total_vendors = Vendor.query.count()
-    pending_vendors = Vendor.query.filter_by(status=VendorStatus.PENDING).count()
-    approved_vendors = Vendor.query.filter_by(status=VendorStatus.APPROVED).count()
-    total_products = Product.query.filter_by(is_active=True).count()
-    total_orders = Order.query.count()
-    pending_orders = Order.query.filter_by(status=OrderStatus.PENDING).count()
-    
-    # Revenue statistics
-    total_revenue = db.session.query(func.sum(Order.total_amount)).filter(
-        Order.status.in_([OrderStatus.DELIVERED, OrderStatus.SHIPPED])
-    ).scalar() or 0
+    # Counters from the dashboard_counters rollup (one small read), or one
+    # FILTER-aggregate pass over the tables before it is seeded
+    stats = stats_service.dashboard_stats()
     
     # Recent orders
     recent_orders = Order.query.order_by(desc(Order.created_at)).limit(5).all()
     
     return jsonify({
-        'stats': {
-            'total_users': total_users,
-            'total_vendors': total_vendors,
-            'pending_vendors': pending_vendors,
-            'approved_vendors': approved_vendors,
-            'total_products': total_products,
-            'total_orders': total_orders,
-            'pending_orders': pending_orders,
-            'total_revenue': float(total_revenue)
-        },
-        'recent_orders': [order.to_dict() for order in recent_orders]
+        'stats': stats,
+        'recent_orders': serialize_orders(recent_orders)
     }), 200
 
+@admin_bp.route('/analytics/sales', methods=['GET'])
+@admin_required
+def get_sales_analytics():
+    """Get platform sales over time, by category and top vendors"""
+    try:
+        start, end, interval = parse_report_args(request.args)
+    except InvalidReport as e:
+        return jsonify({'error': str(e)}), 400
+    
+    report = sales_report(
+        start, end, interval,
+        vendor_id=request.args.get('vendor_id', type=int),
+        category_id=request.args.get('category_id', type=int),
+        by_vendor=True
+    )
+    return jsonify(report), 200
+
 @admin_bp.route('/vendors', methods=['GET'])
-@jwt_required()
+@admin_required
 def get_all_vendors():
     """Get all vendors with filtering"""
-    user = require_admin()
-    if isinstance(user, tuple):
-        return user
-    
-    page = request.args.get('page', 1, type=int)
     per_page = request.args.get('per_page', 20, type=int)
     status = request.args.get('status')
     
@@ -89,30 +67,21 @@ def get_all_vendors():
         except ValueError:
             return jsonify({'error': 'Invalid status'}), 400
     
-    vendors = query.order_by(Vendor.created_at.desc()).paginate(
-        page=page, per_page=per_page, error_out=False
-    )
+    try:
+        vendors, pagination = paginate(query, Vendor.created_at, per_page=per_page)
+    except InvalidCursor as e:
+        return jsonify({'error': str(e)}), 400
     
     return jsonify({
-        'vendors': [vendor.to_dict() for vendor in vendors.items],
-        'pagination': {
-            'page': page,
-            'pages': vendors.pages,
-            'per_page': per_page,
-            'total': vendors.total,
-            'has_next': vendors.has_next,
-            'has_prev': vendors.has_prev
-        }
+        'vendors': [vendor.to_dict() for vendor in vendors],
+        'pagination': pagination
     }), 200
 
 @admin_bp.route('/vendors/<int:vendor_id>/approve', methods=['PUT'])
-@jwt_required()
+@admin_required
 def approve_vendor(vendor_id):
-    user = require_admin()
-    if isinstance(user, tuple):
-        return user
-    
-    vendor = Vendor.query.get(vendor_id)
+    # Locked so the counters see each status change once
+    vendor = Vendor.query.filter_by(id=vendor_id).with_for_update().first()
     if not vendor:
         return jsonify({'error': 'Vendor not found'}), 404
 
@@ -120,9 +89,14 @@ def approve_vendor(vendor_id):
         return jsonify({'error': 'Only pending vendors can be approved'}), 400
 
     try:
+        stats_service.record_vendor_status(vendor.status, VendorStatus.APPROVED)
         vendor.status = VendorStatus.APPROVED
         vendor.user.is_active = True  # ✅ Activate only when approved
+        invalidate_claims(vendor.user)
+        Product.refresh_vendor_listing(vendor)
         db.session.commit()
+        cache.bump('vendors', 'products')
+        publish_claims(vendor.user)
 
         return jsonify({
             'message': 'Vendor approved successfully',
@@ -134,14 +108,11 @@ def approve_vendor(vendor_id):
 
 
 @admin_bp.route('/vendors/<int:vendor_id>/reject', methods=['PUT'])
-@jwt_required()
+@admin_required
 def reject_vendor(vendor_id):
     """Reject a vendor application"""
-    user = require_admin()
-    if isinstance(user, tuple):
-        return user
-    
-    vendor = Vendor.query.get(vendor_id)
+    # Locked so the counters see each status change once
+    vendor = Vendor.query.filter_by(id=vendor_id).with_for_update().first()
     if not vendor:
         return jsonify({'error': 'Vendor not found'}), 404
     
@@ -152,10 +123,15 @@ def reject_vendor(vendor_id):
     rejection_reason = data.get('reason', 'Application rejected by admin')
     
     try:
+        stats_service.record_vendor_status(vendor.status, VendorStatus.REJECTED)
         vendor.status = VendorStatus.REJECTED
         # You could add a rejection_reason field to the model if needed
+        invalidate_claims(vendor.user)
+        Product.refresh_vendor_listing(vendor)
         
         db.session.commit()
+        cache.bump('vendors', 'products')
+        publish_claims(vendor.user)
         
         return jsonify({
             'message': 'Vendor rejected successfully',
@@ -167,24 +143,28 @@ def reject_vendor(vendor_id):
         return jsonify({'error': 'Vendor rejection failed', 'message': str(e)}), 500
 
 @admin_bp.route('/vendors/<int:vendor_id>/suspend', methods=['PUT'])
-@jwt_required()
+@admin_required
 def suspend_vendor(vendor_id):
     """Suspend a vendor"""
-    user = require_admin()
-    if isinstance(user, tuple):
-        return user
-    
-    vendor = Vendor.query.get(vendor_id)
+    # Locked so the counters see each status change once
+    vendor = Vendor.query.filter_by(id=vendor_id).with_for_update().first()
     if not vendor:
         return jsonify({'error': 'Vendor not found'}), 404
     
     try:
+        stats_service.record_vendor_status(vendor.status, VendorStatus.SUSPENDED)
         vendor.status = VendorStatus.SUSPENDED
+        # Tokens issued while approved stop authorizing vendor routes
+        invalidate_claims(vendor.user)
         
         # Deactivate all vendor's products
-        Product.query.filter_by(vendor_id=vendor_id).update({'is_active': False})
+        deactivated = Product.query.filter_by(vendor_id=vendor_id, is_active=True).update({'is_active': False})
+        stats_service.record(active_products=-deactivated)
+        Product.refresh_vendor_listing(vendor)
         
         db.session.commit()
+        cache.bump('vendors', 'products')
+        publish_claims(vendor.user)
         
         return jsonify({
             'message': 'Vendor suspended successfully',
@@ -196,16 +176,12 @@ def suspend_vendor(vendor_id):
         return jsonify({'error': 'Vendor suspension failed', 'message': str(e)}), 500
 
 @admin_bp.route('/orders', methods=['GET'])
-@jwt_required()
+@admin_required
 def get_all_orders():
     """Get all orders"""
-    user = require_admin()
-    if isinstance(user, tuple):
-        return user
-    
-    page = request.args.get('page', 1, type=int)
     per_page = request.args.get('per_page', 20, type=int)
     status = request.args.get('status')
+    summary = request.args.get('summary', 'false').lower() == 'true'
     
     query = Order.query
     
@@ -216,31 +192,22 @@ def get_all_orders():
         except ValueError:
             return jsonify({'error': 'Invalid status'}), 400
     
-    orders = query.order_by(Order.created_at.desc()).paginate(
-        page=page, per_page=per_page, error_out=False
-    )
+    try:
+        orders, pagination = paginate(query, Order.created_at, per_page=per_page)
+    except InvalidCursor as e:
+        return jsonify({'error': str(e)}), 400
     
     return jsonify({
-        'orders': [order.to_dict() for order in orders.items],
-        'pagination': {
-            'page': page,
-            'pages': orders.pages,
-            'per_page': per_page,
-            'total': orders.total,
-            'has_next': orders.has_next,
-            'has_prev': orders.has_prev
-        }
+        'orders': serialize_orders(orders, summary=summary),
+        'pagination': pagination
     }), 200
 
 @admin_bp.route('/orders/<int:order_id>/status', methods=['PUT'])
-@jwt_required()
+@admin_required
 def update_order_status(order_id):
     """Update order status"""
-    user = require_admin()
-    if isinstance(user, tuple):
-        return user
-    
-    order = Order.query.get(order_id)
+    # Locked like cancel_order, so a status change is counted once
+    order = Order.query.filter_by(id=order_id).with_for_update().first()
     if not order:
         return jsonify({'error': 'Order not found'}), 404
     
@@ -252,13 +219,13 @@ def update_order_status(order_id):
     
     try:
         order_status = OrderStatus(new_status)
-        order.status = order_status
+        order.set_status(order_status)
         
         db.session.commit()
         
         return jsonify({
             'message': 'Order status updated successfully',
-            'order': order.to_dict()
+            'order': serialize_order(order)
         }), 200
         
     except ValueError:
@@ -268,14 +235,9 @@ def update_order_status(order_id):
         return jsonify({'error': 'Status update failed', 'message': str(e)}), 500
 
 @admin_bp.route('/products', methods=['GET'])
-@jwt_required()
+@admin_required
 def get_all_products():
     """Get all products for admin review"""
-    user = require_admin()
-    if isinstance(user, tuple):
-        return user
-    
-    page = request.args.get('page', 1, type=int)
     per_page = request.args.get('per_page', 20, type=int)
     include_inactive = request.args.get('include_inactive', 'false').lower() == 'true'
     
@@ -284,37 +246,30 @@ def get_all_products():
     if not include_inactive:
         query = query.filter_by(is_active=True)
     
-    products = query.order_by(Product.created_at.desc()).paginate(
-        page=page, per_page=per_page, error_out=False
-    )
+    try:
+        products, pagination = paginate(query, Product.created_at, per_page=per_page)
+    except InvalidCursor as e:
+        return jsonify({'error': str(e)}), 400
     
     return jsonify({
-        'products': [product.to_dict() for product in products.items],
-        'pagination': {
-            'page': page,
-            'pages': products.pages,
-            'per_page': per_page,
-            'total': products.total,
-            'has_next': products.has_next,
-            'has_prev': products.has_prev
-        }
+        'products': serialize_products(products),
+        'pagination': pagination
     }), 200
 
 @admin_bp.route('/products/<int:product_id>/toggle-active', methods=['PUT'])
-@jwt_required()
+@admin_required
 def toggle_product_active(product_id):
     """Toggle product active status"""
-    user = require_admin()
-    if isinstance(user, tuple):
-        return user
-    
-    product = Product.query.get(product_id)
+    product = Product.query.filter_by(id=product_id).with_for_update().first()
     if not product:
         return jsonify({'error': 'Product not found'}), 404
     
     try:
+        stats_service.record_product_active(product.is_active, not product.is_active)
         product.is_active = not product.is_active
+        product.refresh_listable()
         db.session.commit()
+        cache.bump('products')
         
         status = 'activated' if product.is_active else 'deactivated'
         
@@ -328,14 +283,9 @@ def toggle_product_active(product_id):
         return jsonify({'error': 'Status toggle failed', 'message': str(e)}), 500
 
 @admin_bp.route('/users', methods=['GET'])
-@jwt_required()
+@admin_required
 def get_all_users():
     """Get all users"""
-    user = require_admin()
-    if isinstance(user, tuple):
-        return user
-    
-    page = request.args.get('page', 1, type=int)
     per_page = request.args.get('per_page', 20, type=int)
     role = request.args.get('role')
     
@@ -348,20 +298,14 @@ def get_all_users():
         except ValueError:
             return jsonify({'error': 'Invalid role'}), 400
     
-    users = query.order_by(User.created_at.desc()).paginate(
-        page=page, per_page=per_page, error_out=False
-    )
+    try:
+        users, pagination = paginate(query, User.created_at, per_page=per_page)
+    except InvalidCursor as e:
+        return jsonify({'error': str(e)}), 400
     
     return jsonify({
-        'users': [user.to_dict() for user in users.items],
-        'pagination': {
-            'page': page,
-            'pages': users.pages,
-            'per_page': per_page,
-            'total': users.total,
-            'has_next': users.has_next,
-            'has_prev': users.has_prev
-        }
+        'users': [user.to_dict() for user in users],
+        'pagination': pagination
     }), 200
 
     
\ No newline at end of file
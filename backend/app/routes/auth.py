@@ -1,9 +1,12 @@
 from flask import Blueprint, request, jsonify
-from flask_jwt_extended import create_access_token, create_refresh_token, jwt_required, get_jwt_identity
+from flask_jwt_extended import create_refresh_token, jwt_required, get_jwt_identity
 from marshmallow import Schema, fields, ValidationError
-from app.extensions import db
+from app.extensions import db, limiter
 from app.models.user import User, UserRole
 from app.models.vendor import Vendor, VendorStatus
+from app.services.claims_service import access_token_for
+from app.services.password_service import HashingBusy
+from app.services.stats_service import record
 import re
 
 auth_bp = Blueprint('auth', __name__)
@@ -20,6 +23,12 @@ class LoginSchema(Schema):
     email = fields.Email(required=True)
     password = fields.Str(required=True)
 
+def email_account():
+    """Account key for the auth rate limits: the email being signed into"""
+    data = request.get_json(silent=True) or {}
+    email = data.get('email')
+    return email.strip().lower() if isinstance(email, str) else None
+
 # @auth_bp.route('/create-admin', methods=['POST'])
 # def create_admin():
 #     """Simple route to create an admin user"""
@@ -63,6 +72,7 @@ class LoginSchema(Schema):
 
 
 @auth_bp.route('/register', methods=['POST'])
+@limiter.limit(account=email_account)
 def register():
     """Register a new user"""
     schema = RegisterSchema()
@@ -108,10 +118,11 @@ def register():
             )
             db.session.add(vendor)
 
+        record(users=1, vendors=int(role == UserRole.VENDOR), pending_vendors=int(role == UserRole.VENDOR))
         db.session.commit()
 
         # Create tokens only for active users
-        access_token = create_access_token(identity=str(user.id)) if is_active else None
+        access_token = access_token_for(user) if is_active else None
         refresh_token = create_refresh_token(identity=str(user.id)) if is_active else None
 
         response = {
@@ -127,11 +138,16 @@ def register():
 
         return jsonify(response), 201
 
+    except HashingBusy:
+        # Answered with a 503 and Retry-After by the app's error handler
+        db.session.rollback()
+        raise
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': 'Registration failed', 'message': str(e)}), 500
 
 @auth_bp.route('/login', methods=['POST'])
+@limiter.limit(account=email_account)
 def login():
     """Login user"""
     schema = LoginSchema()
@@ -150,8 +166,12 @@ def login():
     if not user.is_active:
         return jsonify({'error': 'Account is deactivated'}), 401
     
-    # Create tokens
-    access_token = create_access_token(identity=str(user.id))
+    # check_password upgrades hashes made with an older PASSWORD_HASH_METHOD
+    if db.session.is_modified(user):
+        db.session.commit()
+    
+    # Create tokens; the access token carries the role and vendor claims
+    access_token = access_token_for(user)
     refresh_token = create_refresh_token(identity=str(user.id))
 
     return jsonify({
@@ -186,8 +206,8 @@ def refresh():
         return jsonify({'error': 'Invalid user'}), 401
     
     # access_token = create_access_token(identity=user_id)
-    # Fixed code
-    access_token = create_access_token(identity=str(user.id))
+    # Fixed code; fresh claims come with every refresh
+    access_token = access_token_for(user)
 
     
     return jsonify({
@@ -233,6 +253,7 @@ def update_profile():
 
 @auth_bp.route('/change-password', methods=['PUT'])
 @jwt_required()
+@limiter.limit(account=get_jwt_identity)
 def change_password():
     """Change user password"""
     # user_id = get_jwt_identity()
@@ -261,6 +282,9 @@ def change_password():
         
         return jsonify({'message': 'Password changed successfully'}), 200
         
+    except HashingBusy:
+        db.session.rollback()
+        raise
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': 'Password change failed', 'message': str(e)}), 500
\ No newline at end of file
@@ -1,8 +1,11 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from app import db
+from app.extensions import cache
 from app.models.user import User, UserRole
 from app.models.category import Category
+from app.services.product_serializer import serialize_categories
+from app.services.etag_service import request_etag, not_modified, catalog_freshness
 from marshmallow import Schema, fields, ValidationError
 
 categories_bp = Blueprint('categories', __name__)
@@ -18,15 +21,24 @@ class CategorySchema(Schema):
 
 
 @categories_bp.route('', methods=['GET'])
+@cache.cached('categories', 'products')
 def get_categories():
     """Get all active categories"""
+    etag = request_etag(*catalog_freshness())
+    unchanged = not_modified(etag)
+    if unchanged:
+        return unchanged
+    
     categories = Category.query.filter_by(is_active=True).order_by(Category.name.asc()).all()
     
-    return jsonify({
-        'categories': [category.to_dict() for category in categories]
-    }), 200
+    response = jsonify({
+        'categories': serialize_categories(categories)
+    })
+    response.set_etag(etag)
+    return response, 200
 
 @categories_bp.route('/<int:category_id>', methods=['GET'])
+@cache.cached('categories', 'products')
 def get_category(category_id):
     """Get single category"""
     category = Category.query.filter_by(id=category_id, is_active=True).first()
@@ -67,6 +79,7 @@ def create_category():
         
         db.session.add(category)
         db.session.commit()
+        cache.bump('categories')
         
         return jsonify({
             'message': 'Category created successfully',
@@ -113,6 +126,7 @@ def update_category(category_id):
             category.is_active = data['is_active']
         
         db.session.commit()
+        cache.bump('categories')
         
         return jsonify({
             'message': 'Category updated successfully',
@@ -144,6 +158,7 @@ def delete_category(category_id):
     try:
         db.session.delete(category)
         db.session.commit()
+        cache.bump('categories')
         
         return jsonify({'message': 'Category deleted successfully'}), 200
         
@@ -1,11 +1,26 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from app import db
+from app.extensions import cache
 from app.models.user import User
 from app.models.product import Product
-from app.models.order import Order, OrderItem, OrderStatus, PaymentMethod
+from app.models.vendor import Vendor
+from app.models.category import Category
+from app.models.order import Order, OrderItem, VendorOrder, OrderStatus, PaymentMethod
 from app.models.cart import CartItem
+from app.services.pagination_service import paginate, InvalidCursor
+from app.services.etag_service import request_etag, not_modified, orders_freshness
+from app.services.order_serializer import serialize_orders, serialize_order
+from app.services.inventory_service import lock_products, reserve_stock, release_stock, InsufficientStock
+from app.services.idempotency_service import idempotent, remember
+from app.services.cart_service import add_item, merge_items, load_cart, cart_summary
+from app.services.quote_service import build_quote, load_quote, order_charges, InvalidQuote
+from app.services.hold_service import holds_enabled, set_holds, release_holds, take_holds
+from app.services.stats_service import record_new_order
+from app.services.analytics_service import record_order_sales
 from marshmallow import Schema, fields, ValidationError
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
 from decimal import Decimal
 import random
 import string
@@ -133,8 +148,60 @@ class CreateOrderSchema(Schema):
 
 
 
+def _item_quantities(items):
+    """Total quantity per product of a list of order items"""
+    quantities = {}
+    for item_data in items:
+        product_id = item_data['product_id']
+        quantities[product_id] = quantities.get(product_id, 0) + item_data['quantity']
+    return quantities
+
+@orders_bp.route('/quote', methods=['POST'])
+@jwt_required()
+def quote_order():
+    """Price the cart, or the given items, and issue a quote token"""
+    user_id = get_jwt_identity()
+    
+    class QuoteSchema(Schema):
+        # Omitted: quote the user's cart
+        items = fields.List(fields.Nested(OrderItemSchema), load_default=None, validate=lambda x: len(x) > 0)
+    
+    try:
+        data = QuoteSchema().load(request.get_json(silent=True) or {})
+    except ValidationError as err:
+        return jsonify({'error': 'Validation failed', 'messages': err.messages}), 400
+    
+    quantities = _item_quantities(data['items']) if data['items'] else None
+    quote = build_quote(user_id, quantities)
+    
+    return jsonify({
+        'items': [
+            {
+                **line,
+                'unit_price': float(line['unit_price']),
+                'total_price': float(line['total_price'])
+            }
+            for line in quote['items']
+        ],
+        'unavailable': quote['unavailable'],
+        'subtotal': float(quote['subtotal']),
+        'tax_amount': float(quote['tax_amount']),
+        'shipping_amount': float(quote['shipping_amount']),
+        'total_amount': float(quote['total_amount']),
+        'quote_token': quote['token'],
+        'expires_in': quote['expires_in']
+    }), 200
+
+def _order_created(order_id):
+    """create_order()'s response for an order it placed, for idempotent retries"""
+    return jsonify({
+        'message': 'Order created successfully',
+        'order': serialize_order(Order.query.get(order_id))
+    }), 201
+
 @orders_bp.route('', methods=['POST'])
 @jwt_required()
+@idempotent(replay=_order_created)
 def create_order():
     """Create a new order"""
     user_id = get_jwt_identity()
@@ -145,13 +212,16 @@ def create_order():
     
     # Update the schema to accept the additional fields
     class CreateOrderSchema(Schema):
-        items = fields.List(fields.Nested(OrderItemSchema), required=True, validate=lambda x: len(x) > 0)
+        # Either the items, or a quote token from POST /api/orders/quote
+        items = fields.List(fields.Nested(OrderItemSchema), load_default=None, validate=lambda x: len(x) > 0)
+        quote_token = fields.Str(load_default=None)
         payment_method = fields.Str(required=True, validate=lambda x: x in [pm.value for pm in PaymentMethod])
         shipping_address = fields.Dict(required=True)
         notes = fields.Str(load_default=None)
         # Add the new optional fields from frontend
         payment_reference = fields.Str(load_default=None)
-        total_amount = fields.Decimal(load_default=None)
+        # Optional; an order is refused when it differs from the real total
+        total_amount = fields.Decimal(places=2, load_default=None)
         status = fields.Str(load_default=None)
     
     schema = CreateOrderSchema()
@@ -161,20 +231,51 @@ def create_order():
     except ValidationError as err:
         return jsonify({'error': 'Validation failed', 'messages': err.messages}), 400
     
+    # A quote fixes the items, prices and totals it was issued for
+    quote = None
+    if data['quote_token']:
+        try:
+            quote = load_quote(data['quote_token'], user_id)
+        except InvalidQuote as e:
+            return jsonify({'error': str(e)}), 400
+        
+        quote_items = [
+            {'product_id': product_id, 'quantity': quantity}
+            for product_id, quantity in quote['quantities'].items()
+        ]
+        if data['items'] and _item_quantities(data['items']) != quote['quantities']:
+            return jsonify({'error': 'Items do not match the quote'}), 400
+        data['items'] = quote_items
+    elif not data['items']:
+        return jsonify({'error': 'Validation failed', 'messages': {'items': ['Missing data for required field.']}}), 400
+    
     try:
         # Validate products and calculate totals
         order_items = []
         subtotal = Decimal('0.00')
         
+        quantities = _item_quantities(data['items'])
+        
+        # Units held in this user's cart go straight into the order: the
+        # stock UPDATE below takes them off reserved as it sells them
+        held = take_holds(user_id, quantities) if holds_enabled() else {}
+        
+        # Load and lock every ordered product, in id order so overlapping
+        # checkouts queue instead of deadlocking; the stock UPDATE below
+        # is what refuses to oversell
+        products = lock_products(quantities)
+        
         for item_data in data['items']:
-            product = Product.query.get(item_data['product_id'])
+            product = products.get(item_data['product_id'])
             if not product or not product.is_active:
+                db.session.rollback()
                 return jsonify({'error': f'Product {item_data["product_id"]} not found or inactive'}), 404
             
-            if product.stock < item_data['quantity']:
+            if product.available + held.get(product.id, 0) < quantities[product.id]:
+                db.session.rollback()
                 return jsonify({'error': f'Insufficient stock for product {product.name}'}), 400
             
-            unit_price = product.price
+            unit_price = quote['prices'][product.id] if quote else product.price
             total_price = unit_price * item_data['quantity']
             subtotal += total_price
             
@@ -185,15 +286,22 @@ def create_order():
                 'total_price': total_price
             })
         
-        # Calculate tax and shipping (simplified)
-        tax_amount = Decimal('0.00')  # No tax for now
-        shipping_amount = Decimal('5.00') if subtotal < 50 else Decimal('0.00')  # Free shipping over $50
-        
-        # Use frontend total_amount if provided, otherwise calculate it
-        if data.get('total_amount'):
-            total_amount = Decimal(str(data['total_amount']))
+        # Calculate tax and shipping (simplified); a quote keeps the
+        # charges it was issued with
+        if quote:
+            tax_amount, shipping_amount = quote['tax_amount'], quote['shipping_amount']
         else:
-            total_amount = subtotal + tax_amount + shipping_amount
+            tax_amount, shipping_amount = order_charges(subtotal)
+        
+        # The total is always computed here; a frontend total is only
+        # checked against it
+        total_amount = subtotal + tax_amount + shipping_amount
+        if data['total_amount'] is not None and data['total_amount'] != total_amount:
+            db.session.rollback()
+            return jsonify({
+                'error': 'Total does not match the order',
+                'total_amount': float(total_amount)
+            }), 400
         
         # Combine notes with payment reference
         notes_parts = []
@@ -231,27 +339,51 @@ def create_order():
             tax_amount=tax_amount,
             shipping_amount=shipping_amount,
             total_amount=total_amount,
-            notes=notes  # Combined notes with payment reference
+            notes=notes,  # Combined notes with payment reference
+            quote_id=quote['quote_id'] if quote else None
         )
         order.shipping_address_dict = data['shipping_address']
         order.generate_order_number()
         
         db.session.add(order)
         db.session.flush()  # Get order ID
+        record_new_order(order)
         
-        # Create order items and update product stock
-        for item_data in order_items:
-            order_item = OrderItem(
-                order_id=order.id,
-                product_id=item_data['product'].id,
-                quantity=item_data['quantity'],
-                unit_price=item_data['unit_price'],
-                total_price=item_data['total_price']
-            )
-            db.session.add(order_item)
-            
-            # Update product stock
-            item_data['product'].stock -= item_data['quantity']
+        # Update product stock in one statement, then insert every order
+        # item, with its product snapshot, in one batch
+        reserve_stock(quantities, held)
+        
+        vendors = {
+            vendor.id: vendor
+            for vendor in Vendor.query.filter(Vendor.id.in_({p.vendor_id for p in products.values()}))
+        }
+        categories = {
+            category.id: category
+            for category in Category.query.filter(Category.id.in_({p.category_id for p in products.values()}))
+        }
+        
+        item_rows = [
+            {
+                'order_id': order.id,
+                'product_id': item_data['product'].id,
+                'quantity': item_data['quantity'],
+                'unit_price': item_data['unit_price'],
+                'total_price': item_data['total_price'],
+                **OrderItem.product_snapshot(
+                    item_data['product'],
+                    vendors.get(item_data['product'].vendor_id),
+                    categories.get(item_data['product'].category_id)
+                )
+            }
+            for item_data in order_items
+        ]
+        db.session.execute(insert(OrderItem), item_rows)
+        
+        # One sub-order per vendor, for the vendors' order feeds
+        db.session.execute(insert(VendorOrder), VendorOrder.split(order, item_rows))
+        
+        # Orders placed as already shipped or delivered are sales right away
+        record_order_sales(order, None, order.status)
         
         # Clear user's cart items for ordered products
         product_ids = [item['product'].id for item in order_items]
@@ -260,13 +392,23 @@ def create_order():
             CartItem.product_id.in_(product_ids)
         ).delete(synchronize_session=False)
         
+        # A retry with the same Idempotency-Key finds the order through this
+        remember(order.id)
+        
         db.session.commit()
+        cache.bump('products')
         
-        return jsonify({
-            'message': 'Order created successfully',
-            'order': order.to_dict()
-        }), 201
+        return _order_created(order.id)
         
+    except InsufficientStock as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 400
+    except IntegrityError as e:
+        db.session.rollback()
+        # Another checkout placed an order with the same quote first
+        if getattr(e.orig.diag, 'constraint_name', None) == 'unique_order_quote':
+            return jsonify({'error': 'Quote has already been used'}), 400
+        return jsonify({'error': 'Order creation failed', 'message': str(e)}), 500
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': 'Order creation failed', 'message': str(e)}), 500
@@ -275,9 +417,9 @@ def create_order():
 def get_my_orders():
     """Get current user's orders"""
     user_id = get_jwt_identity()
-    page = request.args.get('page', 1, type=int)
     per_page = request.args.get('per_page', 10, type=int)
     status = request.args.get('status')
+    summary = request.args.get('summary', 'false').lower() == 'true'
     
     query = Order.query.filter_by(user_id=user_id)
     
@@ -288,40 +430,52 @@ def get_my_orders():
         except ValueError:
             return jsonify({'error': 'Invalid status'}), 400
     
-    orders = query.order_by(Order.created_at.desc()).paginate(
-        page=page, per_page=per_page, error_out=False
-    )
+    etag = request_etag(user_id, *orders_freshness(query))
+    unchanged = not_modified(etag)
+    if unchanged:
+        return unchanged
     
-    return jsonify({
-        'orders': [order.to_dict() for order in orders.items],
-        'pagination': {
-            'page': page,
-            'pages': orders.pages,
-            'per_page': per_page,
-            'total': orders.total,
-            'has_next': orders.has_next,
-            'has_prev': orders.has_prev
-        }
-    }), 200
+    try:
+        orders, pagination = paginate(query, Order.created_at, per_page=per_page)
+    except InvalidCursor as e:
+        return jsonify({'error': str(e)}), 400
+    
+    response = jsonify({
+        'orders': serialize_orders(orders, summary=summary),
+        'pagination': pagination
+    })
+    response.set_etag(etag)
+    return response, 200
 
 @orders_bp.route('/<int:order_id>', methods=['GET'])
 @jwt_required()
 def get_order(order_id):
     """Get single order details"""
     user_id = get_jwt_identity()
-    order = Order.query.filter_by(id=order_id, user_id=user_id).first()
+    query = Order.query.filter_by(id=order_id, user_id=user_id)
     
-    if not order:
+    freshness = orders_freshness(query)
+    if not freshness[0]:
         return jsonify({'error': 'Order not found'}), 404
     
-    return jsonify({'order': order.to_dict()}), 200
+    etag = request_etag(user_id, *freshness)
+    unchanged = not_modified(etag)
+    if unchanged:
+        return unchanged
+    
+    order = query.first()
+    
+    response = jsonify({'order': serialize_order(order)})
+    response.set_etag(etag)
+    return response, 200
 
 @orders_bp.route('/<int:order_id>/cancel', methods=['PUT'])
 @jwt_required()
 def cancel_order(order_id):
     """Cancel an order"""
     user_id = get_jwt_identity()
-    order = Order.query.filter_by(id=order_id, user_id=user_id).first()
+    # Lock the order so two concurrent cancels can't both restore stock
+    order = Order.query.filter_by(id=order_id, user_id=user_id).with_for_update().first()
     
     if not order:
         return jsonify({'error': 'Order not found'}), 404
@@ -331,17 +485,20 @@ def cancel_order(order_id):
     
     try:
         # Restore product stock
+        quantities = {}
         for item in order.items:
-            item.product.stock += item.quantity
+            quantities[item.product_id] = quantities.get(item.product_id, 0) + item.quantity
+        release_stock(quantities)
         
         # Update order status
-        order.status = OrderStatus.CANCELLED
+        order.set_status(OrderStatus.CANCELLED)
         
         db.session.commit()
+        cache.bump('products')
         
         return jsonify({
             'message': 'Order cancelled successfully',
-            'order': order.to_dict()
+            'order': serialize_order(order)
         }), 200
         
     except Exception as e:
@@ -354,18 +511,34 @@ def cancel_order(order_id):
 def get_cart():
     """Get user's cart items"""
     user_id = get_jwt_identity()
-    cart_items = CartItem.query.filter_by(user_id=user_id).all()
     
-    total = sum(item.total_price for item in cart_items)
+    # Items, products, vendors and categories in one joined query
+    items, subtotal = load_cart(user_id)
     
     return jsonify({
-        'cart_items': [item.to_dict() for item in cart_items],
-        'total': float(total),
-        'item_count': len(cart_items)
+        'cart_items': [
+            cart_item.to_dict(product_data=product_data, total_price=line_total)
+            for cart_item, product_data, line_total in items
+        ],
+        'total': float(subtotal),
+        'item_count': len(items)
+    }), 200
+
+@orders_bp.route('/cart/summary', methods=['GET'])
+@jwt_required()
+def get_cart_summary():
+    """Get item count and subtotal of user's cart"""
+    summary = cart_summary(get_jwt_identity())
+    
+    return jsonify({
+        'item_count': summary['item_count'],
+        'quantity': summary['quantity'],
+        'subtotal': float(summary['subtotal'])
     }), 200
 
 @orders_bp.route('/cart/add', methods=['POST'])
 @jwt_required()
+@idempotent
 def add_to_cart():
     """Add item to cart"""
     user_id = get_jwt_identity()
@@ -377,38 +550,91 @@ def add_to_cart():
     if not product_id or quantity <= 0:
         return jsonify({'error': 'Invalid product_id or quantity'}), 400
     
-    product = Product.query.get(product_id)
-    if not product or not product.is_active:
-        return jsonify({'error': 'Product not found or inactive'}), 404
-    
     try:
-        # Check if item already in cart
-        cart_item = CartItem.query.filter_by(user_id=user_id, product_id=product_id).first()
+        # Insert or increment in one statement, stock check included
+        added = add_item(int(user_id), product_id, quantity)
         
-        if cart_item:
-            # Update quantity
-            new_quantity = cart_item.quantity + quantity
-            if new_quantity > product.stock:
-                return jsonify({'error': 'Insufficient stock'}), 400
-            cart_item.quantity = new_quantity
-        else:
-            # Create new cart item
-            if quantity > product.stock:
-                return jsonify({'error': 'Insufficient stock'}), 400
-            cart_item = CartItem(user_id=user_id, product_id=product_id, quantity=quantity)
-            db.session.add(cart_item)
+        if added is None:
+            db.session.rollback()
+            product = Product.query.get(product_id)
+            if not product or not product.is_active:
+                return jsonify({'error': 'Product not found or inactive'}), 404
+            return jsonify({'error': 'Insufficient stock'}), 400
+        
+        item_id, cart_quantity = added
+        held_until = None
+        if holds_enabled():
+            held_until = set_holds(user_id, {product_id: cart_quantity})
         
         db.session.commit()
+        cart_item = CartItem.query.get(item_id)
         
-        return jsonify({
+        response = {
             'message': 'Item added to cart',
             'cart_item': cart_item.to_dict()
-        }), 200
+        }
+        if held_until:
+            response['held_until'] = held_until.isoformat()
         
+        return jsonify(response), 200
+        
+    except InsufficientStock:
+        db.session.rollback()
+        return jsonify({'error': 'Insufficient stock'}), 400
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': 'Failed to add item to cart', 'message': str(e)}), 500
 
+@orders_bp.route('/cart/merge', methods=['POST'])
+@jwt_required()
+def merge_cart():
+    """Merge a whole cart, e.g. a guest cart after login, into the user's cart"""
+    user_id = int(get_jwt_identity())
+    
+    class MergeCartSchema(Schema):
+        items = fields.List(fields.Nested(OrderItemSchema), required=True)
+    
+    try:
+        data = MergeCartSchema().load(request.json or {})
+    except ValidationError as err:
+        return jsonify({'error': 'Validation failed', 'messages': err.messages}), 400
+    
+    limit = current_app.config.get('CART_MERGE_LIMIT', 100)
+    if len(data['items']) > limit:
+        return jsonify({'error': f'At most {limit} items can be merged at once'}), 400
+    
+    # Repeated products are summed; one statement can't upsert a row twice
+    quantities = _item_quantities(data['items'])
+    
+    try:
+        merged = merge_items(user_id, quantities)
+        held_until = None
+        if holds_enabled():
+            held_until = set_holds(user_id, merged)
+        db.session.commit()
+        
+        response = {
+            'message': 'Cart merged',
+            'merged': [
+                {'product_id': product_id, 'quantity': quantity}
+                for product_id, quantity in sorted(merged.items())
+            ],
+            # Unknown, inactive or sold-out products
+            'skipped': [product_id for product_id in quantities if product_id not in merged]
+        }
+        if held_until:
+            response['held_until'] = held_until.isoformat()
+        
+        return jsonify(response), 200
+        
+    except InsufficientStock:
+        # Another cart took the units between the merge and the hold
+        db.session.rollback()
+        return jsonify({'error': 'Insufficient stock, please retry'}), 409
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': 'Failed to merge cart', 'message': str(e)}), 500
+
 @orders_bp.route('/cart/<int:item_id>', methods=['PUT'])
 @jwt_required()
 def update_cart_item(item_id):
@@ -426,12 +652,16 @@ def update_cart_item(item_id):
         return jsonify({'error': 'Invalid quantity'}), 400
     
     try:
+        if holds_enabled():
+            # Holds the new quantity, or releases the line's hold at 0
+            set_holds(user_id, {cart_item.product_id: quantity})
+        
         if quantity == 0:
             # Remove item from cart
             db.session.delete(cart_item)
         else:
             # Update quantity
-            if quantity > cart_item.product.stock:
+            if not holds_enabled() and quantity > cart_item.product.stock:
                 return jsonify({'error': 'Insufficient stock'}), 400
             cart_item.quantity = quantity
         
@@ -439,6 +669,9 @@ def update_cart_item(item_id):
         
         return jsonify({'message': 'Cart updated successfully'}), 200
         
+    except InsufficientStock:
+        db.session.rollback()
+        return jsonify({'error': 'Insufficient stock'}), 400
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': 'Failed to update cart', 'message': str(e)}), 500
@@ -454,6 +687,8 @@ def remove_from_cart(item_id):
         return jsonify({'error': 'Cart item not found'}), 404
     
     try:
+        if holds_enabled():
+            release_holds(user_id, [cart_item.product_id])
         db.session.delete(cart_item)
         db.session.commit()
         
@@ -470,6 +705,8 @@ def clear_cart():
     user_id = get_jwt_identity()
     
     try:
+        if holds_enabled():
+            release_holds(user_id)
         CartItem.query.filter_by(user_id=user_id).delete()
         db.session.commit()
         
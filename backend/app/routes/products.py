@@ -1,12 +1,22 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
 from app import db
+from app.extensions import cache, limiter
 from app.models.user import User, UserRole
 from app.models.vendor import Vendor, VendorStatus
 from app.models.product import Product
 from app.models.category import Category
+from app.services.product_serializer import (
+    serialize_products, serialize_sparse, sparse_columns, requested_fields, InvalidFields,
+    products_by_id
+)
+from app.services.search_service import apply_search, highlights
+from app.services.pagination_service import paginate, InvalidCursor
+from app.services.claims_service import current_claims
+from app.services.stats_service import record_product_active
+from app.services.etag_service import request_etag, not_modified, catalog_freshness, product_freshness
 from marshmallow import Schema, fields, ValidationError
-from sqlalchemy import or_, and_
+from sqlalchemy import or_, func, case, tuple_
 from decimal import Decimal
 
 products_bp = Blueprint('products', __name__)
@@ -30,35 +40,45 @@ class ProductSchema(Schema):
     is_featured = fields.Bool(load_default=False)  # fixed
 
 
-@products_bp.route('', methods=['GET'])
-def get_products():
-    """Get list of products with filtering and pagination"""
-    page = request.args.get('page', 1, type=int)
-    per_page = request.args.get('per_page', 20, type=int)
-    search = request.args.get('search', '')
-    category_id = request.args.get('category_id', type=int)
-    vendor_id = request.args.get('vendor_id', type=int)
-    min_price = request.args.get('min_price', type=float)
-    max_price = request.args.get('max_price', type=float)
-    sort_by = request.args.get('sort_by', 'newest')
-    featured_only = request.args.get('featured', 'false').lower() == 'true'
+# sort_by value -> (column, descending)
+SORT_OPTIONS = {
+    'newest': (Product.created_at, True),
+    'price_low': (Product.price, False),
+    'price_high': (Product.price, True),
+    'rating': (Product.rating, True),
+    'name': (Product.name, False)
+}
+
+
+def storefront_query(args):
+    """Build the storefront product query from get_products' filter arguments.
+
+    Only listable products (active, from approved vendors) are shown. Returns
+    ``(query, rank)``; rank is the full-text relevance expression when the
+    arguments carry a full-text search, else None.
+    """
+    search = args.get('search', '')
+    search_mode = args.get('search_mode', 'fulltext')
+    category_id = args.get('category_id', type=int)
+    vendor_id = args.get('vendor_id', type=int)
+    min_price = args.get('min_price', type=float)
+    max_price = args.get('max_price', type=float)
+    featured_only = args.get('featured', 'false').lower() == 'true'
     
-    # Base query - only active products from approved vendors
-    query = Product.query.join(Vendor).filter(
-        and_(
-            Product.is_active == True,
-            Vendor.status == VendorStatus.APPROVED
-        )
-    )
+    # Base query - is_listable already folds in the vendor's status
+    query = Product.query.filter(Product.is_listable == True)
     
     # Apply filters
-    if search:
+    rank = None
+    if search and search_mode == 'ilike':
         query = query.filter(
             or_(
                 Product.name.ilike(f'%{search}%'),
                 Product.description.ilike(f'%{search}%')
             )
         )
+    elif search:
+        query, rank = apply_search(query, Product, search)
     
     if category_id:
         query = query.filter(Product.category_id == category_id)
@@ -75,61 +95,205 @@ def get_products():
     if featured_only:
         query = query.filter(Product.is_featured == True)
     
+    return query, rank
+
+
+def is_search():
+    return bool(request.args.get('search'))
+
+
+@products_bp.route('', methods=['GET'])
+@limiter.limit('search', when=is_search)
+@cache.cached('products', 'vendors', 'categories')
+def get_products():
+    """Get list of products with filtering and pagination"""
+    per_page = request.args.get('per_page', 20, type=int)
+    search = request.args.get('search', '')
+    sort_by = request.args.get('sort_by', 'newest')
+    
+    try:
+        fields = requested_fields(request.args)
+    except InvalidFields as e:
+        return jsonify({'error': str(e)}), 400
+    
+    query, rank = storefront_query(request.args)
+    
     # Apply sorting
-    if sort_by == 'price_low':
-        query = query.order_by(Product.price.asc())
-    elif sort_by == 'price_high':
-        query = query.order_by(Product.price.desc())
-    elif sort_by == 'rating':
-        query = query.order_by(Product.rating.desc())
-    elif sort_by == 'name':
-        query = query.order_by(Product.name.asc())
-    else:  # newest
-        query = query.order_by(Product.created_at.desc())
-    
-    products = query.paginate(page=page, per_page=per_page, error_out=False)
+    if sort_by == 'relevance' and rank is not None:
+        if 'cursor' in request.args:
+            return jsonify({'error': 'Relevance sorting does not support cursor pagination'}), 400
+        sort_column, descending = rank, True
+    else:
+        sort_column, descending = SORT_OPTIONS.get(sort_by, SORT_OPTIONS['newest'])
+    
+    etag = request_etag(*catalog_freshness())
+    unchanged = not_modified(etag)
+    if unchanged:
+        return unchanged
+    
+    # Sparse fieldsets select plain columns instead of loading products
+    if fields:
+        query = query.with_entities(*sparse_columns(fields, sort_column))
+    
+    try:
+        products, pagination = paginate(
+            query, sort_column, descending, tiebreaker=Product.id, per_page=per_page
+        )
+    except InvalidCursor as e:
+        return jsonify({'error': str(e)}), 400
+    
+    if fields:
+        products_data = serialize_sparse(products, fields)
+    else:
+        products_data = serialize_products(products)
+    
+    if rank is not None:
+        snippets = highlights(
+            Product,
+            [product.id for product in products],
+            search,
+            func.concat_ws(' - ', Product.name, Product.description)
+        )
+        for product_data in products_data:
+            product_data['search_highlight'] = snippets.get(product_data['id'])
+    
+    response = jsonify({
+        'products': products_data,
+        'pagination': pagination
+    })
+    response.set_etag(etag)
+    return response, 200
+
+# Lower bounds of the price histogram buckets; the last one is open-ended
+PRICE_BUCKETS = [0, 10, 25, 50, 100, 250, 500, 1000]
+
+
+@products_bp.route('/facets', methods=['GET'])
+@limiter.limit('search', when=is_search)
+@cache.cached('products', 'vendors', 'categories')
+def get_product_facets():
+    """Get category, vendor, price and stock counts for get_products' filters"""
+    query, _ = storefront_query(request.args)
+    
+    price_bucket = case(
+        *[(Product.price < upper, index) for index, upper in enumerate(PRICE_BUCKETS[1:])],
+        else_=len(PRICE_BUCKETS) - 1
+    )
+    matching = query.join(Vendor, Product.vendor_id == Vendor.id).join(
+        Category, Product.category_id == Category.id
+    ).with_entities(
+        Product.category_id,
+        Category.name.label('category_name'),
+        Product.vendor_id,
+        Vendor.name.label('vendor_name'),
+        Product.stock,
+        price_bucket.label('price_bucket')
+    ).order_by(None).subquery()
+    
+    # One pass over the matching products: a grouping set per facet plus
+    # the grand total
+    rows = db.session.query(
+        matching.c.category_id,
+        matching.c.category_name,
+        matching.c.vendor_id,
+        matching.c.vendor_name,
+        matching.c.price_bucket,
+        func.grouping(matching.c.category_id).label('all_categories'),
+        func.grouping(matching.c.vendor_id).label('all_vendors'),
+        func.grouping(matching.c.price_bucket).label('all_prices'),
+        func.count().label('count'),
+        func.count().filter(matching.c.stock > 0).label('in_stock')
+    ).group_by(func.grouping_sets(
+        tuple_(matching.c.category_id, matching.c.category_name),
+        tuple_(matching.c.vendor_id, matching.c.vendor_name),
+        tuple_(matching.c.price_bucket),
+        tuple_()
+    )).all()
+    
+    total = {'count': 0, 'in_stock': 0}
+    categories = []
+    vendors = []
+    buckets = {}
+    for row in rows:
+        counts = {'count': row.count, 'in_stock': row.in_stock}
+        if not row.all_categories:
+            categories.append({'id': row.category_id, 'name': row.category_name, **counts})
+        elif not row.all_vendors:
+            vendors.append({'id': row.vendor_id, 'name': row.vendor_name, **counts})
+        elif not row.all_prices:
+            buckets[row.price_bucket] = counts
+        else:
+            total = counts
+    
+    price_buckets = []
+    for index, lower in enumerate(PRICE_BUCKETS):
+        upper = PRICE_BUCKETS[index + 1] if index + 1 < len(PRICE_BUCKETS) else None
+        counts = buckets.get(index, {'count': 0, 'in_stock': 0})
+        price_buckets.append({'min': lower, 'max': upper, **counts})
     
     return jsonify({
-        'products': [product.to_dict() for product in products.items],
-        'pagination': {
-            'page': page,
-            'pages': products.pages,
-            'per_page': per_page,
-            'total': products.total,
-            'has_next': products.has_next,
-            'has_prev': products.has_prev
-        }
+        'total': total['count'],
+        'in_stock': total['in_stock'],
+        'categories': sorted(categories, key=lambda facet: (-facet['count'], facet['name'])),
+        'vendors': sorted(vendors, key=lambda facet: (-facet['count'], facet['name'])),
+        'price_buckets': price_buckets
+    }), 200
+
+@products_bp.route('/batch', methods=['GET'])
+@cache.cached('products', 'vendors', 'categories')
+def get_products_batch():
+    """Get several products by id, in request order"""
+    raw_ids = [value for value in request.args.get('ids', '').split(',') if value.strip()]
+    
+    try:
+        product_ids = [int(value) for value in raw_ids]
+    except ValueError:
+        return jsonify({'error': 'ids must be a comma-separated list of integers'}), 400
+    
+    limit = current_app.config.get('PRODUCT_BATCH_LIMIT', 200)
+    if len(product_ids) > limit:
+        return jsonify({'error': f'At most {limit} ids can be requested at once'}), 400
+    
+    products = products_by_id(product_ids, listable_only=True)
+    serialized = {data['id']: data for data in serialize_products(list(products.values()))}
+    
+    # Unknown or unlisted ids keep their position as null and are listed
+    # in 'missing'
+    return jsonify({
+        'products': [serialized.get(product_id) for product_id in product_ids],
+        'missing': [product_id for product_id in dict.fromkeys(product_ids) if product_id not in serialized]
     }), 200
 
 @products_bp.route('/<int:product_id>', methods=['GET'])
+@cache.cached('products', 'vendors', 'categories')
 def get_product(product_id):
     """Get single product details"""
-    product = Product.query.join(Vendor).filter(
-        and_(
-            Product.id == product_id,
-            Product.is_active == True,
-            Vendor.status == VendorStatus.APPROVED
-        )
-    ).first()
-    
-    if not product:
+    freshness = product_freshness(product_id)
+    if freshness is None:
         return jsonify({'error': 'Product not found'}), 404
     
-    return jsonify({'product': product.to_dict()}), 200
+    etag = request_etag(*freshness)
+    unchanged = not_modified(etag)
+    if unchanged:
+        return unchanged
+    
+    product = Product.query.get(product_id)
+    
+    response = jsonify({'product': product.to_dict()})
+    response.set_etag(etag)
+    return response, 200
 
 @products_bp.route('', methods=['POST'])
 @jwt_required()
 def create_product():
     """Create a new product (vendor only)"""
-    user_id = get_jwt_identity()
-    user = User.query.get(user_id)
+    claims = current_claims()
     
-    if not user:
+    if not claims:
         return jsonify({'error': 'User not found'}), 404
     
-    # Check if user is a vendor
-    vendor = Vendor.query.filter_by(user_id=user_id).first()
-    if not vendor or vendor.status != VendorStatus.APPROVED:
+    # Check if user is an approved vendor
+    if claims['vendor_status'] != VendorStatus.APPROVED.value:
         return jsonify({'error': 'Only approved vendors can create products'}), 403
     
     schema = ProductSchema()
@@ -147,7 +311,7 @@ def create_product():
     try:
         # Create product
         product = Product(
-            vendor_id=vendor.id,
+            vendor_id=claims['vendor_id'],
             category_id=data['category_id'],
             name=data['name'],
             description=data['description'],
@@ -156,9 +320,13 @@ def create_product():
             is_featured=data['is_featured']
         )
         product.image_list = data['images']
+        # Approved vendor, so listable whenever active
+        product.is_listable = product.is_active is not False
         
         db.session.add(product)
+        record_product_active(None, product.is_active)
         db.session.commit()
+        cache.bump('products')
         
         return jsonify({
             'message': 'Product created successfully',
@@ -173,13 +341,12 @@ def create_product():
 @jwt_required()
 def update_product(product_id):
     """Update a product (vendor only, own products)"""
-    user_id = get_jwt_identity()
-    vendor = Vendor.query.filter_by(user_id=user_id).first()
+    claims = current_claims()
     
-    if not vendor or vendor.status != VendorStatus.APPROVED:
+    if not claims or claims['vendor_status'] != VendorStatus.APPROVED.value:
         return jsonify({'error': 'Only approved vendors can update products'}), 403
     
-    product = Product.query.filter_by(id=product_id, vendor_id=vendor.id).first()
+    product = Product.query.filter_by(id=product_id, vendor_id=claims['vendor_id']).first()
     if not product:
         return jsonify({'error': 'Product not found or access denied'}), 404
     
@@ -206,6 +373,7 @@ def update_product(product_id):
             product.is_featured = data['is_featured']
         
         db.session.commit()
+        cache.bump('products')
         
         return jsonify({
             'message': 'Product updated successfully',
@@ -220,20 +388,22 @@ def update_product(product_id):
 @jwt_required()
 def delete_product(product_id):
     """Delete a product (vendor only, own products)"""
-    user_id = get_jwt_identity()
-    vendor = Vendor.query.filter_by(user_id=user_id).first()
+    claims = current_claims()
     
-    if not vendor or vendor.status != VendorStatus.APPROVED:
+    if not claims or claims['vendor_status'] != VendorStatus.APPROVED.value:
         return jsonify({'error': 'Only approved vendors can delete products'}), 403
     
-    product = Product.query.filter_by(id=product_id, vendor_id=vendor.id).first()
+    product = Product.query.filter_by(id=product_id, vendor_id=claims['vendor_id']).first()
     if not product:
         return jsonify({'error': 'Product not found or access denied'}), 404
     
     try:
         # Soft delete - just mark as inactive
+        record_product_active(product.is_active, False)
         product.is_active = False
+        product.refresh_listable()
         db.session.commit()
+        cache.bump('products')
         
         return jsonify({'message': 'Product deleted successfully'}), 200
         
@@ -245,17 +415,16 @@ def delete_product(product_id):
 @jwt_required()
 def get_my_products():
     """Get current vendor's products"""
-    user_id = get_jwt_identity()
-    vendor = Vendor.query.filter_by(user_id=user_id).first()
+    claims = current_claims()
     
-    if not vendor:
+    if not claims or claims['vendor_id'] is None:
         return jsonify({'error': 'Vendor profile not found'}), 404
     
     page = request.args.get('page', 1, type=int)
     per_page = request.args.get('per_page', 20, type=int)
     include_inactive = request.args.get('include_inactive', 'false').lower() == 'true'
     
-    query = Product.query.filter_by(vendor_id=vendor.id)
+    query = Product.query.filter_by(vendor_id=claims['vendor_id'])
     
     if not include_inactive:
         query = query.filter_by(is_active=True)
@@ -265,7 +434,7 @@ def get_my_products():
     )
     
     return jsonify({
-        'products': [product.to_dict() for product in products.items],
+        'products': serialize_products(products.items),
         'pagination': {
             'page': page,
             'pages': products.pages,
@@ -278,21 +447,33 @@ def get_my_products():
 
 
 @products_bp.route('/all', methods=['GET'])
+@cache.cached('products', 'vendors', 'categories')
 def get_all_products():
     """Get all products (including inactive ones) - for public access"""
     page = request.args.get('page', 1, type=int)
     per_page = request.args.get('per_page', 100, type=int)  # Large per_page to get all
     include_inactive = request.args.get('include_inactive', 'true').lower() == 'true'
-    query = Product.query.join(Vendor).filter(
-        Vendor.status == VendorStatus.APPROVED  # Only products from approved vendors
-    )
-    if not include_inactive:
-        query = query.filter(Product.is_active == True)
+    if include_inactive:
+        query = Product.query.join(Vendor).filter(
+            Vendor.status == VendorStatus.APPROVED  # Only products from approved vendors
+        )
+    else:
+        query = Product.query.filter(Product.is_listable == True)
+    try:
+        fields = requested_fields(request.args)
+    except InvalidFields as e:
+        return jsonify({'error': str(e)}), 400
+    if fields:
+        query = query.with_entities(*sparse_columns(fields))
     products = query.order_by(Product.created_at.desc()).paginate(
         page=page, per_page=per_page, error_out=False
     )
+    if fields:
+        products_data = serialize_sparse(products.items, fields)
+    else:
+        products_data = serialize_products(products.items)
     return jsonify({
-        'products': [product.to_dict() for product in products.items],
+        'products': products_data,
         'pagination': {
             'page': page,
             'pages': products.pages,
@@ -1,18 +1,26 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from app import db
+from app.extensions import cache
 from app.models.user import User, UserRole
 from app.models.vendor import Vendor, VendorStatus
 from app.models.product import Product
-from app.models.order import Order
+from app.models.order import VendorOrder, OrderStatus
 from app.models.category import Category  # ✅ Add this line
 # from app.services.google_drive_service import GoogleDriveService  # Add this import
 from app.services.s3_storage_service import s3_storage_service
+from app.services.product_serializer import serialize_products
+from app.services.order_serializer import serialize_vendor_orders
+from app.services.search_service import apply_search, highlights
+from app.services.pagination_service import paginate, InvalidCursor
+from app.services.claims_service import vendor_required, current_vendor_id, invalidate_claims, publish_claims
+from app.services.stats_service import record, record_product_active
+from app.services.analytics_service import parse_report_args, sales_report, InvalidReport
 
 
 
 from marshmallow import Schema, fields, ValidationError
-from sqlalchemy import or_
+from sqlalchemy import or_, func
 import os
 from werkzeug.utils import secure_filename
 from decimal import Decimal
@@ -74,7 +82,10 @@ def apply_as_vendor():
         )
         
         db.session.add(vendor)
+        record(vendors=1, pending_vendors=1)
+        invalidate_claims(user)
         db.session.commit()
+        publish_claims(user)
         
         return jsonify({
             'message': 'Vendor application submitted successfully',
@@ -86,39 +97,58 @@ def apply_as_vendor():
         return jsonify({'error': 'Application failed', 'message': str(e)}), 500
 
 @vendors_bp.route('', methods=['GET'])
+@cache.cached('vendors')
 def get_vendors():
     """Get list of approved vendors"""
-    page = request.args.get('page', 1, type=int)
     per_page = request.args.get('per_page', 12, type=int)
     search = request.args.get('search', '')
+    search_mode = request.args.get('search_mode', 'fulltext')
+    sort_by = request.args.get('sort_by', 'newest')
     
     query = Vendor.query.filter_by(status=VendorStatus.APPROVED)
     
-    if search:
+    rank = None
+    if search and search_mode == 'ilike':
         query = query.filter(
             or_(
                 Vendor.name.ilike(f'%{search}%'),
                 Vendor.description.ilike(f'%{search}%')
             )
         )
+    elif search:
+        query, rank = apply_search(query, Vendor, search)
     
-    vendors = query.order_by(Vendor.created_at.desc()).paginate(
-        page=page, per_page=per_page, error_out=False
-    )
+    if sort_by == 'relevance' and rank is not None:
+        if 'cursor' in request.args:
+            return jsonify({'error': 'Relevance sorting does not support cursor pagination'}), 400
+        sort_column = rank
+    else:
+        sort_column = Vendor.created_at
+    
+    try:
+        vendors, pagination = paginate(query, sort_column, per_page=per_page)
+    except InvalidCursor as e:
+        return jsonify({'error': str(e)}), 400
+    
+    vendors_data = [vendor.to_dict() for vendor in vendors]
+    
+    if rank is not None:
+        snippets = highlights(
+            Vendor,
+            [vendor.id for vendor in vendors],
+            search,
+            func.concat_ws(' - ', Vendor.name, Vendor.description)
+        )
+        for vendor_data in vendors_data:
+            vendor_data['search_highlight'] = snippets.get(vendor_data['id'])
     
     return jsonify({
-        'vendors': [vendor.to_dict() for vendor in vendors.items],
-        'pagination': {
-            'page': page,
-            'pages': vendors.pages,
-            'per_page': per_page,
-            'total': vendors.total,
-            'has_next': vendors.has_next,
-            'has_prev': vendors.has_prev
-        }
+        'vendors': vendors_data,
+        'pagination': pagination
     }), 200
 
 @vendors_bp.route('/<int:vendor_id>', methods=['GET'])
+@cache.cached('vendors')
 def get_vendor(vendor_id):
     """Get vendor details"""
     vendor = Vendor.query.get(vendor_id)
@@ -170,6 +200,7 @@ def update_my_vendor():
             vendor.banner = data['banner']
         
         db.session.commit()
+        cache.bump('vendors')
         
         return jsonify({
             'message': 'Vendor profile updated successfully',
@@ -221,23 +252,16 @@ def update_my_vendor():
 # ====== AWS ======
 
 @vendors_bp.route('/products', methods=['GET'])
-@jwt_required()
+@vendor_required
 def get_vendor_products():
     """Get current vendor's products"""
-    user_id = get_jwt_identity()
-    vendor = Vendor.query.filter_by(user_id=user_id).first()
-    
-    if not vendor:
-        return jsonify({'error': 'Vendor profile not found'}), 404
-    
-    if vendor.status != VendorStatus.APPROVED:
-        return jsonify({'error': 'Vendor not approved'}), 403
+    vendor_id = current_vendor_id()
     
     page = request.args.get('page', 1, type=int)
     per_page = request.args.get('per_page', 20, type=int)
     include_inactive = request.args.get('include_inactive', 'false').lower() == 'true'
     
-    query = Product.query.filter_by(vendor_id=vendor.id)
+    query = Product.query.filter_by(vendor_id=vendor_id)
     if not include_inactive:
         query = query.filter_by(is_active=True)
     
@@ -246,7 +270,7 @@ def get_vendor_products():
     )
     
     # Convert products to dict - this will include S3 URLs from image_list
-    products_data = [product.to_dict() for product in products.items]
+    products_data = serialize_products(products.items)
     
     print(f"📦 Retrieved {len(products_data)} products with S3 image URLs")
     
@@ -508,8 +532,11 @@ def create_vendor_product():
         else:
             print("⚠️ No images were uploaded")
         
+        product.refresh_listable(vendor)
         db.session.add(product)
+        record_product_active(None, product.is_active)
         db.session.commit()
+        cache.bump('products')
         
         return jsonify({
             'message': 'Product created successfully',
@@ -764,19 +791,12 @@ def create_vendor_product():
     # ============ AWS========
 
 @vendors_bp.route('/products/<int:product_id>', methods=['PUT'])
-@jwt_required()
+@vendor_required
 def update_vendor_product(product_id):
     """Update a product for the current vendor with S3 support"""
-    user_id = get_jwt_identity()
-    vendor = Vendor.query.filter_by(user_id=user_id).first()
-    
-    if not vendor:
-        return jsonify({'error': 'Vendor profile not found'}), 404
-    
-    if vendor.status != VendorStatus.APPROVED:
-        return jsonify({'error': 'Vendor not approved'}), 403
+    vendor_id = current_vendor_id()
     
-    product = Product.query.filter_by(id=product_id, vendor_id=vendor.id).first()
+    product = Product.query.filter_by(id=product_id, vendor_id=vendor_id).first()
     if not product:
         return jsonify({'error': 'Product not found or access denied'}), 404
     
@@ -837,7 +857,10 @@ def update_vendor_product(product_id):
             else:
                 return jsonify({'error': f'Category "{category_name}" not found'}), 400
         if 'is_active' in data:
+            was_active = product.is_active
             product.is_active = data['is_active'].lower() == 'true' if isinstance(data['is_active'], str) else bool(data['is_active'])
+            record_product_active(was_active, product.is_active)
+            product.refresh_listable()
         
         # Update images - combine existing (minus removed) with new images
         if new_images or current_images != (product.image_list or []):
@@ -846,6 +869,7 @@ def update_vendor_product(product_id):
             print(f"📸 Updated product images: {final_images}")
         
         db.session.commit()
+        cache.bump('products')
         
         return jsonify({
             'message': 'Product updated successfully',
@@ -861,26 +885,22 @@ def update_vendor_product(product_id):
 
 
 @vendors_bp.route('/products/<int:product_id>', methods=['DELETE'])
-@jwt_required()
+@vendor_required
 def delete_vendor_product(product_id):
     """Delete a product for the current vendor"""
-    user_id = get_jwt_identity()
-    vendor = Vendor.query.filter_by(user_id=user_id).first()
+    vendor_id = current_vendor_id()
     
-    if not vendor:
-        return jsonify({'error': 'Vendor profile not found'}), 404
-    
-    if vendor.status != VendorStatus.APPROVED:
-        return jsonify({'error': 'Vendor not approved'}), 403
-    
-    product = Product.query.filter_by(id=product_id, vendor_id=vendor.id).first()
+    product = Product.query.filter_by(id=product_id, vendor_id=vendor_id).first()
     if not product:
         return jsonify({'error': 'Product not found or access denied'}), 404
     
     try:
         # Soft delete - mark as inactive
+        record_product_active(product.is_active, False)
         product.is_active = False
+        product.refresh_listable()
         db.session.commit()
+        cache.bump('products')
         
         return jsonify({'message': 'Product deleted successfully'}), 200
         
@@ -889,35 +909,33 @@ def delete_vendor_product(product_id):
         return jsonify({'error': 'Product deletion failed', 'message': str(e)}), 500
 
 @vendors_bp.route('/orders', methods=['GET'])
-@jwt_required()
+@vendor_required
 def get_vendor_orders():
     """Get current vendor's orders"""
-    user_id = get_jwt_identity()
-    vendor = Vendor.query.filter_by(user_id=user_id).first()
-    
-    if not vendor:
-        return jsonify({'error': 'Vendor profile not found'}), 404
-    
-    if vendor.status != VendorStatus.APPROVED:
-        return jsonify({'error': 'Vendor not approved'}), 403
+    vendor_id = current_vendor_id()
     
     page = request.args.get('page', 1, type=int)
     status_filter = request.args.get('status', None)
+    summary = request.args.get('summary', 'false').lower() == 'true'
     
-    # Base query
-    query = Order.query.filter_by(vendor_id=vendor.id)
+    # Base query - the vendor's sub-orders, newest first from
+    # ix_vendor_orders_vendor_created (or the status index when filtered)
+    query = VendorOrder.query.filter_by(vendor_id=vendor_id)
     
     # Apply status filter if provided
     if status_filter:
-        query = query.filter_by(status=status_filter)
+        try:
+            query = query.filter_by(status=OrderStatus(status_filter))
+        except ValueError:
+            return jsonify({'error': 'Invalid status'}), 400
     
     # Paginate results
-    orders = query.order_by(Order.created_at.desc()).paginate(
+    orders = query.order_by(VendorOrder.created_at.desc(), VendorOrder.id.desc()).paginate(
         page=page, per_page=10, error_out=False
     )
     
     return jsonify({
-        'orders': [order.to_dict() for order in orders.items],
+        'orders': serialize_vendor_orders(orders.items, summary=summary),
         'pagination': {
             'page': page,
             'pages': orders.pages,
@@ -926,4 +944,20 @@ def get_vendor_orders():
             'has_next': orders.has_next,
             'has_prev': orders.has_prev
         }
-    }), 200
\ No newline at end of file
+    }), 200
+
+@vendors_bp.route('/analytics/sales', methods=['GET'])
+@vendor_required
+def get_vendor_sales_analytics():
+    """Get current vendor's sales over time and by category"""
+    try:
+        start, end, interval = parse_report_args(request.args)
+    except InvalidReport as e:
+        return jsonify({'error': str(e)}), 400
+    
+    report = sales_report(
+        start, end, interval,
+        vendor_id=current_vendor_id(),
+        category_id=request.args.get('category_id', type=int)
+    )
+    return jsonify(report), 200
@@ -0,0 +1,234 @@
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from sqlalchemy import select, delete, func, distinct, cast, literal_column, text
+from sqlalchemy.dialects.postgresql import insert
+from app.extensions import db
+from app.models.stats import DailySales
+from app.models.order import Order, OrderItem
+from app.models.product import Product
+from app.models.vendor import Vendor
+from app.models.category import Category
+from app.services.stats_service import REVENUE_STATUSES
+
+INTERVALS = ('day', 'week', 'month')
+
+# Longest date range one report may span
+MAX_REPORT_DAYS = 3 * 366
+
+# Vendors listed in the admin report's breakdown
+TOP_VENDORS = 10
+
+
+class InvalidReport(ValueError):
+    """Raised when a sales report's dates or interval can't be used"""
+
+
+def _sales_rows():
+    """Per day, vendor and category sales of the order lines, before filtering.
+
+    Lines sold before the product snapshot existed fall back to the
+    product's current vendor and category.
+    """
+    day = func.date(Order.created_at)
+    vendor_id = func.coalesce(OrderItem.vendor_id, Product.vendor_id)
+    category_id = func.coalesce(OrderItem.category_id, Product.category_id)
+    return (
+        select(
+            day.label('day'),
+            vendor_id.label('vendor_id'),
+            category_id.label('category_id'),
+            func.count(distinct(Order.id)).label('orders'),
+            func.sum(OrderItem.quantity).label('units'),
+            func.sum(OrderItem.total_price).label('revenue')
+        )
+        .select_from(OrderItem)
+        .join(Order, Order.id == OrderItem.order_id)
+        .join(Product, Product.id == OrderItem.product_id)
+        .group_by(day, vendor_id, category_id)
+        # Upserts lock the rollup rows in key order, so concurrent status
+        # changes can't deadlock on them
+        .order_by(day, vendor_id, category_id)
+    )
+
+
+def record_order_sales(order, old, new):
+    """Add (or take back) an order's lines in the rollup when it starts (or
+    stops) counting as a sale, in the current transaction.
+
+    ``old`` is None for a new order. The lines must be in the session.
+    """
+    sign = int(new in REVENUE_STATUSES) - int(old in REVENUE_STATUSES)
+    if not sign:
+        return
+
+    rows = _sales_rows().where(OrderItem.order_id == order.id).subquery()
+    table = DailySales.__table__
+    statement = insert(table).from_select(
+        ['day', 'vendor_id', 'category_id', 'orders', 'units', 'revenue'],
+        select(
+            rows.c.day, rows.c.vendor_id, rows.c.category_id,
+            rows.c.orders * sign, rows.c.units * sign, rows.c.revenue * sign
+        )
+    )
+    db.session.execute(statement.on_conflict_do_update(
+        index_elements=[table.c.day, table.c.vendor_id, table.c.category_id],
+        set_={
+            'orders': table.c.orders + statement.excluded.orders,
+            'units': table.c.units + statement.excluded.units,
+            'revenue': table.c.revenue + statement.excluded.revenue
+        }
+    ))
+
+
+def rebuild_daily_sales(start=None, end=None):
+    """Recompute the rollup from the order lines and commit.
+
+    Covers the days from ``start`` to ``end`` inclusive, or all of history
+    by default, in one INSERT ... SELECT. The rollup is locked against
+    writers first, so a status change the rebuild misses adds its lines
+    after it. Returns the number of rows written.
+    """
+    db.session.execute(text('LOCK TABLE daily_sales IN EXCLUSIVE MODE'))
+
+    stale = delete(DailySales)
+    rows = _sales_rows().where(Order.status.in_(REVENUE_STATUSES))
+    if start:
+        stale = stale.where(DailySales.day >= start)
+        rows = rows.where(Order.created_at >= start)
+    if end:
+        stale = stale.where(DailySales.day <= end)
+        rows = rows.where(Order.created_at < end + timedelta(days=1))
+
+    db.session.execute(stale)
+    written = db.session.execute(insert(DailySales).from_select(
+        ['day', 'vendor_id', 'category_id', 'orders', 'units', 'revenue'], rows
+    )).rowcount
+    db.session.commit()
+    return written
+
+
+def parse_report_args(args):
+    """Read ``from``, ``to`` (YYYY-MM-DD, default the last 30 days) and
+    ``interval`` from the query string"""
+    try:
+        end = date.fromisoformat(args['to']) if args.get('to') else datetime.utcnow().date()
+        start = date.fromisoformat(args['from']) if args.get('from') else end - timedelta(days=29)
+    except ValueError:
+        raise InvalidReport('Dates must be given as YYYY-MM-DD')
+
+    if start > end:
+        raise InvalidReport("'from' must not be after 'to'")
+    if (end - start).days >= MAX_REPORT_DAYS:
+        raise InvalidReport(f'A report can span at most {MAX_REPORT_DAYS} days')
+
+    interval = args.get('interval', 'day')
+    if interval not in INTERVALS:
+        raise InvalidReport(f"interval must be one of {', '.join(INTERVALS)}")
+    return start, end, interval
+
+
+def _period_start(day, interval):
+    if interval == 'week':
+        return day - timedelta(days=day.weekday())
+    if interval == 'month':
+        return day.replace(day=1)
+    return day
+
+
+def _next_period(period, interval):
+    if interval == 'week':
+        return period + timedelta(weeks=1)
+    if interval == 'month':
+        return (period.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return period + timedelta(days=1)
+
+
+def _totals():
+    return (
+        func.coalesce(func.sum(DailySales.orders), 0).label('orders'),
+        func.coalesce(func.sum(DailySales.units), 0).label('units'),
+        func.coalesce(func.sum(DailySales.revenue), 0).label('revenue')
+    )
+
+
+def _sales(row):
+    return {'orders': int(row.orders), 'units': int(row.units), 'revenue': float(row.revenue)}
+
+
+def sales_report(start, end, interval='day', vendor_id=None, category_id=None, by_vendor=False):
+    """Sales per period from the daily rollup, with totals and a breakdown
+    by category (and the top vendors when ``by_vendor``).
+
+    Every period in the range is listed, empty ones with zeros, so charts
+    don't have to fill gaps. An order with lines from several vendors or
+    categories counts once in each, so order counts add up across a
+    breakdown only when the report is narrowed to one vendor and category.
+    """
+    filters = [DailySales.day.between(start, end)]
+    if vendor_id is not None:
+        filters.append(DailySales.vendor_id == vendor_id)
+    if category_id is not None:
+        filters.append(DailySales.category_id == category_id)
+
+    if interval == 'day':
+        period = DailySales.day
+    else:
+        # interval is one of INTERVALS, so it is safe to inline; a bound
+        # parameter would make GROUP BY differ from the select list
+        period = cast(func.date_trunc(literal_column(f"'{interval}'"), DailySales.day), db.Date)
+    rows = {
+        row.period: row
+        for row in db.session.execute(
+            select(period.label('period'), *_totals()).where(*filters).group_by(period)
+        )
+    }
+
+    series = []
+    totals = {'orders': 0, 'units': 0, 'revenue': Decimal(0)}
+    current = _period_start(start, interval)
+    while current <= end:
+        row = rows.get(current)
+        if row is None:
+            series.append({'period': current.isoformat(), 'orders': 0, 'units': 0, 'revenue': 0.0})
+        else:
+            series.append({'period': current.isoformat(), **_sales(row)})
+            totals['orders'] += row.orders
+            totals['units'] += row.units
+            totals['revenue'] += row.revenue
+        current = _next_period(current, interval)
+
+    categories = db.session.execute(
+        select(DailySales.category_id, Category.name, *_totals())
+        .outerjoin(Category, Category.id == DailySales.category_id)
+        .where(*filters)
+        .group_by(DailySales.category_id, Category.name)
+        .order_by(literal_column('revenue').desc())
+    ).all()
+
+    report = {
+        'from': start.isoformat(),
+        'to': end.isoformat(),
+        'interval': interval,
+        'series': series,
+        'totals': {**totals, 'revenue': float(totals['revenue'])},
+        'categories': [
+            {'category_id': row.category_id, 'category_name': row.name, **_sales(row)}
+            for row in categories
+        ]
+    }
+
+    if by_vendor:
+        vendors = db.session.execute(
+            select(DailySales.vendor_id, Vendor.name, *_totals())
+            .outerjoin(Vendor, Vendor.id == DailySales.vendor_id)
+            .where(*filters)
+            .group_by(DailySales.vendor_id, Vendor.name)
+            .order_by(literal_column('revenue').desc())
+            .limit(TOP_VENDORS)
+        ).all()
+        report['vendors'] = [
+            {'vendor_id': row.vendor_id, 'vendor_name': row.name, **_sales(row)}
+            for row in vendors
+        ]
+
+    return report
@@ -0,0 +1,245 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from flask import request, current_app
+
+
+class LRUCacheBackend:
+    """In-process LRU store.
+
+    Entries and version counters live in the worker's memory, so a write
+    handled by one gunicorn worker does not invalidate another's entries.
+    Use it with a single worker (the Procfile default) or in development.
+    """
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        # Counters are kept apart so LRU eviction can never reset a version
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key in self._counters:
+                return self._counters[key]
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at is not None and expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def get_many(self, keys):
+        return [self.get(key) for key in keys]
+
+    def set(self, key, value, ttl=None):
+        expires_at = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def incr(self, key):
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + 1
+            return self._counters[key]
+
+
+class RedisCacheBackend:
+    """Store backed by any client speaking the Redis protocol.
+
+    Shared by every worker, so version bumps invalidate cluster-wide.
+    Version counters carry no TTL; run Redis with a volatile-* eviction
+    policy so they are never evicted ahead of the cached responses.
+    """
+
+    def __init__(self, client, prefix='marche:'):
+        self.client = client
+        self.prefix = prefix
+
+    def get(self, key):
+        return self.client.get(self.prefix + key)
+
+    def get_many(self, keys):
+        return self.client.mget([self.prefix + key for key in keys])
+
+    def set(self, key, value, ttl=None):
+        self.client.set(self.prefix + key, value, ex=ttl)
+
+    def incr(self, key):
+        return self.client.incr(self.prefix + key)
+
+
+class FakeRedis:
+    """Minimal in-memory stand-in for redis.Redis.
+
+    Implements the handful of commands the cache and rate limiter use, with
+    the same return types (bytes values, int counters), so the Redis code
+    path can run locally without a server.
+    """
+
+    def __init__(self):
+        self._data = {}
+        self._expiry = {}
+        self._lock = threading.Lock()
+
+    def _alive(self, key):
+        expires_at = self._expiry.get(key)
+        if expires_at is not None and expires_at <= time.time():
+            self._data.pop(key, None)
+            self._expiry.pop(key, None)
+        return key in self._data
+
+    @staticmethod
+    def _encode(value):
+        if isinstance(value, bytes):
+            return value
+        return str(value).encode()
+
+    def get(self, key):
+        with self._lock:
+            return self._data[key] if self._alive(key) else None
+
+    def mget(self, keys):
+        with self._lock:
+            return [self._data[key] if self._alive(key) else None for key in keys]
+
+    def set(self, key, value, ex=None, nx=False):
+        with self._lock:
+            if nx and self._alive(key):
+                return None
+            self._data[key] = self._encode(value)
+            if ex:
+                self._expiry[key] = time.time() + ex
+            else:
+                self._expiry.pop(key, None)
+            return True
+
+    def incr(self, key, amount=1):
+        with self._lock:
+            value = int(self._data[key]) + amount if self._alive(key) else amount
+            self._data[key] = self._encode(value)
+            return value
+
+    def expire(self, key, seconds):
+        with self._lock:
+            if not self._alive(key):
+                return False
+            self._expiry[key] = time.time() + seconds
+            return True
+
+    def delete(self, *keys):
+        with self._lock:
+            removed = 0
+            for key in keys:
+                if self._alive(key):
+                    del self._data[key]
+                    self._expiry.pop(key, None)
+                    removed += 1
+            return removed
+
+
+def create_backend(name, redis_url=None, max_entries=1024):
+    """Build a cache backend from its configuration name"""
+    if name == 'memory':
+        return LRUCacheBackend(max_entries=max_entries)
+    if name == 'fakeredis':
+        return RedisCacheBackend(FakeRedis())
+    if name == 'redis':
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError("The 'redis' backend requires the redis package (pip install redis)") from e
+        return RedisCacheBackend(redis.Redis.from_url(redis_url))
+    raise ValueError(f'Unknown cache backend: {name}')
+
+
+class ResponseCache:
+    """Cache for public GET responses, invalidated by entity versions.
+
+    Every cached response is keyed on the endpoint, its normalized query
+    arguments and the current version counter of each entity it depends
+    on. Write paths call bump() after committing, which moves readers to
+    fresh keys; the stale entries are never read again and age out.
+    """
+
+    def __init__(self, app=None):
+        self.backend = None
+        self.default_ttl = 300
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        name = app.config.get('CACHE_BACKEND', 'memory')
+        if name == 'memory' and app.config.get('CACHE_ENABLED', True) and app.config.get('WEB_CONCURRENCY', 1) > 1:
+            # A bump in one worker would leave the others serving stale listings
+            raise RuntimeError(
+                'CACHE_BACKEND=memory is per process and WEB_CONCURRENCY is above 1; '
+                'use CACHE_BACKEND=redis or set CACHE_ENABLED=false'
+            )
+        self.backend = create_backend(
+            name,
+            redis_url=app.config.get('CACHE_REDIS_URL'),
+            max_entries=app.config.get('CACHE_MAX_ENTRIES', 1024)
+        )
+        self.default_ttl = app.config.get('CACHE_DEFAULT_TTL', 300)
+        app.extensions['response_cache'] = self
+
+    def versions(self, entities):
+        values = self.backend.get_many([f'version:{entity}' for entity in entities])
+        return [int(value) if value is not None else 0 for value in values]
+
+    def bump(self, *entities):
+        """Invalidate every cached response that depends on these entities"""
+        for entity in entities:
+            self.backend.incr(f'version:{entity}')
+
+    def response_key(self, entities):
+        args = sorted((key, tuple(request.args.getlist(key))) for key in request.args)
+        view_args = sorted((request.view_args or {}).items())
+        raw = repr((request.endpoint, view_args, args, self.versions(entities)))
+        return 'response:' + hashlib.sha1(raw.encode()).hexdigest()
+
+    def cached(self, *entities, ttl=None):
+        """Cache a view's successful JSON responses.
+
+        A response's ETag is stored alongside its body, so a hit can answer
+        If-None-Match with a 304 without reaching the view.
+        """
+        def decorator(view):
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                if not current_app.config.get('CACHE_ENABLED', True):
+                    return view(*args, **kwargs)
+
+                key = self.response_key(entities)
+                body, etag = self.backend.get_many([key, key + ':etag'])
+                if body is not None:
+                    etag = etag.decode() if isinstance(etag, bytes) else etag
+                    if etag and request.if_none_match.contains_weak(etag):
+                        response = current_app.response_class(status=304)
+                    else:
+                        response = current_app.response_class(body, status=200, mimetype='application/json')
+                    if etag:
+                        response.set_etag(etag)
+                    response.headers['X-Cache'] = 'HIT'
+                    return response
+
+                response = current_app.make_response(view(*args, **kwargs))
+                if response.status_code == 200:
+                    expires = ttl or self.default_ttl
+                    etag, _ = response.get_etag()
+                    if etag:
+                        self.backend.set(key + ':etag', etag, expires)
+                    self.backend.set(key, response.get_data(), expires)
+                    response.headers['X-Cache'] = 'MISS'
+                return response
+            return wrapper
+        return decorator
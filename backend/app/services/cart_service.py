@@ -0,0 +1,177 @@
+from datetime import datetime
+from decimal import Decimal
+from sqlalchemy import select, literal, literal_column, func, values, column
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import aliased, contains_eager
+from app.extensions import db
+from app.models.cart import CartItem, CartHold
+from app.models.product import Product
+from app.models.vendor import Vendor
+from app.models.category import Category
+
+
+def _conflicting_available():
+    """Units the cart line an ON CONFLICT clause is updating may grow to.
+
+    That is the product's unheld stock plus whatever the user already
+    holds of it (see app.services.hold_service); without holds it is just
+    the stock. Spelled out against ``excluded``: SQLAlchemy won't
+    correlate a subquery to that pseudo-table and would add it to FROM.
+    """
+    products = Product.__table__
+    holds = CartHold.__table__
+    own_hold = select(holds.c.quantity).where(
+        holds.c.user_id == literal_column('excluded.user_id'),
+        holds.c.product_id == literal_column('excluded.product_id')
+    ).scalar_subquery()
+
+    return select(
+        products.c.stock - products.c.reserved + func.coalesce(own_hold, 0)
+    ).where(
+        products.c.id == literal_column('excluded.product_id')
+    ).scalar_subquery()
+
+
+def add_item(user_id, product_id, quantity):
+    """Add quantity of a product to a user's cart in one upsert.
+
+    The product must be active and the resulting cart quantity must not
+    exceed its available stock; both are checked inside the statement, so
+    double submits can neither trip ``unique_user_product`` nor overshoot
+    the stock. Returns the cart item's ``(id, quantity)``, or None when
+    nothing was written.
+    """
+    table = CartItem.__table__
+    products = Product.__table__
+    now = datetime.utcnow()
+
+    source = select(
+        literal(user_id, db.Integer), products.c.id, literal(quantity, db.Integer), literal(now), literal(now)
+    ).where(
+        products.c.id == product_id,
+        products.c.is_active == True,
+        products.c.stock - products.c.reserved >= quantity
+    )
+    statement = insert(table).from_select(
+        ['user_id', 'product_id', 'quantity', 'created_at', 'updated_at'], source
+    )
+    statement = statement.on_conflict_do_update(
+        constraint='unique_user_product',
+        set_={
+            'quantity': table.c.quantity + statement.excluded.quantity,
+            'updated_at': statement.excluded.updated_at
+        },
+        where=table.c.quantity + statement.excluded.quantity <= _conflicting_available()
+    ).returning(table.c.id, table.c.quantity)
+
+    return db.session.execute(statement).first()
+
+
+def merge_items(user_id, quantities):
+    """Upsert ``{product_id: quantity}`` into a user's cart in one statement.
+
+    Meant for carrying a guest cart over after login: quantities add to
+    what the cart already contains, capped at each product's available
+    stock. Inactive, unknown and sold-out products are skipped. Returns
+    ``{product_id: new cart quantity}`` for the rows written.
+    """
+    if not quantities:
+        return {}
+
+    table = CartItem.__table__
+    products = Product.__table__
+    now = datetime.utcnow()
+
+    incoming = values(
+        column('product_id', db.Integer), column('quantity', db.Integer), name='incoming'
+    ).data(sorted(quantities.items()))
+
+    source = select(
+        literal(user_id, db.Integer),
+        products.c.id,
+        func.least(incoming.c.quantity, products.c.stock - products.c.reserved),
+        literal(now),
+        literal(now)
+    ).select_from(incoming).join(
+        products, products.c.id == incoming.c.product_id
+    ).where(
+        products.c.is_active == True,
+        products.c.stock - products.c.reserved > 0
+    )
+    statement = insert(table).from_select(
+        ['user_id', 'product_id', 'quantity', 'created_at', 'updated_at'], source
+    )
+    statement = statement.on_conflict_do_update(
+        constraint='unique_user_product',
+        set_={
+            'quantity': func.least(
+                table.c.quantity + statement.excluded.quantity, _conflicting_available()
+            ),
+            'updated_at': statement.excluded.updated_at
+        }
+    ).returning(table.c.product_id, table.c.quantity)
+
+    return dict(db.session.execute(statement).all())
+
+
+def load_cart(user_id):
+    """Load a user's cart with one joined query.
+
+    Each cart item comes back with its product, vendor, category and the
+    category's active product count, so serializing the cart needs no
+    further round trips however many items it holds. Returns
+    ``(items, subtotal)``: ``items`` is a list of ``(cart_item,
+    product_data, line_total)`` in the order the items were added, and
+    totals are Decimals computed from the product prices.
+    """
+    category_products = aliased(Product)
+    category_count = select(func.count(category_products.id)).where(
+        category_products.category_id == Category.id,
+        category_products.is_active == True
+    ).scalar_subquery()
+
+    rows = db.session.query(CartItem, category_count).join(
+        CartItem.product
+    ).join(
+        Product.vendor
+    ).outerjoin(
+        Product.category
+    ).options(
+        contains_eager(CartItem.product).contains_eager(Product.vendor),
+        contains_eager(CartItem.product).contains_eager(Product.category)
+    ).filter(
+        CartItem.user_id == user_id
+    ).order_by(CartItem.created_at, CartItem.id).all()
+
+    items = []
+    subtotal = Decimal('0.00')
+    for cart_item, product_count in rows:
+        product = cart_item.product
+        product_data = product.to_dict(
+            vendor_data=product.vendor.to_dict(),
+            category_data=product.category.to_dict(product_count=product_count) if product.category else None
+        )
+        line_total = product.price * cart_item.quantity
+        subtotal += line_total
+        items.append((cart_item, product_data, line_total))
+
+    return items, subtotal
+
+
+def cart_summary(user_id):
+    """Line count, unit count and subtotal of a user's cart in one aggregate query"""
+    lines, units, subtotal = db.session.query(
+        func.count(CartItem.id),
+        func.coalesce(func.sum(CartItem.quantity), 0),
+        func.coalesce(func.sum(Product.price * CartItem.quantity), 0)
+    ).join(
+        Product, CartItem.product_id == Product.id
+    ).filter(
+        CartItem.user_id == user_id
+    ).one()
+
+    return {
+        'item_count': lines,
+        'quantity': int(units),
+        'subtotal': Decimal(subtotal).quantize(Decimal('0.01'))
+    }
@@ -0,0 +1,131 @@
+from functools import wraps
+from flask import current_app, g, jsonify, request
+from flask_jwt_extended import create_access_token, get_jwt, jwt_required
+from sqlalchemy import select
+from app.extensions import db, cache
+from app.models.user import User, UserRole
+from app.models.vendor import Vendor, VendorStatus
+
+
+def identity_claims(user):
+    """Role and vendor claims for a user's access tokens"""
+    vendor = user.vendor
+    return {
+        'role': user.role.value,
+        'vendor_id': vendor.id if vendor else None,
+        'vendor_status': vendor.status.value if vendor else None,
+        'ver': user.token_version
+    }
+
+
+def access_token_for(user):
+    """Access token carrying the user's identity claims"""
+    return create_access_token(identity=str(user.id), additional_claims=identity_claims(user))
+
+
+def _version_key(user_id):
+    return f'token_version:{user_id}'
+
+
+def token_version(user_id, cached=True):
+    """Current claims version of a user, from the cache when it has it and
+    ``cached`` allows"""
+    if cached:
+        version = cache.backend.get(_version_key(user_id))
+        if version is not None:
+            return int(version)
+
+    version = db.session.execute(select(User.token_version).where(User.id == user_id)).scalar()
+    if version is not None:
+        cache.backend.set(_version_key(user_id), version, ttl=current_app.config.get('TOKEN_VERSION_CACHE_TTL', 60))
+    return version
+
+
+def invalidate_claims(user):
+    """Mark the claims in a user's outstanding tokens stale; commit, then publish_claims()"""
+    user.token_version = User.token_version + 1
+
+
+def publish_claims(user):
+    """Put a user's new claims version in the cache after the commit.
+
+    With the per-process memory cache other workers' reads notice within
+    TOKEN_VERSION_CACHE_TTL seconds; a shared cache backend sees it at once.
+    Writes always check the database (see current_claims).
+    """
+    db.session.refresh(user, ['token_version'])
+    cache.backend.set(
+        _version_key(user.id), user.token_version, ttl=current_app.config.get('TOKEN_VERSION_CACHE_TTL', 60)
+    )
+
+
+def current_claims():
+    """Role and vendor claims of the current request's access token.
+
+    Claims are trusted while their ``ver`` matches the user's claims
+    version. Tokens issued before an admin approved, rejected or suspended
+    the vendor, and tokens without claims, are answered from the database
+    instead. Reads compare against the cached version, which another
+    worker's memory cache may hold for TOKEN_VERSION_CACHE_TTL seconds;
+    writes read the version from the database, so a suspended vendor can't
+    change anything once the suspension commits. Returns None when the
+    user no longer exists.
+    """
+    claims = get_jwt()
+    # Memoized per decoded token; g can outlive a request in scripts
+    memo = g.get('identity_claims')
+    if memo is not None and memo[0] is claims:
+        return memo[1]
+
+    user_id = int(claims['sub'])
+    cached = request.method in ('GET', 'HEAD', 'OPTIONS')
+    if 'role' in claims and claims.get('ver') == token_version(user_id, cached=cached):
+        fresh = {key: claims[key] for key in ('role', 'vendor_id', 'vendor_status')}
+    else:
+        row = db.session.execute(
+            select(User.role, Vendor.id, Vendor.status).outerjoin(
+                Vendor, Vendor.user_id == User.id
+            ).where(User.id == user_id)
+        ).first()
+        fresh = None
+        if row is not None:
+            role, vendor_id, vendor_status = row
+            fresh = {
+                'role': role.value,
+                'vendor_id': vendor_id,
+                'vendor_status': vendor_status.value if vendor_status else None
+            }
+
+    g.identity_claims = (claims, fresh)
+    return fresh
+
+
+def current_vendor_id():
+    """Vendor id of the current user, for views behind @vendor_required"""
+    return current_claims()['vendor_id']
+
+
+def admin_required(view):
+    """Require an access token of an admin, authorized from its claims"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        claims = current_claims()
+        if not claims or claims['role'] != UserRole.ADMIN.value:
+            return jsonify({'error': 'Admin access required'}), 403
+        return view(*args, **kwargs)
+
+    return jwt_required()(wrapper)
+
+
+def vendor_required(view):
+    """Require an access token of an approved vendor, authorized from its claims"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        claims = current_claims()
+        if not claims or claims['vendor_id'] is None:
+            return jsonify({'error': 'Vendor profile not found'}), 404
+        if claims['vendor_status'] != VendorStatus.APPROVED.value:
+            return jsonify({'error': 'Vendor not approved'}), 403
+        return view(*args, **kwargs)
+
+    return jwt_required()(wrapper)
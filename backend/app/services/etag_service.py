@@ -0,0 +1,80 @@
+import hashlib
+from flask import request, current_app
+from sqlalchemy import func
+from sqlalchemy.orm import aliased
+from app.extensions import db
+from app.models.product import Product
+from app.models.vendor import Vendor
+from app.models.category import Category
+from app.models.order import Order
+
+
+def request_etag(*freshness):
+    """Build a strong ETag for the current request from cheap freshness values.
+
+    ``freshness`` is whatever changes whenever the response body would:
+    ``updated_at`` maxima and row counts, never the body itself. The
+    endpoint, view arguments and query string are folded in so each
+    distinct request gets its own tag.
+    """
+    args = sorted((key, tuple(request.args.getlist(key))) for key in request.args)
+    view_args = sorted((request.view_args or {}).items())
+    raw = repr((request.endpoint, view_args, args, freshness))
+    return hashlib.sha1(raw.encode()).hexdigest()
+
+
+def not_modified(etag):
+    """Return a 304 response when the client already holds etag, else None"""
+    if etag and request.if_none_match.contains_weak(etag):
+        response = current_app.response_class(status=304)
+        response.set_etag(etag)
+        return response
+    return None
+
+
+def catalog_freshness():
+    """Latest change to any product, vendor or category, in one round trip.
+
+    Serialized products embed their vendor and their category's active
+    product count. Products are only ever soft-deleted, so every change to
+    those counts touches some product's ``updated_at``; categories can be
+    hard-deleted, hence their row count.
+    """
+    return tuple(db.session.query(
+        db.session.query(func.max(Product.updated_at)).scalar_subquery(),
+        db.session.query(func.max(Vendor.updated_at)).scalar_subquery(),
+        db.session.query(func.max(Category.updated_at)).scalar_subquery(),
+        db.session.query(func.count(Category.id)).scalar_subquery()
+    ).one())
+
+
+def product_freshness(product_id):
+    """Freshness of one storefront product, or None when it isn't listed"""
+    category_products = aliased(Product)
+    row = db.session.query(
+        Product.updated_at,
+        Vendor.updated_at,
+        Category.updated_at,
+        db.session.query(func.count(category_products.id)).filter(
+            category_products.category_id == Product.category_id,
+            category_products.is_active == True
+        ).scalar_subquery()
+    ).join(Vendor, Product.vendor_id == Vendor.id).outerjoin(
+        Category, Product.category_id == Category.id
+    ).filter(
+        Product.id == product_id,
+        Product.is_listable == True
+    ).first()
+
+    return tuple(row) if row else None
+
+
+def orders_freshness(query):
+    """Row count and latest update of an order query.
+
+    Order items, product snapshots included, are never edited after
+    checkout, so the order's own ``updated_at`` covers them.
+    """
+    return tuple(query.with_entities(
+        func.count(Order.id), func.max(Order.updated_at)
+    ).order_by(None).one())
@@ -0,0 +1,173 @@
+import threading
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import select, delete, update, any_, literal, values, column
+from sqlalchemy.dialects.postgresql import ARRAY, insert
+from app.extensions import db
+from app.models.cart import CartHold
+from app.services.inventory_service import adjust_reserved
+
+
+def holds_enabled():
+    return current_app.config.get('CART_HOLDS_ENABLED', False)
+
+
+def _hold_expiry():
+    return datetime.utcnow() + timedelta(seconds=current_app.config.get('CART_HOLD_TTL', 900))
+
+
+def set_holds(user_id, targets):
+    """Hold exactly ``{product_id: quantity}`` units for a user's cart lines.
+
+    Placeholder rows are inserted first so that concurrent requests for
+    the same cart line queue on its row lock instead of both reading the
+    old hold. The products' ``reserved`` counters then move by the
+    difference, which raises InsufficientStock when the extra units are
+    not available. Held lines get a fresh expiry; a quantity of 0 drops
+    the hold. Locks are taken holds first, then products, everywhere.
+    Returns the new expiry.
+    """
+    expires_at = _hold_expiry()
+    if not targets:
+        return expires_at
+
+    user_id = int(user_id)
+    table = CartHold.__table__
+    ids = sorted(targets)
+
+    db.session.execute(insert(table).values([
+        {'user_id': user_id, 'product_id': product_id, 'quantity': 0, 'expires_at': expires_at}
+        for product_id in ids
+    ]).on_conflict_do_nothing(constraint='unique_user_product_hold'))
+
+    current = dict(db.session.execute(
+        select(table.c.product_id, table.c.quantity).where(
+            table.c.user_id == user_id,
+            table.c.product_id == any_(literal(ids, ARRAY(db.Integer)))
+        ).order_by(table.c.product_id).with_for_update()
+    ).all())
+
+    adjust_reserved({product_id: targets[product_id] - current.get(product_id, 0) for product_id in ids})
+
+    held = sorted((product_id, quantity) for product_id, quantity in targets.items() if quantity > 0)
+    if held:
+        new_quantities = values(
+            column('product_id', db.Integer), column('quantity', db.Integer), name='new_quantities'
+        ).data(held)
+        db.session.execute(update(table).where(
+            table.c.user_id == user_id,
+            table.c.product_id == new_quantities.c.product_id
+        ).values(quantity=new_quantities.c.quantity, expires_at=expires_at))
+
+    dropped = [product_id for product_id in ids if targets[product_id] <= 0]
+    if dropped:
+        db.session.execute(delete(table).where(
+            table.c.user_id == user_id,
+            table.c.product_id == any_(literal(dropped, ARRAY(db.Integer)))
+        ))
+
+    return expires_at
+
+
+def release_holds(user_id, product_ids=None):
+    """Drop a user's holds, all of them or those on product_ids.
+
+    The held units go back to being available. Returns ``{product_id:
+    quantity}`` of what was released.
+    """
+    table = CartHold.__table__
+    statement = delete(table).where(table.c.user_id == int(user_id))
+    if product_ids is not None:
+        ids = sorted(set(product_ids))
+        if not ids:
+            return {}
+        statement = statement.where(table.c.product_id == any_(literal(ids, ARRAY(db.Integer))))
+
+    released = dict(db.session.execute(statement.returning(table.c.product_id, table.c.quantity)).all())
+    adjust_reserved({product_id: -quantity for product_id, quantity in released.items()})
+    return released
+
+
+def take_holds(user_id, product_ids):
+    """Delete a user's holds on product_ids for checkout, leaving ``reserved`` alone.
+
+    The hold rows are locked first, in product order, like everywhere
+    else. Returns ``{product_id: quantity}``; the caller passes it to
+    inventory_service.reserve_stock(), which moves those units from
+    ``reserved`` straight into the sale. Until then the products still
+    count them as held, so no other checkout can take them.
+    """
+    ids = sorted(set(product_ids))
+    if not ids:
+        return {}
+
+    table = CartHold.__table__
+    mine = (table.c.user_id == int(user_id), table.c.product_id == any_(literal(ids, ARRAY(db.Integer))))
+    db.session.execute(select(table.c.id).where(*mine).order_by(table.c.product_id).with_for_update())
+    return dict(db.session.execute(delete(table).where(*mine).returning(table.c.product_id, table.c.quantity)).all())
+
+
+def sweep_expired_holds(batch_size):
+    """Release one batch of expired holds and commit; returns how many.
+
+    ``FOR UPDATE SKIP LOCKED`` lets several workers sweep side by side
+    and skips holds a cart request or checkout is using right now.
+    """
+    table = CartHold.__table__
+    expired = select(table.c.id).where(
+        table.c.expires_at < datetime.utcnow()
+    ).order_by(table.c.expires_at).limit(batch_size).with_for_update(skip_locked=True).scalar_subquery()
+
+    rows = db.session.execute(
+        delete(table).where(table.c.id.in_(expired)).returning(table.c.product_id, table.c.quantity)
+    ).all()
+
+    released = {}
+    for product_id, quantity in rows:
+        released[product_id] = released.get(product_id, 0) + quantity
+    adjust_reserved({product_id: -quantity for product_id, quantity in released.items()})
+
+    db.session.commit()
+    return len(rows)
+
+
+class HoldSweeper:
+    """Background thread that releases expired cart holds.
+
+    Every CART_HOLD_SWEEP_INTERVAL seconds it sweeps batches of
+    CART_HOLD_SWEEP_BATCH holds until a batch comes back short. Each
+    gunicorn worker runs one; they don't step on each other.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.interval = app.config.get('CART_HOLD_SWEEP_INTERVAL', 30)
+        self.batch_size = app.config.get('CART_HOLD_SWEEP_BATCH', 500)
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='cart-hold-sweeper', daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            with self.app.app_context():
+                try:
+                    while sweep_expired_holds(self.batch_size) == self.batch_size:
+                        pass
+                except Exception:
+                    db.session.rollback()
+                    self.app.logger.exception('Cart hold sweep failed')
+                finally:
+                    db.session.remove()
+
+
+def init_app(app):
+    """Start the sweeper, which CART_HOLD_SWEEPER turns on with cart holds"""
+    if app.config.get('CART_HOLD_SWEEPER', False):
+        sweeper = HoldSweeper(app)
+        sweeper.start()
+        app.extensions['cart_hold_sweeper'] = sweeper
@@ -0,0 +1,165 @@
+import hashlib
+import threading
+import time
+from datetime import datetime, timedelta
+from functools import wraps
+from flask import request, current_app, jsonify, g
+from flask_jwt_extended import get_jwt_identity
+from sqlalchemy import select, delete
+from sqlalchemy.dialects.postgresql import insert
+from app.extensions import db
+from app.models.idempotency import IdempotencyKey
+
+HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = 255
+
+_purge_lock = threading.Lock()
+_last_purge = 0.0
+
+
+def request_hash():
+    """Fingerprint of the current request, to detect a key reused for another one"""
+    digest = hashlib.sha256()
+    digest.update(f'{request.method} {request.endpoint}\n'.encode())
+    digest.update(request.get_data())
+    return digest.hexdigest()
+
+
+def _replay(row):
+    response = current_app.response_class(row.response_body, status=row.status_code, mimetype='application/json')
+    response.headers['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def _purge_expired():
+    """Delete one small batch of expired keys, at most once per interval per worker"""
+    global _last_purge
+    interval = current_app.config.get('IDEMPOTENCY_PURGE_INTERVAL', 60)
+    with _purge_lock:
+        if time.monotonic() - _last_purge < interval:
+            return
+        _last_purge = time.monotonic()
+
+    table = IdempotencyKey.__table__
+    expired = select(table.c.id).where(
+        table.c.expires_at < datetime.utcnow()
+    ).limit(current_app.config.get('IDEMPOTENCY_PURGE_BATCH', 500)).scalar_subquery()
+    db.session.execute(delete(table).where(table.c.id.in_(expired)))
+
+
+def remember(resource_id):
+    """Record what the current idempotent request created on its key row.
+
+    Call it before the view commits: the id then commits with the view's
+    writes, and if the worker dies before the response is stored, a retry
+    rebuilds the response from it (see ``idempotent(replay=...)``).
+    """
+    key_id = g.get('idempotency_key_id')
+    if key_id is not None:
+        table = IdempotencyKey.__table__
+        db.session.execute(table.update().where(table.c.id == key_id).values(resource_id=resource_id))
+
+
+def idempotent(view=None, *, replay=None):
+    """Make a JWT-protected POST view safe to retry with an Idempotency-Key.
+
+    The key row is inserted in the view's own session transaction, so it
+    commits, or rolls back, together with the view's writes: a request
+    whose writes were committed can't run again. A concurrent duplicate
+    blocks on the key's unique index until then. The response is stored
+    on the row right after the view returns, for 2xx and 4xx outcomes,
+    and replayed to later retries. A 5xx or an exception rolls back
+    whatever is uncommitted, the claim included, so the client can retry
+    for real. If the row was committed without a
+    response (the worker died in between, or the first request is still
+    finishing), ``replay(resource_id)`` rebuilds it from what the view
+    passed to remember(); without either, the retry gets a 409. Keys are
+    scoped to the user and expire after IDEMPOTENCY_KEY_TTL seconds.
+    Requests without the header run as usual.
+    """
+    if view is None:
+        return lambda view: idempotent(view, replay=replay)
+
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        key = request.headers.get(HEADER)
+        if not key:
+            return view(*args, **kwargs)
+
+        if len(key) > MAX_KEY_LENGTH:
+            return jsonify({'error': f'{HEADER} must be at most {MAX_KEY_LENGTH} characters'}), 400
+
+        user_id = int(get_jwt_identity())
+        fingerprint = request_hash()
+        now = datetime.utcnow()
+        table = IdempotencyKey.__table__
+        row = {
+            'user_id': user_id,
+            'key': key,
+            'endpoint': request.endpoint,
+            'request_hash': fingerprint,
+            'created_at': now,
+            'expires_at': now + timedelta(seconds=current_app.config.get('IDEMPOTENCY_KEY_TTL', 86400))
+        }
+
+        # Claim the key; an expired row for the same key is taken over
+        claim = insert(table).values(**row)
+        claim = claim.on_conflict_do_update(
+            constraint='unique_user_idempotency_key',
+            set_={
+                'endpoint': claim.excluded.endpoint,
+                'request_hash': claim.excluded.request_hash,
+                'status_code': None,
+                'response_body': None,
+                'resource_id': None,
+                'created_at': claim.excluded.created_at,
+                'expires_at': claim.excluded.expires_at
+            },
+            where=table.c.expires_at < now
+        ).returning(table.c.id)
+        claimed_id = db.session.execute(claim).scalar()
+
+        if claimed_id is None:
+            # Another request holds or held this key and has committed
+            existing = db.session.execute(
+                select(table).where(table.c.user_id == user_id, table.c.key == key)
+            ).one()
+            db.session.rollback()
+            if existing.request_hash != fingerprint:
+                return jsonify({'error': f'{HEADER} was already used for a different request'}), 422
+            if existing.status_code is not None:
+                return _replay(existing)
+            if replay is not None and existing.resource_id is not None:
+                response = current_app.make_response(replay(existing.resource_id))
+                response.headers['Idempotent-Replayed'] = 'true'
+                return response
+            return jsonify({'error': f'A request with this {HEADER} is still being processed'}), 409
+
+        g.idempotency_key_id = claimed_id
+        try:
+            response = current_app.make_response(view(*args, **kwargs))
+        except Exception:
+            db.session.rollback()
+            raise
+        finally:
+            g.pop('idempotency_key_id', None)
+
+        if response.status_code >= 500:
+            db.session.rollback()
+            return response
+
+        # The claim is still pending, or was committed with the view's
+        # writes; a view that rolled back (a 4xx) took it along, so the key
+        # is written again with the response
+        stored = {'status_code': response.status_code, 'response_body': response.get_data(as_text=True)}
+        updated = db.session.execute(table.update().where(table.c.id == claimed_id).values(**stored)).rowcount
+        if not updated:
+            db.session.execute(insert(table).values(**row, **stored).on_conflict_do_nothing(
+                constraint='unique_user_idempotency_key'
+            ))
+        _purge_expired()
+        db.session.commit()
+        return response
+
+    return wrapper
+
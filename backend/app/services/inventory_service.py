@@ -0,0 +1,145 @@
+from datetime import datetime
+from sqlalchemy import any_, literal, select, update, values, column, or_
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.orm.util import identity_key
+from app.extensions import db
+from app.models.product import Product
+
+
+class InsufficientStock(Exception):
+    """Raised when a reservation would take a product's stock below zero"""
+
+    def __init__(self, product_id):
+        super().__init__(f'Insufficient stock for product {product_id}')
+        self.product_id = product_id
+
+
+def lock_products(product_ids):
+    """Load and row-lock products with one ``SELECT ... FOR UPDATE``.
+
+    Checkout has to read its products anyway (prices, active flags, the
+    snapshot columns), so locking them costs no extra round trip. What the
+    lock buys is the order: rows are locked in primary-key order, so
+    concurrent checkouts touching overlapping products always queue the
+    same way. The stock UPDATE alone visits rows in whatever order its
+    join plan picks, and two multi-product checkouts could deadlock on it.
+    Overselling is prevented by the conditional UPDATE in reserve_stock(),
+    not by this lock. The locks are held until the transaction ends.
+    Returns ``{id: product}``.
+    """
+    ids = sorted(set(product_ids))
+    if not ids:
+        return {}
+
+    products = Product.query.filter(
+        Product.id == any_(literal(ids, ARRAY(db.Integer)))
+    ).order_by(Product.id).with_for_update().populate_existing().all()
+
+    return {product.id: product for product in products}
+
+
+def _adjust_stock(quantities, sign, held=None):
+    """Apply ``stock + sign * quantity`` to every product in one UPDATE ... FROM VALUES.
+
+    ``held`` (decrements only) is ``{product_id: units}`` of cart holds
+    being turned into the sale: they come off ``reserved`` in the same
+    UPDATE.
+    """
+    if not quantities:
+        return
+
+    held = held or {}
+    adjustments = values(
+        column('product_id', db.Integer), column('quantity', db.Integer), column('held', db.Integer),
+        name='adjustments'
+    ).data(sorted((product_id, quantity, held.get(product_id, 0)) for product_id, quantity in quantities.items()))
+
+    statement = update(Product.__table__).where(
+        Product.__table__.c.id == adjustments.c.product_id
+    ).values(
+        stock=Product.__table__.c.stock + sign * adjustments.c.quantity,
+        updated_at=datetime.utcnow()
+    ).returning(Product.__table__.c.id)
+
+    # A decrement only applies where enough stock is left that isn't held
+    # in other carts; the buyer's own held units count as theirs
+    if sign < 0:
+        statement = statement.where(
+            Product.__table__.c.stock - Product.__table__.c.reserved >= adjustments.c.quantity - adjustments.c.held
+        ).values(reserved=Product.__table__.c.reserved - adjustments.c.held)
+
+    updated = set(db.session.execute(statement).scalars())
+    for product_id in quantities:
+        if product_id not in updated:
+            raise InsufficientStock(product_id)
+
+    _expire(updated, ['stock', 'reserved', 'updated_at'])
+
+
+def _expire(product_ids, attributes):
+    """Expire attributes of loaded products after a bulk UPDATE changed them"""
+    for product_id in product_ids:
+        product = db.session.identity_map.get(identity_key(Product, product_id))
+        if product is not None:
+            db.session.expire(product, attributes)
+
+
+def reserve_stock(quantities, held=None):
+    """Take ``{product_id: quantity}`` out of stock, all or nothing.
+
+    The UPDATE is conditional on ``stock - reserved >= quantity - held``
+    (units held in other carts are not for sale), so even without a prior
+    lock_products() it can never oversell; InsufficientStock is raised for
+    the first product it could not decrement and the caller rolls back.
+    ``held`` is ``{product_id: units}`` of the buyer's holds, taken with
+    hold_service.take_holds(), which leave ``reserved`` in the same
+    statement, so they are never up for grabs in between.
+    """
+    _adjust_stock(quantities, -1, held)
+
+
+def release_stock(quantities):
+    """Put ``{product_id: quantity}`` back into stock"""
+    _adjust_stock(quantities, 1)
+
+
+def adjust_reserved(deltas):
+    """Apply ``{product_id: delta}`` to the products' held-unit counters.
+
+    Rows are locked in primary-key order first, like lock_products(). A
+    positive delta only applies while ``stock - reserved`` covers it;
+    otherwise InsufficientStock is raised and the caller rolls back.
+    """
+    deltas = {product_id: delta for product_id, delta in deltas.items() if delta}
+    if not deltas:
+        return
+
+    # FOR NO KEY UPDATE: inserting a cart line or hold takes a KEY SHARE
+    # lock on the product, which FOR UPDATE would deadlock against
+    ids = sorted(deltas)
+    db.session.execute(
+        select(Product.__table__.c.id).where(
+            Product.__table__.c.id == any_(literal(ids, ARRAY(db.Integer)))
+        ).order_by(Product.__table__.c.id).with_for_update(key_share=True)
+    )
+
+    adjustments = values(
+        column('product_id', db.Integer), column('delta', db.Integer), name='adjustments'
+    ).data(sorted(deltas.items()))
+
+    statement = update(Product.__table__).where(
+        Product.__table__.c.id == adjustments.c.product_id,
+        or_(
+            adjustments.c.delta <= 0,
+            Product.__table__.c.stock - Product.__table__.c.reserved >= adjustments.c.delta
+        )
+    ).values(
+        reserved=Product.__table__.c.reserved + adjustments.c.delta
+    ).returning(Product.__table__.c.id)
+
+    updated = set(db.session.execute(statement).scalars())
+    for product_id in deltas:
+        if product_id not in updated:
+            raise InsufficientStock(product_id)
+
+    _expire(updated, ['reserved'])
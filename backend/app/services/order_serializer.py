@@ -0,0 +1,88 @@
+from sqlalchemy import func
+from app.extensions import db
+from app.models.order import Order, OrderItem
+
+
+def serialize_orders(orders, summary=False):
+    """Serialize orders with a fixed number of queries.
+
+    All items of all orders are loaded with one query; each item carries
+    its own product snapshot, so no product, vendor or category rows are
+    read. With ``summary`` the items are left out and the item counts come
+    from a single grouped query instead. The output matches
+    Order.to_dict().
+    """
+    if not orders:
+        return []
+
+    order_ids = [order.id for order in orders]
+
+    if summary:
+        counts = dict(db.session.query(
+            OrderItem.order_id, func.sum(OrderItem.quantity)
+        ).filter(OrderItem.order_id.in_(order_ids)).group_by(OrderItem.order_id))
+        return [
+            order.to_dict(item_count=int(counts.get(order.id, 0)), summary=True)
+            for order in orders
+        ]
+
+    items = OrderItem.query.filter(OrderItem.order_id.in_(order_ids)).order_by(OrderItem.id).all()
+
+    items_by_order = {order_id: [] for order_id in order_ids}
+    for item in items:
+        items_by_order[item.order_id].append(item)
+
+    return [
+        order.to_dict(
+            items_data=[item.to_dict() for item in items_by_order[order.id]],
+            item_count=sum(item.quantity for item in items_by_order[order.id])
+        )
+        for order in orders
+    ]
+
+
+def serialize_order(order):
+    """Serialize a single order the same way"""
+    return serialize_orders([order])[0]
+
+
+def serialize_vendor_orders(vendor_orders, summary=False):
+    """Serialize vendor sub-orders as their parent orders, seen by the vendor.
+
+    Each entry is the parent order's dictionary with only the vendor's own
+    items, the vendor's item count, and the sub-order under
+    ``vendor_order``. Orders and items are loaded with one query each.
+    """
+    if not vendor_orders:
+        return []
+
+    orders = {
+        order.id: order
+        for order in Order.query.filter(Order.id.in_([vo.order_id for vo in vendor_orders]))
+    }
+
+    items_by_order = {}
+    if not summary:
+        # Each sub-order is one vendor's lines of one order
+        for vendor_order in vendor_orders:
+            items_by_order[(vendor_order.order_id, vendor_order.vendor_id)] = []
+        items = OrderItem.query.filter(
+            OrderItem.order_id.in_(list(orders)),
+            OrderItem.vendor_id.in_({vo.vendor_id for vo in vendor_orders})
+        ).order_by(OrderItem.id).all()
+        for item in items:
+            lines = items_by_order.get((item.order_id, item.vendor_id))
+            if lines is not None:
+                lines.append(item.to_dict())
+
+    serialized = []
+    for vendor_order in vendor_orders:
+        data = orders[vendor_order.order_id].to_dict(
+            items_data=items_by_order.get((vendor_order.order_id, vendor_order.vendor_id)),
+            item_count=vendor_order.item_count,
+            summary=summary
+        )
+        data['vendor_order'] = vendor_order.to_dict()
+        serialized.append(data)
+
+    return serialized
@@ -0,0 +1,117 @@
+import base64
+import json
+from datetime import datetime
+from decimal import Decimal
+from flask import request
+from sqlalchemy import tuple_
+
+
+class InvalidCursor(ValueError):
+    """Raised when a cursor is malformed or was issued for another sort"""
+
+
+def encode_cursor(sort_key, value, row_id):
+    """Build an opaque cursor pointing just after (value, row_id)"""
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    elif isinstance(value, Decimal):
+        value = str(value)
+
+    payload = json.dumps({'s': sort_key, 'v': value, 'id': row_id}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, sort_key, sort_column):
+    """Return the (value, id) a cursor points after, typed like sort_column"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if payload['s'] != sort_key:
+            raise InvalidCursor('Cursor does not match the requested sort')
+
+        python_type = sort_column.type.python_type
+        value = payload['v']
+        if python_type is datetime:
+            value = datetime.fromisoformat(value)
+        elif python_type is Decimal:
+            value = Decimal(value)
+        else:
+            value = python_type(value)
+
+        return value, int(payload['id'])
+    except InvalidCursor:
+        raise
+    except (ValueError, TypeError, KeyError, AttributeError, NotImplementedError) as e:
+        raise InvalidCursor('Invalid cursor') from e
+
+
+def paginate(query, sort_column, descending=True, tiebreaker=None, per_page=20, max_per_page=100):
+    """Order and paginate a query from the current request's arguments.
+
+    By default this is classic page/offset pagination with the usual
+    pagination dict. When the request carries a ``cursor`` argument (an
+    empty one starts from the top) it switches to keyset pagination:
+    rows are fetched with ``(sort_column, tiebreaker)`` compared against
+    the cursor, so deep pages cost the same as the first one, and the
+    total is only counted when ``include_total=true``.
+
+    ``tiebreaker`` defaults to the primary key of the queried entity and
+    always sorts in the same direction as ``sort_column``. ``per_page`` is
+    clamped to ``1..max_per_page`` in both modes.
+
+    Returns ``(items, pagination)``; raises InvalidCursor for bad cursors.
+    """
+    per_page = max(1, min(per_page, max_per_page))
+    if tiebreaker is None:
+        tiebreaker = query.column_descriptions[0]['entity'].id
+
+    if descending:
+        ordering = (sort_column.desc(), tiebreaker.desc())
+    else:
+        ordering = (sort_column.asc(), tiebreaker.asc())
+
+    if 'cursor' not in request.args:
+        page = request.args.get('page', 1, type=int)
+        result = query.order_by(*ordering).paginate(page=page, per_page=per_page, error_out=False)
+        return result.items, {
+            'page': page,
+            'pages': result.pages,
+            'per_page': per_page,
+            'total': result.total,
+            'has_next': result.has_next,
+            'has_prev': result.has_prev
+        }
+
+    sort_key = f"{sort_column.key}:{'desc' if descending else 'asc'}"
+    cursor = request.args.get('cursor')
+    include_total = request.args.get('include_total', 'false').lower() == 'true'
+
+    # Keyset comparisons can't see NULL sort values; the sort columns all
+    # have defaults, so this only guards against legacy rows.
+    keyset_query = query.filter(sort_column.isnot(None))
+    if cursor:
+        value, row_id = decode_cursor(cursor, sort_key, sort_column)
+        position = tuple_(sort_column, tiebreaker)
+        keyset_query = keyset_query.filter(
+            position < tuple_(value, row_id) if descending else position > tuple_(value, row_id)
+        )
+
+    rows = keyset_query.order_by(*ordering).limit(per_page + 1).all()
+    items = rows[:per_page]
+    has_next = len(rows) > per_page
+
+    next_cursor = None
+    if has_next:
+        last = items[-1]
+        next_cursor = encode_cursor(sort_key, getattr(last, sort_column.key), getattr(last, tiebreaker.key))
+
+    pagination = {
+        'per_page': per_page,
+        'cursor': cursor or None,
+        'next_cursor': next_cursor,
+        'has_next': has_next
+    }
+    if include_total:
+        pagination['total'] = query.order_by(None).count()
+
+    return items, pagination
@@ -0,0 +1,188 @@
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import bcrypt
+from flask import jsonify
+from werkzeug.security import generate_password_hash, check_password_hash, DEFAULT_PBKDF2_ITERATIONS
+from app.services.cache_service import FakeRedis
+
+DEFAULT_METHOD = 'pbkdf2:sha256:600000'
+
+# Parameters a method name leaves out, as werkzeug and bcrypt fill them in
+METHOD_DEFAULTS = {
+    'pbkdf2': ('sha256', DEFAULT_PBKDF2_ITERATIONS),
+    'scrypt': (2 ** 15, 8, 1),
+    'bcrypt': (12,),
+}
+
+
+class HashingBusy(Exception):
+    """Raised when the password hashing pool and its queue, or the shared
+    slots, are full"""
+
+    def __init__(self, retry_after):
+        super().__init__('Password hashing is busy')
+        self.retry_after = retry_after
+
+
+def hash_method(password_hash):
+    """Method and cost a stored hash was made with, in PASSWORD_HASH_METHOD form"""
+    if password_hash.startswith('$2'):
+        # $2b$<cost>$<salt and hash>
+        return f"bcrypt:{int(password_hash.split('$')[2])}"
+    return password_hash.split('$', 1)[0]
+
+
+def parse_method(method):
+    """``(name, *params)`` of a method with its defaults filled in, so
+    ``'scrypt'`` and ``'scrypt:32768:8:1'`` compare equal"""
+    name, *params = method.split(':')
+    if name not in METHOD_DEFAULTS:
+        raise ValueError(f'Unknown password hash method: {method}')
+    defaults = METHOD_DEFAULTS[name]
+    if len(params) > len(defaults):
+        raise ValueError(f'Too many parameters for {name}: {method}')
+    params += [str(value) for value in defaults[len(params):]]
+    try:
+        # Everything but pbkdf2's digest name is a number
+        return (name, *(value if isinstance(default, str) else int(value)
+                        for value, default in zip(params, defaults)))
+    except ValueError:
+        raise ValueError(f'Invalid parameters for {name}: {method}') from None
+
+
+def _hash(password, method):
+    if method.startswith('bcrypt:'):
+        rounds = int(method.split(':')[1])
+        return bcrypt.hashpw(password.encode(), bcrypt.gensalt(rounds=rounds)).decode()
+    return generate_password_hash(password, method=method)
+
+
+def _verify(password_hash, password):
+    if password_hash.startswith('$2'):
+        return bcrypt.checkpw(password.encode(), password_hash.encode())
+    return check_password_hash(password_hash, password)
+
+
+class SharedHashSlots:
+    """``limit`` hashing slots shared by every worker through a Redis-protocol store.
+
+    A slot is a key taken with ``SET NX`` and an expiry of ``lease``
+    seconds, so a worker that dies mid-hash only holds its slot until the
+    lease runs out; the lease must outlast the slowest hash. Acquiring
+    reads every slot with one MGET and claims a free one at random, so it
+    costs two round trips, plus one per slot lost to a concurrent claim.
+    """
+
+    def __init__(self, client, limit, lease=30, prefix='marche:password-hash:'):
+        self.client = client
+        self.lease = lease
+        self.keys = [f'{prefix}{index}' for index in range(limit)]
+
+    def acquire(self):
+        """Claim a free slot; returns its key, or None when all are taken"""
+        free = [key for key, holder in zip(self.keys, self.client.mget(self.keys)) if holder is None]
+        random.shuffle(free)
+        for key in free:
+            if self.client.set(key, 1, ex=self.lease, nx=True):
+                return key
+        return None
+
+    def release(self, key):
+        self.client.delete(key)
+
+
+def create_slots(name, limit, redis_url=None, lease=30):
+    """Build the shared hashing slots from their configuration name"""
+    if name == 'fakeredis':
+        return SharedHashSlots(FakeRedis(), limit, lease=lease)
+    if name == 'redis':
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError("The 'redis' store requires the redis package (pip install redis)") from e
+        return SharedHashSlots(redis.Redis.from_url(redis_url), limit, lease=lease)
+    raise ValueError(f'Unknown password hash store: {name}')
+
+
+class PasswordHasher:
+    """Password hashing on a small, bounded thread pool.
+
+    PASSWORD_HASH_METHOD picks the algorithm and cost of new hashes:
+    werkzeug's ``pbkdf2:sha256:<iterations>`` or ``scrypt:<n>:<r>:<p>``, or
+    ``bcrypt:<rounds>``. Hashes made another way still verify, and
+    needs_rehash() tells which ones to upgrade. The hashing functions
+    release the GIL, so PASSWORD_HASH_WORKERS caps how many cores a burst
+    of logins can take; once PASSWORD_HASH_QUEUE more requests are waiting
+    on top of those, further ones fail fast with HashingBusy instead of
+    piling up behind them.
+
+    That bound holds per process. PASSWORD_HASH_GLOBAL_LIMIT adds one
+    across every worker: each hash also takes one of that many
+    SharedHashSlots in Redis, and fails with HashingBusy when none is free.
+    """
+
+    def __init__(self, app=None):
+        self.method = DEFAULT_METHOD
+        self.retry_after = 1
+        self._executor = None
+        self._slots = None
+        self._shared = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        # Spelled out in full, as the stored hashes record it
+        self.method = ':'.join(map(str, parse_method(app.config.get('PASSWORD_HASH_METHOD', DEFAULT_METHOD))))
+
+        workers = app.config.get('PASSWORD_HASH_WORKERS', 2)
+        self.retry_after = app.config.get('PASSWORD_HASH_RETRY_AFTER', 1)
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-hash')
+        self._slots = threading.BoundedSemaphore(workers + app.config.get('PASSWORD_HASH_QUEUE', 16))
+        if app.config.get('PASSWORD_HASH_GLOBAL_LIMIT', 0) > 0:
+            self._shared = create_slots(
+                app.config.get('PASSWORD_HASH_STORE', 'redis'),
+                app.config['PASSWORD_HASH_GLOBAL_LIMIT'],
+                redis_url=app.config.get('PASSWORD_HASH_REDIS_URL'),
+                lease=app.config.get('PASSWORD_HASH_LEASE', 30)
+            )
+        app.register_error_handler(HashingBusy, self._busy)
+        app.extensions['password_hasher'] = self
+
+    @staticmethod
+    def _busy(error):
+        response = jsonify({'error': 'Too many sign-ins right now, please retry shortly'})
+        response.status_code = 503
+        response.headers['Retry-After'] = str(error.retry_after)
+        return response
+
+    def _run(self, function, *args):
+        if self._executor is None:
+            # Outside an app (e.g. a one-off script): hash inline
+            return function(*args)
+        if not self._slots.acquire(blocking=False):
+            raise HashingBusy(self.retry_after)
+        try:
+            shared = self._shared.acquire() if self._shared is not None else None
+            if self._shared is not None and shared is None:
+                raise HashingBusy(self.retry_after)
+            try:
+                return self._executor.submit(function, *args).result()
+            finally:
+                if shared is not None:
+                    self._shared.release(shared)
+        finally:
+            self._slots.release()
+
+    def hash(self, password):
+        return self._run(_hash, password, self.method)
+
+    def verify(self, password_hash, password):
+        return self._run(_verify, password_hash, password)
+
+    def needs_rehash(self, password_hash):
+        try:
+            return parse_method(hash_method(password_hash)) != parse_method(self.method)
+        except ValueError:
+            # A method we no longer hash with, e.g. werkzeug's legacy sha256
+            return True
@@ -0,0 +1,187 @@
+import json
+from sqlalchemy import func, any_, literal
+from sqlalchemy.dialects.postgresql import ARRAY
+from app.extensions import db
+from app.models.product import Product
+from app.models.vendor import Vendor
+from app.models.category import Category
+
+
+def category_product_counts(category_ids):
+    """Count active products for several categories in one grouped query"""
+    if not category_ids:
+        return {}
+
+    rows = db.session.query(
+        Product.category_id, func.count(Product.id)
+    ).filter(
+        Product.category_id.in_(category_ids),
+        Product.is_active == True
+    ).group_by(Product.category_id).all()
+
+    return {category_id: count for category_id, count in rows}
+
+
+def serialize_categories(categories):
+    """Serialize categories with their product counts computed in bulk"""
+    counts = category_product_counts([category.id for category in categories])
+    return [
+        category.to_dict(product_count=counts.get(category.id, 0))
+        for category in categories
+    ]
+
+
+def products_by_id(product_ids, listable_only=False):
+    """Fetch products by id with a single ``id = ANY(:ids)`` query.
+
+    Returns ``{id: product}``; ids that don't exist, or aren't listable
+    when ``listable_only`` is set, are simply absent from the result.
+    """
+    ids = list(dict.fromkeys(product_ids))
+    if not ids:
+        return {}
+
+    query = Product.query.filter(Product.id == any_(literal(ids, ARRAY(db.Integer))))
+    if listable_only:
+        query = query.filter(Product.is_listable == True)
+
+    return {product.id: product for product in query.all()}
+
+
+def serialize_products(products):
+    """Serialize a page of products without per-row lazy loading.
+
+    Vendors and categories are fetched with one IN query each and the
+    category product counts with one grouped query, so a page costs three
+    round trips no matter how many products it holds. The output matches
+    Product.to_dict().
+    """
+    if not products:
+        return []
+
+    vendor_ids = {product.vendor_id for product in products}
+    category_ids = {product.category_id for product in products}
+
+    vendors = {
+        vendor.id: vendor.to_dict()
+        for vendor in Vendor.query.filter(Vendor.id.in_(vendor_ids)).all()
+    }
+    categories = {
+        data['id']: data
+        for data in serialize_categories(
+            Category.query.filter(Category.id.in_(category_ids)).all()
+        )
+    }
+
+    return [
+        product.to_dict(
+            vendor_data=vendors.get(product.vendor_id),
+            category_data=categories.get(product.category_id)
+        )
+        for product in products
+    ]
+
+
+# Fields a sparse fieldset may ask for, by output name. 'image' (the first
+# image URL) and 'is_in_stock' are derived from the images and stock columns.
+SPARSE_COLUMNS = {
+    'id': (Product.id,),
+    'vendor_id': (Product.vendor_id,),
+    'category_id': (Product.category_id,),
+    'name': (Product.name,),
+    'description': (Product.description,),
+    'price': (Product.price,),
+    'image': (Product.images,),
+    'images': (Product.images,),
+    'stock': (Product.stock,),
+    'is_in_stock': (Product.stock,),
+    'rating': (Product.rating,),
+    'review_count': (Product.review_count,),
+    'is_featured': (Product.is_featured,),
+    'is_active': (Product.is_active,),
+    'created_at': (Product.created_at,),
+    'updated_at': (Product.updated_at,)
+}
+
+# Named fieldsets for view=
+PRODUCT_VIEWS = {
+    'card': ('id', 'name', 'price', 'image', 'stock')
+}
+
+
+class InvalidFields(ValueError):
+    """Raised for an unknown view or field name"""
+
+
+def requested_fields(args):
+    """Return the fields asked for with ``fields=`` or ``view=``.
+
+    None means the full representation. ``id`` is always included, since
+    clients key on it and pagination needs it.
+    """
+    view = args.get('view')
+    fields = args.get('fields')
+
+    if view and view != 'full':
+        if view not in PRODUCT_VIEWS:
+            raise InvalidFields(f'Unknown view: {view}')
+        return list(PRODUCT_VIEWS[view])
+
+    if not fields:
+        return None
+
+    names = [name.strip() for name in fields.split(',') if name.strip()]
+    unknown = [name for name in names if name not in SPARSE_COLUMNS]
+    if unknown:
+        raise InvalidFields(f"Unknown fields: {', '.join(unknown)}")
+
+    return ['id'] + [name for name in dict.fromkeys(names) if name != 'id']
+
+
+def sparse_columns(fields, sort_column=None):
+    """Columns to select for a sparse fieldset.
+
+    The sort column is selected too when it is a product column, so keyset
+    pagination can read the cursor value off the last row.
+    """
+    columns = {}
+    for name in fields:
+        for column in SPARSE_COLUMNS[name]:
+            columns[column.key] = column
+
+    sort_key = getattr(sort_column, 'key', None)
+    if sort_key is not None and sort_key in Product.__table__.c:
+        columns[sort_key] = sort_column
+
+    return list(columns.values())
+
+
+def serialize_sparse(rows, fields):
+    """Serialize rows selected with sparse_columns(), formatted like to_dict()"""
+    result = []
+    for row in rows:
+        images = None
+        if 'image' in fields or 'images' in fields:
+            try:
+                images = json.loads(row.images) if row.images else []
+            except json.JSONDecodeError:
+                images = []
+
+        data = {}
+        for name in fields:
+            if name == 'image':
+                data[name] = images[0] if images else None
+            elif name == 'images':
+                data[name] = images
+            elif name == 'is_in_stock':
+                data[name] = (row.stock or 0) > 0
+            elif name == 'price':
+                data[name] = float(row.price)
+            elif name in ('created_at', 'updated_at'):
+                value = getattr(row, name)
+                data[name] = value.isoformat() if value else None
+            else:
+                data[name] = getattr(row, name)
+        result.append(data)
+
+    return result
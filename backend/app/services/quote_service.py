@@ -0,0 +1,169 @@
+import secrets
+from decimal import Decimal
+from flask import current_app
+from itsdangerous import URLSafeTimedSerializer, BadSignature, SignatureExpired
+from sqlalchemy import any_, literal, select, func
+from sqlalchemy.dialects.postgresql import ARRAY
+from app.extensions import db
+from app.models.cart import CartItem, CartHold
+from app.models.product import Product
+from app.models.order import Order
+
+TOKEN_SALT = 'checkout-quote'
+
+
+class InvalidQuote(Exception):
+    """Raised for a quote token that is malformed, tampered with, expired,
+    someone else's or already used for an order"""
+
+
+def order_charges(subtotal):
+    """Tax and shipping for an order subtotal: flat shipping under the free-shipping threshold"""
+    tax_amount = Decimal('0.00')  # No tax for now
+    if subtotal < current_app.config.get('FREE_SHIPPING_THRESHOLD', Decimal('50')):
+        shipping_amount = current_app.config.get('SHIPPING_FEE', Decimal('5.00'))
+    else:
+        shipping_amount = Decimal('0.00')
+    return tax_amount, shipping_amount
+
+
+def _own_hold(user_id):
+    """Units of each product the user holds in their cart (0 without holds)"""
+    return func.coalesce(select(CartHold.quantity).where(
+        CartHold.user_id == user_id,
+        CartHold.product_id == Product.id
+    ).scalar_subquery(), 0)
+
+
+def _item_products(user_id, quantities):
+    """``[(product, quantity, held)]`` for ``{product_id: quantity}``, one query"""
+    ids = list(quantities)
+    if not ids:
+        return []
+
+    rows = db.session.query(Product, _own_hold(user_id)).filter(
+        Product.id == any_(literal(ids, ARRAY(db.Integer)))
+    ).all()
+    return [(product, quantities[product.id], held) for product, held in rows]
+
+
+def _cart_products(user_id):
+    """``[(product, quantity, held)]`` for a user's cart, one joined query"""
+    return db.session.query(Product, CartItem.quantity, _own_hold(user_id)).join(
+        CartItem, CartItem.product_id == Product.id
+    ).filter(CartItem.user_id == user_id).order_by(CartItem.created_at, CartItem.id).all()
+
+
+def _serializer():
+    return URLSafeTimedSerializer(current_app.config['SECRET_KEY'], salt=TOKEN_SALT)
+
+
+def build_quote(user_id, quantities=None):
+    """Price ``{product_id: quantity}``, or the user's cart when None.
+
+    Products are read with a single query and priced at their current
+    price; tax and shipping follow order_charges(). Lines that can't be
+    bought right now are listed under ``unavailable``, and only a quote
+    without any gets a ``token``. The token signs the user, the priced
+    lines, the totals and a random quote id, and create_order honors it
+    for one order within QUOTE_TTL seconds.
+    """
+    if quantities is None:
+        rows = _cart_products(user_id)
+    else:
+        rows = _item_products(user_id, quantities)
+        # Keep the requested order and report unknown ids
+        found = {product.id for product, _, _ in rows}
+        position = {product_id: index for index, product_id in enumerate(quantities)}
+        rows.sort(key=lambda row: position[row[0].id])
+
+    lines = []
+    unavailable = []
+    subtotal = Decimal('0.00')
+    for product, quantity, held in rows:
+        if not product.is_active:
+            unavailable.append({'product_id': product.id, 'reason': 'inactive'})
+            continue
+        # Units the user holds are theirs to buy on top of what's available
+        if product.available + held < quantity:
+            unavailable.append({
+                'product_id': product.id,
+                'reason': 'insufficient_stock',
+                'stock': product.available + held
+            })
+            continue
+
+        total_price = product.price * quantity
+        subtotal += total_price
+        lines.append({
+            'product_id': product.id,
+            'name': product.name,
+            'quantity': quantity,
+            'unit_price': product.price,
+            'total_price': total_price
+        })
+
+    if quantities is not None:
+        unavailable.extend(
+            {'product_id': product_id, 'reason': 'not_found'}
+            for product_id in quantities if product_id not in found
+        )
+
+    tax_amount, shipping_amount = order_charges(subtotal)
+    quote = {
+        'items': lines,
+        'unavailable': unavailable,
+        'subtotal': subtotal,
+        'tax_amount': tax_amount,
+        'shipping_amount': shipping_amount,
+        'total_amount': subtotal + tax_amount + shipping_amount,
+        'token': None,
+        'expires_in': None
+    }
+
+    if lines and not unavailable:
+        quote['token'] = _serializer().dumps({
+            'quote_id': secrets.token_hex(16),
+            'user_id': int(user_id),
+            'items': [[line['product_id'], line['quantity'], str(line['unit_price'])] for line in lines],
+            'subtotal': str(quote['subtotal']),
+            'tax_amount': str(tax_amount),
+            'shipping_amount': str(shipping_amount),
+            'total_amount': str(quote['total_amount'])
+        })
+        quote['expires_in'] = current_app.config.get('QUOTE_TTL', 900)
+
+    return quote
+
+
+def load_quote(token, user_id):
+    """Verify a quote token issued to user_id and return its prices.
+
+    Returns ``{'quote_id', 'prices': {product_id: unit price},
+    'quantities': {product_id: quantity}, 'subtotal', 'tax_amount',
+    'shipping_amount', 'total_amount'}`` with Decimal amounts; raises
+    InvalidQuote. A quote an order was already placed with is refused;
+    the order's unique ``quote_id`` settles two checkouts racing on one.
+    """
+    try:
+        payload = _serializer().loads(token, max_age=current_app.config.get('QUOTE_TTL', 900))
+    except SignatureExpired as e:
+        raise InvalidQuote('Quote has expired') from e
+    except BadSignature as e:
+        raise InvalidQuote('Invalid quote token') from e
+
+    if payload.get('user_id') != int(user_id) or not payload.get('quote_id'):
+        raise InvalidQuote('Invalid quote token')
+
+    if db.session.query(Order.query.filter_by(quote_id=payload['quote_id']).exists()).scalar():
+        raise InvalidQuote('Quote has already been used')
+
+    return {
+        'quote_id': payload['quote_id'],
+        'prices': {product_id: Decimal(price) for product_id, _, price in payload['items']},
+        'quantities': {product_id: quantity for product_id, quantity, _ in payload['items']},
+        'subtotal': Decimal(payload['subtotal']),
+        'tax_amount': Decimal(payload['tax_amount']),
+        'shipping_amount': Decimal(payload['shipping_amount']),
+        'total_amount': Decimal(payload['total_amount'])
+    }
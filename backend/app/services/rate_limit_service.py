@@ -0,0 +1,173 @@
+import math
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from flask import request, current_app, jsonify
+from app.services.cache_service import FakeRedis
+
+
+class MemoryRateStore:
+    """Per-process window counters.
+
+    Each key costs one small list: the current window's number and the
+    counts of that window and the one before it. Keys are kept in order of
+    their last hit, and past max_keys the least recently hit one is
+    dropped, at O(1) per request however many addresses are counted. Limits
+    only hold per worker, like the memory response cache.
+    """
+
+    def __init__(self, max_keys=100000):
+        self.max_keys = max_keys
+        self._counters = OrderedDict()
+        self._lock = threading.Lock()
+
+    def hit(self, key, window, now):
+        """Count a hit; returns (previous window count, current window count)"""
+        index = int(now // window)
+        with self._lock:
+            counter = self._counters.get(key)
+            if counter is None or counter[0] < index - 1:
+                counter = [index, 0, 0]
+            elif counter[0] == index - 1:
+                counter = [index, counter[2], 0]
+            counter[2] += 1
+            self._counters[key] = counter
+            self._counters.move_to_end(key)
+
+            if len(self._counters) > self.max_keys:
+                # An evicted key that is still active just starts counting again
+                self._counters.popitem(last=False)
+            return counter[1], counter[2]
+
+
+class RedisRateStore:
+    """Window counters in a Redis-protocol store, shared by every worker.
+
+    Each window is an INCR'd key that expires two windows later, so the
+    previous window's count is still there to weigh in.
+    """
+
+    def __init__(self, client, prefix='marche:ratelimit:'):
+        self.client = client
+        self.prefix = prefix
+
+    def hit(self, key, window, now):
+        index = int(now // window)
+        current_key = f'{self.prefix}{key}:{index}'
+        current = self.client.incr(current_key)
+        if current == 1:
+            self.client.expire(current_key, 2 * window)
+        previous = self.client.get(f'{self.prefix}{key}:{index - 1}')
+        return int(previous or 0), current
+
+
+def create_store(name, redis_url=None, max_keys=100000):
+    """Build a rate limit store from its configuration name"""
+    if name == 'memory':
+        return MemoryRateStore(max_keys=max_keys)
+    if name == 'fakeredis':
+        return RedisRateStore(FakeRedis())
+    if name == 'redis':
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError("The 'redis' backend requires the redis package (pip install redis)") from e
+        return RedisRateStore(redis.Redis.from_url(redis_url))
+    raise ValueError(f'Unknown rate limit backend: {name}')
+
+
+def sliding_count(previous, current, window, now):
+    """Requests in the window ending now, the previous window's count weighted by its overlap"""
+    elapsed = now % window
+    return previous * (1 - elapsed / window) + current
+
+
+def retry_after(previous, current, limit, window, now):
+    """Seconds until one more request fits under limit"""
+    elapsed = now % window
+    if current < limit:
+        # Wait for enough of the previous window to slide out
+        wait = window * (1 - (limit - current - 1) / previous) - elapsed
+    else:
+        # Wait out this window, then enough of it as the previous one
+        wait = window - elapsed + window * (1 - (limit - 1) / current)
+    return max(1, math.ceil(wait))
+
+
+def client_ip():
+    """The client's address, skipping RATE_LIMIT_PROXY_HOPS trusted proxies"""
+    hops = current_app.config.get('RATE_LIMIT_PROXY_HOPS', 0)
+    if hops:
+        route = request.access_route
+        return route[-hops] if len(route) >= hops else route[0]
+    return request.remote_addr
+
+
+class RateLimiter:
+    """Sliding-window rate limits per client IP and per account.
+
+    RATE_LIMITS maps a policy name, by default the blueprint's, to limits
+    per scope: ``{'auth': {'ip': (30, 60), 'account': (10, 300)}}`` allows
+    30 requests a minute from one address and 10 per five minutes for one
+    account. Hits are counted in fixed windows and the previous window is
+    weighted by how much of it still overlaps, which approximates a true
+    sliding window with two counters per key. Rejected requests count
+    too, so a client hammering away stays limited until it backs off.
+    """
+
+    def __init__(self, app=None):
+        self.store = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.store = create_store(
+            app.config.get('RATE_LIMIT_BACKEND', 'memory'),
+            redis_url=app.config.get('RATE_LIMIT_REDIS_URL'),
+            max_keys=app.config.get('RATE_LIMIT_MAX_KEYS', 100000)
+        )
+        app.extensions['rate_limiter'] = self
+
+    def check(self, policy, keys):
+        """Count a hit for each ``{scope: key}``; returns seconds to wait, or None if allowed"""
+        limits = current_app.config.get('RATE_LIMITS', {}).get(policy, {})
+        now = time.time()
+        waits = []
+        for scope, key in keys.items():
+            if key is None or scope not in limits:
+                continue
+            limit, window = limits[scope]
+            previous, current = self.store.hit(f'{policy}:{scope}:{key}', window, now)
+            if sliding_count(previous, current, window, now) > limit:
+                waits.append(retry_after(previous, current, limit, window, now))
+        return max(waits) if waits else None
+
+    def limit(self, policy=None, account=None, when=None):
+        """Rate limit a view under a policy (its blueprint's by default).
+
+        account returns the request's account key, e.g. the email being
+        logged into, or None; when, if given, decides whether this request
+        is limited at all.
+        """
+        def decorator(view):
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                if not current_app.config.get('RATE_LIMIT_ENABLED', True) or (when and not when()):
+                    return view(*args, **kwargs)
+
+                keys = {'ip': client_ip()}
+                if account:
+                    keys['account'] = account()
+                wait = self.check(policy or request.blueprint, keys)
+                if wait is not None:
+                    response = jsonify({
+                        'error': 'Too many requests',
+                        'message': f'Try again in {wait} seconds'
+                    })
+                    response.status_code = 429
+                    response.headers['Retry-After'] = str(wait)
+                    return response
+                return view(*args, **kwargs)
+            return wrapper
+        return decorator
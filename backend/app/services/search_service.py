@@ -0,0 +1,75 @@
+import html
+import re
+from sqlalchemy import func, select, or_
+from app.extensions import db
+
+# Must match the configuration used by the search_vector columns
+SEARCH_CONFIG = 'english'
+
+# ts_headline marks matches with control characters that are stripped from
+# the document first; the snippet is HTML-escaped and only then are they
+# turned into <mark> tags, so no markup from the document gets through
+START_SEL, STOP_SEL = '\x02', '\x03'
+HEADLINE_OPTIONS = f'StartSel={START_SEL}, StopSel={STOP_SEL}, MaxWords=30, MinWords=10, MaxFragments=2'
+
+
+def build_tsquery(term):
+    """Build a prefix-matching tsquery from raw user input.
+
+    Every word must match and the last characters typed may be a partial
+    word, so "smart pho" finds "Smartphone". Returns None when the input
+    has no searchable words.
+    """
+    words = re.findall(r'[^\W_]+', term.lower())
+    if not words:
+        return None
+
+    return func.to_tsquery(SEARCH_CONFIG, ' & '.join(f'{word}:*' for word in words))
+
+
+def apply_search(query, model, term):
+    """Filter a query on model.search_vector.
+
+    Returns the filtered query and a rank expression usable in ORDER BY, or
+    (query, None) when the term has nothing to search for. A term made only
+    of stopwords ("the", "and of") can't match any search vector, so it
+    falls back to an ILIKE match on the name and description, unranked.
+    """
+    tsquery = build_tsquery(term)
+    if tsquery is None:
+        return query, None
+
+    if not db.session.execute(select(func.numnode(tsquery))).scalar():
+        pattern = f'%{term.strip()}%'
+        return query.filter(or_(model.name.ilike(pattern), model.description.ilike(pattern))), None
+
+    query = query.filter(model.search_vector.op('@@')(tsquery))
+    rank = func.ts_rank_cd(model.search_vector, tsquery)
+    return query, rank
+
+
+def _markup(snippet):
+    """HTML-escape a ts_headline snippet, with its matches in <mark> tags"""
+    if snippet is None:
+        return None
+    return html.escape(snippet).replace(START_SEL, '<mark>').replace(STOP_SEL, '</mark>')
+
+
+def highlights(model, ids, term, document):
+    """Return {id: highlighted snippet of document} for a page of search results.
+
+    Snippets are HTML: the document's text is escaped and only the <mark>
+    tags around matches are markup. ts_headline is expensive, so it runs in
+    one query over the page ids only instead of inside the search query.
+    """
+    tsquery = build_tsquery(term)
+    if tsquery is None or not ids:
+        return {}
+
+    document = func.translate(document, START_SEL + STOP_SEL, '')
+    rows = db.session.query(
+        model.id,
+        func.ts_headline(SEARCH_CONFIG, document, tsquery, HEADLINE_OPTIONS)
+    ).filter(model.id.in_(ids)).all()
+
+    return {row_id: _markup(snippet) for row_id, snippet in rows}
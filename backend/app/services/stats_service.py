@@ -0,0 +1,211 @@
+import random
+import threading
+from decimal import Decimal
+from flask import current_app
+from sqlalchemy import select, func, true
+from sqlalchemy.dialects.postgresql import insert
+from app.extensions import db
+from app.models.stats import DashboardCounter
+from app.models.user import User
+from app.models.vendor import Vendor, VendorStatus
+from app.models.product import Product
+from app.models.order import Order, OrderStatus
+
+# Orders counted as revenue
+REVENUE_STATUSES = (OrderStatus.SHIPPED, OrderStatus.DELIVERED)
+
+# Key of the advisory lock that keeps workers from reconciling side by side
+RECONCILE_LOCK = 0x5747
+
+COUNTERS = (
+    'users', 'vendors', 'pending_vendors', 'approved_vendors',
+    'active_products', 'orders', 'pending_orders', 'revenue'
+)
+
+
+def _add(deltas, shard):
+    """Upsert ``{counter: delta}`` into one shard, in name order"""
+    rows = [
+        {'name': name, 'shard': shard, 'value': delta}
+        for name, delta in sorted(deltas.items()) if delta
+    ]
+    if not rows:
+        return
+
+    table = DashboardCounter.__table__
+    statement = insert(table).values(rows)
+    db.session.execute(statement.on_conflict_do_update(
+        index_elements=[table.c.name, table.c.shard],
+        set_={'value': table.c.value + statement.excluded.value}
+    ))
+
+
+def record(**deltas):
+    """Add ``counter=delta`` to the dashboard counters in the current transaction.
+
+    The deltas go to one random shard, in name order, so two writers
+    never lock the same counters in opposite orders.
+    """
+    _add(deltas, random.randrange(current_app.config.get('STATS_COUNTER_SHARDS', 8)))
+
+
+def record_new_order(order):
+    record(
+        orders=1,
+        pending_orders=int(order.status == OrderStatus.PENDING),
+        revenue=order.total_amount if order.status in REVENUE_STATUSES else 0
+    )
+
+
+def record_order_status(order, old, new):
+    record(
+        pending_orders=int(new == OrderStatus.PENDING) - int(old == OrderStatus.PENDING),
+        revenue=order.total_amount * (int(new in REVENUE_STATUSES) - int(old in REVENUE_STATUSES))
+    )
+
+
+def record_vendor_status(old, new):
+    record(
+        pending_vendors=int(new == VendorStatus.PENDING) - int(old == VendorStatus.PENDING),
+        approved_vendors=int(new == VendorStatus.APPROVED) - int(old == VendorStatus.APPROVED)
+    )
+
+
+def record_product_active(was_active, is_active):
+    # A product created without is_active is active by default
+    record(active_products=int(is_active is not False) - int(was_active not in (None, False)))
+
+
+def live_totals():
+    """One-row subquery of every dashboard counter computed from the tables"""
+    users = select(func.count(User.id)).scalar_subquery()
+    vendors = select(
+        func.count(Vendor.id).label('vendors'),
+        func.count(Vendor.id).filter(Vendor.status == VendorStatus.PENDING).label('pending_vendors'),
+        func.count(Vendor.id).filter(Vendor.status == VendorStatus.APPROVED).label('approved_vendors')
+    ).subquery()
+    products = select(
+        func.count(Product.id).filter(Product.is_active == True).label('active_products')
+    ).subquery()
+    orders = select(
+        func.count(Order.id).label('orders'),
+        func.count(Order.id).filter(Order.status == OrderStatus.PENDING).label('pending_orders'),
+        func.coalesce(
+            func.sum(Order.total_amount).filter(Order.status.in_(REVENUE_STATUSES)), 0
+        ).label('revenue')
+    ).subquery()
+
+    # Each subquery is a single row, so joining them on true is one row
+    return select(
+        users.label('users'),
+        vendors.c.vendors, vendors.c.pending_vendors, vendors.c.approved_vendors,
+        products.c.active_products,
+        orders.c.orders, orders.c.pending_orders, orders.c.revenue
+    ).select_from(
+        vendors.join(products, true()).join(orders, true())
+    ).subquery('live')
+
+
+def live_stats():
+    """Compute every dashboard counter from the tables in one statement"""
+    row = db.session.execute(select(live_totals())).mappings().one()
+    return {name: Decimal(row[name]) for name in COUNTERS}
+
+
+def rollup_stats():
+    """Sum the counter shards; None before the counters were ever seeded"""
+    rows = db.session.execute(
+        select(DashboardCounter.name, func.sum(DashboardCounter.value)).group_by(DashboardCounter.name)
+    ).all()
+    if not rows:
+        return None
+    totals = dict(rows)
+    return {name: totals.get(name, Decimal(0)) for name in COUNTERS}
+
+
+def dashboard_stats():
+    """The admin dashboard's counters, from the rollup when it has been seeded"""
+    stats = rollup_stats() or live_stats()
+    return {
+        'total_users': int(stats['users']),
+        'total_vendors': int(stats['vendors']),
+        'pending_vendors': int(stats['pending_vendors']),
+        'approved_vendors': int(stats['approved_vendors']),
+        'total_products': int(stats['active_products']),
+        'total_orders': int(stats['orders']),
+        'pending_orders': int(stats['pending_orders']),
+        'total_revenue': float(stats['revenue'])
+    }
+
+
+def reconcile():
+    """Correct the counters by their drift from the tables and commit.
+
+    The drift, each counter computed from the tables minus the sum of its
+    shards, comes out of one statement, so both sides are read from the
+    same snapshot; writers change a table and record its delta in one
+    transaction, so a write is either in both or in neither. The drift is
+    then added to shard 0 like any other delta, and nothing is locked
+    while the tables are counted. Returns ``{name: drift}`` for the
+    counters that had drifted, or None when another worker is
+    reconciling right now.
+    """
+    if not db.session.execute(select(func.pg_try_advisory_xact_lock(RECONCILE_LOCK))).scalar():
+        db.session.rollback()
+        return None
+
+    live = live_totals()
+    shards = select(*(
+        func.coalesce(func.sum(DashboardCounter.value).filter(DashboardCounter.name == name), 0).label(name)
+        for name in COUNTERS
+    )).subquery('shards')
+    row = db.session.execute(select(*(
+        (live.c[name] - shards.c[name]).label(name) for name in COUNTERS
+    )).select_from(live.join(shards, true()))).mappings().one()
+
+    drift = {name: Decimal(row[name]) for name in COUNTERS if row[name]}
+    _add(drift, 0)
+    db.session.commit()
+    return drift
+
+
+class StatsReconciler:
+    """Background thread that reconciles the dashboard counters.
+
+    Runs every STATS_RECONCILE_INTERVAL seconds and logs any drift, which
+    comes from writes that bypass the recording helpers (scripts, manual
+    SQL) or from racing edits.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.interval = app.config.get('STATS_RECONCILE_INTERVAL', 3600)
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='stats-reconciler', daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            with self.app.app_context():
+                try:
+                    drift = reconcile()
+                    if drift:
+                        self.app.logger.warning('Dashboard counters drifted: %s', drift)
+                except Exception:
+                    db.session.rollback()
+                    self.app.logger.exception('Dashboard counter reconciliation failed')
+                finally:
+                    db.session.remove()
+
+
+def init_app(app):
+    """Start the reconciler unless STATS_RECONCILE_INTERVAL is 0"""
+    if app.config.get('STATS_RECONCILE_INTERVAL', 3600):
+        reconciler = StatsReconciler(app)
+        reconciler.start()
+        app.extensions['stats_reconciler'] = reconciler
@@ -0,0 +1,20 @@
+"""Rebuild the daily_sales rollup from the order lines.
+
+    python backfill_daily_sales.py                      # all history
+    python backfill_daily_sales.py --from 2026-01-01 --to 2026-01-31
+"""
+import argparse
+from datetime import date
+
+from app import create_app
+from app.services.analytics_service import rebuild_daily_sales
+
+parser = argparse.ArgumentParser(description='Rebuild the daily_sales rollup')
+parser.add_argument('--from', dest='start', type=date.fromisoformat, help='first day (YYYY-MM-DD)')
+parser.add_argument('--to', dest='end', type=date.fromisoformat, help='last day (YYYY-MM-DD)')
+args = parser.parse_args()
+
+app = create_app()
+with app.app_context():
+    written = rebuild_daily_sales(args.start, args.end)
+    print(f'Wrote {written} daily_sales rows')
@@ -0,0 +1,134 @@
+"""Check that the cart endpoints cost the same number of queries at any size.
+
+Creates a vendor, a few categories, products and a customer in the
+database pointed to by DATABASE_URL, then grows the customer's cart step
+by step and counts the SQL statements and time of GET /api/orders/cart
+and GET /api/orders/cart/summary at each size. Exits non-zero if either
+endpoint's query count changes with the cart size.
+
+Run from the backend directory against a throwaway database:
+
+    DATABASE_URL=postgresql://localhost/marche_bench python -m benchmarks.cart_queries --sizes 1 10 50 200
+"""
+import argparse
+import statistics
+import sys
+import time
+
+from flask_jwt_extended import create_access_token
+from sqlalchemy import event
+
+from app import create_app, db
+from app.models.user import User, UserRole
+from app.models.vendor import Vendor, VendorStatus
+from app.models.category import Category
+from app.models.product import Product
+from app.models.cart import CartItem
+
+
+def seed(product_count):
+    """Create the catalog and a customer with an empty cart; returns (product ids, user id)"""
+    suffix = str(int(time.time()))
+    vendor_user = User(
+        email=f'cart-vendor-{suffix}@marche.gm',
+        first_name='Cart',
+        last_name='Vendor',
+        role=UserRole.VENDOR
+    )
+    vendor_user.set_password('cart-password')
+    customer = User(email=f'cart-customer-{suffix}@marche.gm', first_name='Cart', last_name='Customer', password_hash='x')
+    db.session.add_all([vendor_user, customer])
+    db.session.flush()
+
+    vendor = Vendor(
+        user_id=vendor_user.id,
+        name='Cart Vendor',
+        email=vendor_user.email,
+        phone='+220 000 0000',
+        address='Banjul',
+        status=VendorStatus.APPROVED
+    )
+    categories = [
+        Category.query.filter_by(name=f'Cart {index}').first() or Category(name=f'Cart {index}')
+        for index in range(5)
+    ]
+    db.session.add_all([vendor] + categories)
+    db.session.flush()
+
+    products = []
+    for index in range(product_count):
+        product = Product(
+            vendor_id=vendor.id,
+            category_id=categories[index % len(categories)].id,
+            name=f'Cart product {index}',
+            price=1 + index % 50,
+            stock=1000
+        )
+        product.refresh_listable(vendor)
+        products.append(product)
+    db.session.add_all(products)
+    db.session.commit()
+
+    return [product.id for product in products], customer.id
+
+
+def measure(client, url, headers, statements, runs):
+    """Median milliseconds and statement count of a GET"""
+    timings = []
+    for _ in range(runs):
+        statements.clear()
+        started = time.perf_counter()
+        response = client.get(url, headers=headers)
+        timings.append((time.perf_counter() - started) * 1000)
+        assert response.status_code == 200, response.get_json()
+    return statistics.median(timings), len(statements)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1, 10, 50, 200], help='cart sizes to measure')
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    app = create_app()
+    client = app.test_client()
+    statements = []
+
+    with app.app_context():
+        product_ids, user_id = seed(max(args.sizes))
+        headers = {'Authorization': f'Bearer {create_access_token(identity=str(user_id))}'}
+
+        @event.listens_for(db.engine, 'before_cursor_execute')
+        def count(connection, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+    counts = {'cart': set(), 'summary': set()}
+    print(f"{'items':>6}{'cart ms':>10}{'queries':>9}{'summary ms':>12}{'queries':>9}")
+    for size in sorted(args.sizes):
+        with app.app_context():
+            CartItem.query.filter_by(user_id=user_id).delete()
+            db.session.add_all([
+                CartItem(user_id=user_id, product_id=product_id, quantity=1 + index % 3)
+                for index, product_id in enumerate(product_ids[:size])
+            ])
+            db.session.commit()
+
+        cart_ms, cart_queries = measure(client, '/api/orders/cart', headers, statements, args.runs)
+        summary_ms, summary_queries = measure(client, '/api/orders/cart/summary', headers, statements, args.runs)
+        counts['cart'].add(cart_queries)
+        counts['summary'].add(summary_queries)
+        print(f'{size:>6}{cart_ms:>10.1f}{cart_queries:>9}{summary_ms:>12.1f}{summary_queries:>9}')
+
+    with app.app_context():
+        event.remove(db.engine, 'before_cursor_execute', count)
+
+    growing = [name for name, seen in counts.items() if len(seen) > 1]
+    if growing:
+        print(f'Query count grows with the cart size: {", ".join(growing)}')
+        sys.exit(1)
+
+    print('Query counts are flat.')
+
+
+if __name__ == '__main__':
+    main()
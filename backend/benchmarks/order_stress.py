@@ -0,0 +1,153 @@
+"""Fire hundreds of concurrent checkouts at a few products and check stock.
+
+Creates a vendor, a handful of products with limited stock and a pool of
+customers in the database pointed to by DATABASE_URL, then posts orders
+from many threads at once. Every order buys two of the products in random
+order, so overlapping lock sets are exercised too. Afterwards it checks
+that no product was oversold and that the stock taken matches the order
+items written, and exits non-zero if not.
+
+Run from the backend directory against a throwaway database:
+
+    DATABASE_URL=postgresql://localhost/marche_stress python -m benchmarks.order_stress --orders 300
+"""
+import argparse
+import random
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from flask_jwt_extended import create_access_token
+from sqlalchemy import func
+
+from app import create_app, db
+from app.models.user import User, UserRole
+from app.models.vendor import Vendor, VendorStatus
+from app.models.category import Category
+from app.models.product import Product
+from app.models.order import OrderItem
+
+
+def seed(product_count, stock, customer_count):
+    """Create the vendor, products and customers; returns (product ids, user ids)"""
+    suffix = str(int(time.time()))
+    vendor_user = User(
+        email=f'stress-vendor-{suffix}@marche.gm',
+        first_name='Stress',
+        last_name='Vendor',
+        role=UserRole.VENDOR
+    )
+    vendor_user.set_password('stress-password')
+    db.session.add(vendor_user)
+    db.session.flush()
+
+    vendor = Vendor(
+        user_id=vendor_user.id,
+        name='Stress Vendor',
+        email=vendor_user.email,
+        phone='+220 000 0000',
+        address='Banjul',
+        status=VendorStatus.APPROVED
+    )
+    category = Category.query.filter_by(name='Stress').first() or Category(name='Stress')
+    db.session.add_all([vendor, category])
+    db.session.flush()
+
+    products = []
+    for index in range(product_count):
+        product = Product(
+            vendor_id=vendor.id,
+            category_id=category.id,
+            name=f'Stress product {index}',
+            price=10,
+            stock=stock
+        )
+        product.refresh_listable(vendor)
+        products.append(product)
+
+    customers = [
+        User(email=f'stress-{suffix}-{index}@marche.gm', first_name='Stress', last_name=str(index), password_hash='x')
+        for index in range(customer_count)
+    ]
+    db.session.add_all(products + customers)
+    db.session.commit()
+
+    return [product.id for product in products], [customer.id for customer in customers]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--orders', type=int, default=300)
+    parser.add_argument('--products', type=int, default=3)
+    parser.add_argument('--stock', type=int, default=100, help='initial stock of each product')
+    parser.add_argument('--customers', type=int, default=50)
+    parser.add_argument('--workers', type=int, default=16, help='concurrent requests; keep within the DB pool size')
+    args = parser.parse_args()
+
+    app = create_app()
+
+    with app.app_context():
+        product_ids, customer_ids = seed(args.products, args.stock, args.customers)
+        tokens = [create_access_token(identity=str(user_id)) for user_id in customer_ids]
+
+    rng = random.Random(42)
+    orders = [
+        (tokens[index % len(tokens)], rng.sample(product_ids, min(2, len(product_ids))))
+        for index in range(args.orders)
+    ]
+
+    def place(order):
+        token, items = order
+        response = app.test_client().post('/api/orders', json={
+            'items': [{'product_id': product_id, 'quantity': 1} for product_id in items],
+            'payment_method': 'wave',
+            'shipping_address': {'city': 'Banjul'}
+        }, headers={'Authorization': f'Bearer {token}'})
+        return response.status_code, items
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.workers) as executor:
+        results = list(executor.map(place, orders))
+    elapsed = time.perf_counter() - started
+
+    statuses = Counter(status for status, _ in results)
+    sold = Counter()
+    for status, items in results:
+        if status == 201:
+            sold.update(items)
+
+    failures = []
+    with app.app_context():
+        stock = dict(db.session.query(Product.id, Product.stock).filter(Product.id.in_(product_ids)))
+        written = dict(db.session.query(OrderItem.product_id, func.sum(OrderItem.quantity)).filter(
+            OrderItem.product_id.in_(product_ids)
+        ).group_by(OrderItem.product_id))
+
+    for product_id in product_ids:
+        taken = args.stock - stock[product_id]
+        if stock[product_id] < 0:
+            failures.append(f'product {product_id} oversold: stock {stock[product_id]}')
+        if taken != sold[product_id] or taken != (written.get(product_id) or 0):
+            failures.append(
+                f'product {product_id}: stock taken {taken}, successful order lines {sold[product_id]}, '
+                f'order items written {written.get(product_id) or 0}'
+            )
+
+    print(f'{args.orders} orders in {elapsed:.1f}s with {args.workers} workers: {dict(statuses)}')
+    for product_id in product_ids:
+        print(f'product {product_id}: stock {args.stock} -> {stock[product_id]}, sold {sold[product_id]}')
+
+    unexpected = set(statuses) - {201, 400}
+    if unexpected:
+        failures.append(f'unexpected status codes: {sorted(unexpected)}')
+
+    if failures:
+        print('\n'.join(failures))
+        sys.exit(1)
+
+    print('Stock is consistent.')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,315 @@
+"""Fail when a route query falls back to a sequential scan at scale.
+
+Seeds a large synthetic data set into the database pointed to by
+DATABASE_URL, calls every read endpoint in app/routes as a guest, a
+customer, a vendor and an admin, captures the SELECTs they issue and runs
+EXPLAIN on each one. Any Seq Scan on a large table is reported and the
+script exits non-zero, so it can gate index or query changes.
+
+Run from the backend directory against a throwaway database:
+
+    DATABASE_URL=postgresql://localhost/marche_plans python -m benchmarks.query_plan_check
+"""
+import argparse
+import json
+import sys
+
+from sqlalchemy import event, text
+
+from app import create_app, db
+from app.models.user import User, UserRole
+from app.services.claims_service import access_token_for
+from app.services.analytics_service import rebuild_daily_sales
+
+# Tables smaller than this are expected to be scanned sequentially
+LARGE_TABLE_ROWS = 10000
+
+# (url, table) pairs where a full scan is the intended plan. The page/offset
+# COUNT(*) of an unfiltered listing reads most of the table whatever the
+# index; cursor pagination skips that count.
+ALLOWED_SEQ_SCANS = {
+    ('/api/products', 'products'),
+    ('/api/products?sort_by=price_low', 'products'),
+    ('/api/products?sort_by=price_high', 'products'),
+    ('/api/products?sort_by=rating', 'products'),
+    ('/api/products?sort_by=name', 'products'),
+    ('/api/products?view=card', 'products'),
+    ('/api/products?sort_by=price_low&cursor=&include_total=true', 'products'),
+    ('/api/products/all?include_inactive=false', 'products'),
+    ('/api/products/facets', 'products'),
+    ('/api/admin/orders', 'orders'),
+    ('/api/admin/users', 'users'),
+    # Whole-table dashboard counters
+    ('/api/admin/dashboard', 'users'),
+    ('/api/admin/dashboard', 'products'),
+    ('/api/admin/dashboard', 'orders'),
+    # The seeded history spans about 70 days, so the default 30-day report
+    # over every vendor reads a large share of the rollup
+    ('/api/admin/analytics/sales', 'daily_sales'),
+}
+
+
+def seed(scale):
+    """Insert a synthetic data set; scale=1 is 200k products and 100k orders"""
+    sizes = {
+        'customers': 50000 * scale,
+        'vendors': 500 * scale,
+        'categories': 20,
+        'products': 200000 * scale,
+        'orders': 100000 * scale,
+    }
+    statements = [
+        """
+        INSERT INTO categories (name, description, icon, is_active, created_at, updated_at)
+        SELECT 'Plan category ' || i, 'Category ' || i, NULL, true, now(), now()
+        FROM generate_series(1, :categories) AS i
+        """,
+        """
+        INSERT INTO users (email, password_hash, first_name, last_name, role, is_active,
+                           email_verified, created_at, updated_at)
+        SELECT 'vendor' || i || '@plan.check', 'x', 'Vendor', 'User', 'VENDOR', true, false,
+               now() - i * interval '1 minute', now()
+        FROM generate_series(1, :vendors) AS i
+        """,
+        """
+        INSERT INTO users (email, password_hash, first_name, last_name, role, is_active,
+                           email_verified, created_at, updated_at)
+        SELECT 'customer' || i || '@plan.check', 'x', 'Customer', 'User', 'CUSTOMER', true, false,
+               now() - i * interval '1 minute', now()
+        FROM generate_series(1, :customers) AS i
+        """,
+        """
+        INSERT INTO vendors (user_id, name, description, email, phone, address, status,
+                             created_at, updated_at)
+        SELECT id, 'Plan vendor ' || id, 'Synthetic vendor selling goods', email, '+220 000 0000',
+               'Banjul', CASE WHEN id % 10 = 0 THEN 'PENDING' ELSE 'APPROVED' END::vendorstatus,
+               created_at, now()
+        FROM users WHERE email LIKE 'vendor%@plan.check'
+        """,
+        """
+        INSERT INTO products (vendor_id, category_id, name, description, price, images, stock,
+                              rating, review_count, is_featured, is_active, created_at, updated_at)
+        SELECT v.ids[1 + i % cardinality(v.ids)], c.ids[1 + i % cardinality(c.ids)],
+               'Plan product ' || i, 'Synthetic product number ' || i, 1 + (i % 500),
+               '["https://example.com/' || i || '.jpg"]', i % 40, (i % 50) / 10.0, 0,
+               i % 100 = 0, i % 20 <> 0, now() - i * interval '1 minute', now()
+        FROM generate_series(1, :products) AS i,
+             (SELECT array_agg(id ORDER BY id) AS ids FROM vendors) AS v,
+             (SELECT array_agg(id ORDER BY id) AS ids FROM categories) AS c
+        """,
+        """
+        UPDATE products AS p SET is_listable = true
+        FROM vendors AS v
+        WHERE v.id = p.vendor_id AND p.is_active AND v.status = 'APPROVED'
+        """,
+        """
+        INSERT INTO orders (user_id, order_number, status, payment_method, payment_status,
+                            subtotal, tax_amount, shipping_amount, total_amount, shipping_address,
+                            created_at, updated_at)
+        SELECT u.first_id + i % u.total, 'PLN' || i,
+               (ARRAY['PENDING', 'PROCESSING', 'SHIPPED', 'DELIVERED', 'CANCELLED'])[1 + i % 5]::orderstatus,
+               'WAVE', 'pending', 40, 0, 5, 45, '{}', now() - i * interval '1 minute', now()
+        FROM generate_series(1, :orders) AS i,
+             (SELECT min(id) AS first_id, count(*) AS total FROM users
+              WHERE email LIKE 'customer%@plan.check') AS u
+        """,
+        """
+        INSERT INTO order_items (order_id, product_id, quantity, unit_price, total_price, created_at)
+        SELECT o.id, (SELECT min(id) FROM products) + (o.id * 7 + k) % (SELECT count(*) FROM products),
+               1, 20, 20, o.created_at
+        FROM orders AS o, generate_series(1, 2) AS k
+        """,
+        """
+        INSERT INTO vendor_orders (order_id, vendor_id, status, subtotal, item_count, created_at, updated_at)
+        SELECT o.id, p.vendor_id, o.status, sum(oi.total_price), sum(oi.quantity), o.created_at, o.updated_at
+        FROM order_items AS oi
+        JOIN orders AS o ON o.id = oi.order_id
+        JOIN products AS p ON p.id = oi.product_id
+        GROUP BY o.id, p.vendor_id
+        """,
+        """
+        INSERT INTO cart_items (user_id, product_id, quantity, created_at, updated_at)
+        SELECT u.id, (SELECT min(id) FROM products) + (u.id * 13 + k) % (SELECT count(*) FROM products),
+               1, now(), now()
+        FROM users AS u, generate_series(1, 2) AS k
+        WHERE u.email LIKE 'customer%@plan.check'
+        """,
+    ]
+    for statement in statements:
+        db.session.execute(text(statement), sizes)
+
+    admin = User(email='admin@plan.check', first_name='Plan', last_name='Admin', role=UserRole.ADMIN)
+    admin.set_password('plan-check-admin')
+    db.session.add(admin)
+    db.session.commit()
+    rebuild_daily_sales()
+
+    with db.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as connection:
+        connection.execute(text('VACUUM ANALYZE'))
+
+
+def sample_ids():
+    """Pick representative rows to build request URLs"""
+    row = db.session.execute(text("""
+        SELECT
+            (SELECT id FROM users WHERE email = 'admin@plan.check'),
+            (SELECT user_id FROM orders ORDER BY id LIMIT 1),
+            (SELECT id FROM orders ORDER BY id LIMIT 1),
+            (SELECT v.user_id FROM vendors v WHERE v.status = 'APPROVED' ORDER BY v.id LIMIT 1),
+            (SELECT id FROM vendors WHERE status = 'APPROVED' ORDER BY id LIMIT 1),
+            (SELECT id FROM products WHERE is_listable ORDER BY id LIMIT 1),
+            (SELECT id FROM categories ORDER BY id LIMIT 1)
+    """)).one()
+    keys = ['admin', 'customer', 'order', 'vendor_user', 'vendor', 'product', 'category']
+    return dict(zip(keys, row))
+
+
+def endpoints(ids):
+    """(role, url) pairs covering the read paths in app/routes"""
+    guest = [
+        '/api/products',
+        '/api/products?sort_by=price_low',
+        '/api/products?sort_by=price_high',
+        '/api/products?sort_by=rating',
+        '/api/products?sort_by=name',
+        f"/api/products?category_id={ids['category']}",
+        f"/api/products?vendor_id={ids['vendor']}",
+        '/api/products?min_price=10&max_price=50',
+        '/api/products?featured=true',
+        '/api/products?search=product&sort_by=relevance',
+        '/api/products?cursor=',
+        '/api/products?sort_by=price_low&cursor=&include_total=true',
+        '/api/products?view=card',
+        '/api/products/facets',
+        f"/api/products/facets?category_id={ids['category']}",
+        '/api/products/facets?search=product',
+        f"/api/products/{ids['product']}",
+        '/api/products/all?include_inactive=false',
+        '/api/categories',
+        f"/api/categories/{ids['category']}",
+        '/api/vendors',
+        '/api/vendors?search=vendor',
+        '/api/vendors?cursor=',
+        f"/api/vendors/{ids['vendor']}",
+    ]
+    customer = [
+        '/api/auth/me',
+        '/api/orders',
+        '/api/orders?status=pending',
+        '/api/orders?cursor=',
+        f"/api/orders/{ids['order']}",
+        '/api/orders/cart',
+        '/api/orders/cart/summary',
+    ]
+    vendor = [
+        '/api/products/my-products',
+        '/api/vendors/my-vendor',
+        '/api/vendors/products',
+        '/api/vendors/products?include_inactive=true',
+        '/api/vendors/orders',
+        '/api/vendors/orders?summary=true',
+        '/api/vendors/orders?status=pending',
+        '/api/vendors/analytics/sales',
+        '/api/vendors/analytics/sales?interval=month&from=2025-01-01',
+    ]
+    admin = [
+        '/api/admin/dashboard',
+        '/api/admin/vendors',
+        '/api/admin/vendors?status=pending',
+        '/api/admin/orders',
+        '/api/admin/orders?status=pending',
+        '/api/admin/orders?cursor=',
+        '/api/admin/products',
+        '/api/admin/products?include_inactive=true',
+        '/api/admin/users',
+        '/api/admin/users?role=vendor',
+        '/api/admin/analytics/sales',
+        f"/api/admin/analytics/sales?category_id={ids['category']}",
+        f"/api/admin/analytics/sales?vendor_id={ids['vendor']}&interval=week",
+    ]
+    return (
+        [(None, url) for url in guest]
+        + [(ids['customer'], url) for url in customer]
+        + [(ids['vendor_user'], url) for url in vendor]
+        + [(ids['admin'], url) for url in admin]
+    )
+
+
+def seq_scans(plan):
+    """Yield relation names of every Seq Scan node in an EXPLAIN JSON plan"""
+    if plan.get('Node Type') == 'Seq Scan':
+        yield plan['Relation Name']
+    for child in plan.get('Plans', []):
+        yield from seq_scans(child)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scale', type=int, default=1)
+    parser.add_argument('--skip-seed', action='store_true', help='reuse an already seeded database')
+    args = parser.parse_args()
+
+    app = create_app()
+    client = app.test_client()
+    captured = []
+
+    with app.app_context():
+        if not args.skip_seed:
+            print('Seeding...')
+            seed(args.scale)
+
+        large_tables = {
+            name for name, rows in db.session.execute(text(
+                "SELECT relname, reltuples FROM pg_class WHERE relkind = 'r' AND relnamespace = 'public'::regnamespace"
+            ))
+            if rows >= LARGE_TABLE_ROWS
+        }
+        ids = sample_ids()
+
+        @event.listens_for(db.engine, 'before_cursor_execute')
+        def capture(connection, cursor, statement, parameters, context, executemany):
+            if statement.lstrip().upper().startswith(('SELECT', 'WITH')):
+                captured.append((statement, parameters))
+
+        # Tokens carry claims like the ones login issues
+        tokens = {
+            user_id: access_token_for(db.session.get(User, user_id))
+            for user_id in {user_id for user_id, _ in endpoints(ids) if user_id}
+        }
+
+        failures = []
+        for user_id, url in endpoints(ids):
+            headers = {}
+            if user_id:
+                headers['Authorization'] = f'Bearer {tokens[user_id]}'
+
+            captured.clear()
+            response = client.get(url, headers=headers)
+
+            if response.status_code >= 400:
+                print(f'!! {url} returned {response.status_code}, queries before the error are still checked')
+
+            for statement, parameters in captured:
+                plan = db.session.connection().exec_driver_sql(
+                    'EXPLAIN (FORMAT JSON) ' + statement, parameters
+                ).scalar()
+                if isinstance(plan, str):
+                    plan = json.loads(plan)
+                for table in seq_scans(plan[0]['Plan']):
+                    if table in large_tables and (url, table) not in ALLOWED_SEQ_SCANS:
+                        failures.append((url, table, statement))
+            db.session.rollback()
+
+        event.remove(db.engine, 'before_cursor_execute', capture)
+
+    if failures:
+        print(f'{len(failures)} sequential scan(s) on large tables:')
+        for url, table, statement in failures:
+            print(f'\n--- {url} scans {table}\n{statement}')
+        sys.exit(1)
+
+    print('No sequential scans on large tables.')
+
+
+if __name__ == '__main__':
+    main()
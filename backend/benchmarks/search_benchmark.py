@@ -0,0 +1,120 @@
+"""Compare full-text product search against the legacy ilike path.
+
+Seeds a large synthetic catalog into the database pointed to by DATABASE_URL
+and times GET /api/products for a set of search terms in both modes.
+
+Run from the backend directory against a throwaway database:
+
+    DATABASE_URL=postgresql://localhost/marche_bench python -m benchmarks.search_benchmark --products 100000
+"""
+import argparse
+import statistics
+import time
+
+from sqlalchemy import text
+
+from app import create_app, db
+from app.models.user import User, UserRole
+from app.models.vendor import Vendor, VendorStatus
+from app.models.category import Category
+
+WORDS = [
+    'phone', 'smartphone', 'charger', 'cable', 'laptop', 'tablet', 'speaker',
+    'headphones', 'shirt', 'dress', 'shoes', 'sandals', 'bag', 'watch',
+    'rice', 'oil', 'pepper', 'mango', 'juice', 'soap', 'cream', 'perfume',
+    'chair', 'table', 'lamp', 'mat', 'football', 'jersey', 'red', 'blue',
+    'green', 'black', 'leather', 'cotton', 'wireless', 'fast', 'original',
+    'premium', 'local', 'handmade', 'fresh', 'organic', 'large', 'small'
+]
+
+SEARCH_TERMS = ['phone', 'wireless charger', 'handmade leather bag', 'organic mango juice', 'zzz']
+
+
+def seed_catalog(product_count):
+    """Insert product_count synthetic products with one INSERT ... SELECT"""
+    user = User(
+        email='bench-vendor@marche.gm',
+        first_name='Bench',
+        last_name='Vendor',
+        role=UserRole.VENDOR
+    )
+    user.set_password('bench-password')
+    db.session.add(user)
+    db.session.flush()
+
+    vendor = Vendor(
+        user_id=user.id,
+        name='Bench Vendor',
+        description='Synthetic vendor for search benchmarks',
+        email=user.email,
+        phone='+220 000 0000',
+        address='Banjul',
+        status=VendorStatus.APPROVED
+    )
+    category = Category.query.filter_by(name='Benchmark').first() or Category(name='Benchmark')
+    db.session.add_all([vendor, category])
+    db.session.flush()
+
+    db.session.execute(text("""
+        INSERT INTO products (vendor_id, category_id, name, description, price, stock,
+                              rating, review_count, is_featured, is_active, is_listable,
+                              created_at, updated_at)
+        SELECT :vendor_id, :category_id,
+               initcap(w[1 + (i * 7) % n] || ' ' || w[1 + (i * 13) % n] || ' ' || w[1 + (i * 31) % n]),
+               'A ' || w[1 + (i * 17) % n] || ' ' || w[1 + (i * 19) % n] || ' ' || w[1 + (i * 23) % n]
+                   || ' item sold in the Gambia, lot ' || i,
+               1 + (i % 500), i % 40, (i % 5)::float, 0, false, true, true,
+               now() - (i || ' minutes')::interval, now()
+        FROM generate_series(1, :product_count) AS i,
+             (SELECT CAST(:words AS text[]) AS w, cardinality(CAST(:words AS text[])) AS n) AS vocab
+    """), {
+        'vendor_id': vendor.id,
+        'category_id': category.id,
+        'product_count': product_count,
+        'words': WORDS
+    })
+    db.session.commit()
+    db.session.execute(text('ANALYZE products'))
+    db.session.commit()
+
+
+def time_request(client, url, runs):
+    timings = []
+    response = None
+    for _ in range(runs):
+        started = time.perf_counter()
+        response = client.get(url)
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings), response.get_json()['pagination']['total']
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--products', type=int, default=100000)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--skip-seed', action='store_true', help='reuse an already seeded catalog')
+    args = parser.parse_args()
+
+    app = create_app()
+    # Time the queries, not the response cache
+    app.config['CACHE_ENABLED'] = False
+    client = app.test_client()
+
+    with app.app_context():
+        if not args.skip_seed:
+            print(f'Seeding {args.products} products...')
+            seed_catalog(args.products)
+
+    print(f"{'term':<24}{'ilike ms':>10}{'hits':>8}{'fulltext ms':>14}{'hits':>8}")
+    for term in SEARCH_TERMS:
+        ilike_ms, ilike_hits = time_request(
+            client, f'/api/products?search={term}&search_mode=ilike', args.runs
+        )
+        fulltext_ms, fulltext_hits = time_request(
+            client, f'/api/products?search={term}&sort_by=relevance', args.runs
+        )
+        print(f'{term:<24}{ilike_ms:>10.1f}{ilike_hits:>8}{fulltext_ms:>14.1f}{fulltext_hits:>8}')
+
+
+if __name__ == '__main__':
+    main()
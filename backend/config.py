@@ -1,5 +1,6 @@
 import os
 from datetime import timedelta
+from decimal import Decimal
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -16,6 +17,19 @@ class Config:
     JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY') or 'jwt-secret-string'
     JWT_ACCESS_TOKEN_EXPIRES = timedelta(hours=24)
     JWT_REFRESH_TOKEN_EXPIRES = timedelta(days=30)
+    # How long workers trust a cached claims version on reads; writes always
+    # check the database (see claims_service)
+    TOKEN_VERSION_CACHE_TTL = int(os.environ.get('TOKEN_VERSION_CACHE_TTL') or 5)
+    
+    # Password hashing: 'pbkdf2:sha256:<iterations>', 'scrypt:<n>:<r>:<p>' or
+    # 'bcrypt:<rounds>' (left-out parameters take their defaults). Older hashes
+    # are upgraded on the next login. At most PASSWORD_HASH_WORKERS hashes run
+    # at once per process and PASSWORD_HASH_QUEUE wait; beyond that, or past
+    # PASSWORD_HASH_GLOBAL_LIMIT below, sign-ins get a 503 with Retry-After
+    PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD') or 'pbkdf2:sha256:600000'
+    PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS') or 2)
+    PASSWORD_HASH_QUEUE = int(os.environ.get('PASSWORD_HASH_QUEUE') or 16)
+    PASSWORD_HASH_RETRY_AFTER = 1
     
     # Upload Configuration
     UPLOAD_FOLDER = os.environ.get('UPLOAD_FOLDER') or 'uploads'
@@ -31,10 +45,78 @@ class Config:
         'https://marche-yzzm.onrender.com'
     ]
     
+    # gunicorn worker processes (gunicorn reads the same variable)
+    WEB_CONCURRENCY = int(os.environ.get('WEB_CONCURRENCY') or 1)
+    
+    # Response cache for public catalog endpoints: 'memory' (per-process LRU,
+    # single worker only), 'redis' (shared, needs the redis package) or
+    # 'fakeredis' (in-process stand-in for the redis backend). Defaults to
+    # redis when several workers run; memory with several workers is refused
+    CACHE_ENABLED = (os.environ.get('CACHE_ENABLED') or 'true').lower() == 'true'
+    CACHE_BACKEND = os.environ.get('CACHE_BACKEND') or ('redis' if WEB_CONCURRENCY > 1 else 'memory')
+    CACHE_REDIS_URL = os.environ.get('CACHE_REDIS_URL') or 'redis://localhost:6379/0'
+    CACHE_DEFAULT_TTL = int(os.environ.get('CACHE_DEFAULT_TTL') or 300)
+    CACHE_MAX_ENTRIES = int(os.environ.get('CACHE_MAX_ENTRIES') or 1024)
+    
+    # Sliding-window rate limits per policy (the blueprint's name unless a
+    # route picks one) and scope: (requests, seconds). 'memory' counts per
+    # worker; 'redis' shares the counts between workers. Behind a proxy set
+    # RATE_LIMIT_PROXY_HOPS to the number of proxies in X-Forwarded-For
+    RATE_LIMIT_ENABLED = (os.environ.get('RATE_LIMIT_ENABLED') or 'true').lower() == 'true'
+    RATE_LIMIT_BACKEND = os.environ.get('RATE_LIMIT_BACKEND') or 'memory'
+    RATE_LIMIT_REDIS_URL = os.environ.get('RATE_LIMIT_REDIS_URL') or CACHE_REDIS_URL
+    RATE_LIMIT_PROXY_HOPS = int(os.environ.get('RATE_LIMIT_PROXY_HOPS') or 0)
+    # Keys the memory store keeps before dropping the least recently hit
+    RATE_LIMIT_MAX_KEYS = 100000
+    RATE_LIMITS = {
+        'auth': {'ip': (30, 60), 'account': (10, 300)},
+        'search': {'ip': (60, 60)}
+    }
+    
+    # Cap on password hashes in flight across every worker (0: only the
+    # per-process pool bounds them), kept as expiring slot keys in Redis
+    # ('fakeredis' for local runs); a slot left by a dead worker frees
+    # itself after PASSWORD_HASH_LEASE seconds
+    PASSWORD_HASH_GLOBAL_LIMIT = int(os.environ.get('PASSWORD_HASH_GLOBAL_LIMIT') or 0)
+    PASSWORD_HASH_STORE = os.environ.get('PASSWORD_HASH_STORE') or 'redis'
+    PASSWORD_HASH_REDIS_URL = os.environ.get('PASSWORD_HASH_REDIS_URL') or RATE_LIMIT_REDIS_URL
+    PASSWORD_HASH_LEASE = 30
+    
+    # Admin dashboard counters: write paths spread their deltas over
+    # STATS_COUNTER_SHARDS rows per counter, and each worker resyncs them with
+    # the tables every STATS_RECONCILE_INTERVAL seconds (0 turns that off)
+    STATS_COUNTER_SHARDS = 8
+    STATS_RECONCILE_INTERVAL = int(os.environ.get('STATS_RECONCILE_INTERVAL') or 3600)
+    
+    # Idempotency-Key replays for order creation and cart mutations
+    IDEMPOTENCY_KEY_TTL = int(os.environ.get('IDEMPOTENCY_KEY_TTL') or 86400)
+    IDEMPOTENCY_PURGE_INTERVAL = 60
+    IDEMPOTENCY_PURGE_BATCH = 500
+    
     # Pagination
     PRODUCTS_PER_PAGE = 20
     VENDORS_PER_PAGE = 12
     ORDERS_PER_PAGE = 10
+    # Most ids GET /api/products/batch resolves in one request
+    PRODUCT_BATCH_LIMIT = 200
+    # Most items POST /api/orders/cart/merge accepts in one request
+    CART_MERGE_LIMIT = 100
+    
+    # Checkout pricing; quote tokens from POST /api/orders/quote are
+    # honored by create_order for one order within QUOTE_TTL seconds
+    SHIPPING_FEE = Decimal('5.00')
+    FREE_SHIPPING_THRESHOLD = Decimal('50')
+    QUOTE_TTL = int(os.environ.get('QUOTE_TTL') or 900)
+    
+    # Cart inventory holds: units added to a cart are set aside for
+    # CART_HOLD_TTL seconds, and a background sweeper releases expired
+    # holds in batches
+    CART_HOLDS_ENABLED = (os.environ.get('CART_HOLDS_ENABLED') or 'false').lower() == 'true'
+    CART_HOLD_TTL = int(os.environ.get('CART_HOLD_TTL') or 900)
+    # On with holds; keep it on for one TTL after turning holds off
+    CART_HOLD_SWEEPER = (os.environ.get('CART_HOLD_SWEEPER') or str(CART_HOLDS_ENABLED)).lower() == 'true'
+    CART_HOLD_SWEEP_INTERVAL = 30
+    CART_HOLD_SWEEP_BATCH = 500
 
 class DevelopmentConfig(Config):
     DEBUG = True
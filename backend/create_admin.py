@@ -1,5 +1,6 @@
 from app import create_app, db
 from app.models.user import User, UserRole
+from app.services.stats_service import record
 
 app = create_app()
 app.app_context().push()
@@ -12,4 +13,5 @@ admin = User(
 )
 admin.set_password('Admin@$@123')
 db.session.add(admin)
+record(users=1)
 db.session.commit()
@@ -0,0 +1,25 @@
+"""add users token version
+
+Revision ID: 0b7d4e9a2c81
+Revises: f58c0d3a7e26
+Create Date: 2026-10-17 19:04:12.318640
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0b7d4e9a2c81'
+down_revision = 'f58c0d3a7e26'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # A constant default doesn't rewrite the table on Postgres 11+
+    op.add_column('users', sa.Column('token_version', sa.Integer(), nullable=False, server_default='1'))
+
+
+def downgrade():
+    op.drop_column('users', 'token_version')
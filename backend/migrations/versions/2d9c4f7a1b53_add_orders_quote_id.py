@@ -0,0 +1,26 @@
+"""add orders quote id
+
+Revision ID: 2d9c4f7a1b53
+Revises: 7b3e5d0c1f68
+Create Date: 2026-10-18 11:02:51.337104
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2d9c4f7a1b53'
+down_revision = '7b3e5d0c1f68'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('orders', sa.Column('quote_id', sa.String(length=32), nullable=True))
+    op.create_unique_constraint('unique_order_quote', 'orders', ['quote_id'])
+
+
+def downgrade():
+    op.drop_constraint('unique_order_quote', 'orders', type_='unique')
+    op.drop_column('orders', 'quote_id')
@@ -0,0 +1,47 @@
+"""add full-text search vectors to products and vendors
+
+Revision ID: 3f2a91c4d7e1
+Revises: 1a0c5e7d9b24
+Create Date: 2026-10-17 09:12:44.218305
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = '3f2a91c4d7e1'
+down_revision = '1a0c5e7d9b24'
+branch_labels = None
+depends_on = None
+
+SEARCH_VECTOR_EXPRESSION = (
+    "setweight(to_tsvector('english', coalesce(name, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(description, '')), 'B')"
+)
+
+
+def upgrade():
+    with op.batch_alter_table('products', schema=None) as batch_op:
+        batch_op.add_column(sa.Column(
+            'search_vector', postgresql.TSVECTOR(),
+            sa.Computed(SEARCH_VECTOR_EXPRESSION, persisted=True), nullable=True
+        ))
+        batch_op.create_index('ix_products_search_vector', ['search_vector'], unique=False, postgresql_using='gin')
+
+    with op.batch_alter_table('vendors', schema=None) as batch_op:
+        batch_op.add_column(sa.Column(
+            'search_vector', postgresql.TSVECTOR(),
+            sa.Computed(SEARCH_VECTOR_EXPRESSION, persisted=True), nullable=True
+        ))
+        batch_op.create_index('ix_vendors_search_vector', ['search_vector'], unique=False, postgresql_using='gin')
+
+
+def downgrade():
+    with op.batch_alter_table('vendors', schema=None) as batch_op:
+        batch_op.drop_index('ix_vendors_search_vector', postgresql_using='gin')
+        batch_op.drop_column('search_vector')
+
+    with op.batch_alter_table('products', schema=None) as batch_op:
+        batch_op.drop_index('ix_products_search_vector', postgresql_using='gin')
+        batch_op.drop_column('search_vector')
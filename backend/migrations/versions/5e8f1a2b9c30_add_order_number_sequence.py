@@ -0,0 +1,25 @@
+"""add order number sequence
+
+Revision ID: 5e8f1a2b9c30
+Revises: a7c3d9e15b42
+Create Date: 2026-10-17 15:08:44.270391
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5e8f1a2b9c30'
+down_revision = 'a7c3d9e15b42'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Must match ORDER_NUMBER_BLOCK_SIZE in app/models/order.py
+    op.execute(sa.schema.CreateSequence(sa.Sequence('order_number_seq', increment=50)))
+
+
+def downgrade():
+    op.execute(sa.schema.DropSequence(sa.Sequence('order_number_seq')))
@@ -0,0 +1,24 @@
+"""add idempotency key resource
+
+Revision ID: 7b3e5d0c1f68
+Revises: c4a8e61f0d95
+Create Date: 2026-10-18 10:14:37.902615
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7b3e5d0c1f68'
+down_revision = 'c4a8e61f0d95'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('idempotency_keys', sa.Column('resource_id', sa.Integer(), nullable=True))
+
+
+def downgrade():
+    op.drop_column('idempotency_keys', 'resource_id')
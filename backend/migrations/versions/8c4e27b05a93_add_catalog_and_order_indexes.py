@@ -0,0 +1,55 @@
+"""add catalog and order indexes
+
+Revision ID: 8c4e27b05a93
+Revises: 3f2a91c4d7e1
+Create Date: 2026-10-17 10:03:18.551907
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8c4e27b05a93'
+down_revision = '3f2a91c4d7e1'
+branch_labels = None
+depends_on = None
+
+ACTIVE_ONLY = sa.text('is_active')
+
+# (name, table, columns, partial index predicate)
+INDEXES = [
+    ('ix_products_active_created', 'products', ['created_at', 'id'], ACTIVE_ONLY),
+    ('ix_products_active_price', 'products', ['price', 'id'], ACTIVE_ONLY),
+    ('ix_products_active_rating', 'products', ['rating', 'id'], ACTIVE_ONLY),
+    ('ix_products_active_name', 'products', ['name', 'id'], ACTIVE_ONLY),
+    ('ix_products_active_category', 'products', ['category_id', 'created_at', 'id'], ACTIVE_ONLY),
+    ('ix_products_active_featured', 'products', ['created_at', 'id'], sa.text('is_active AND is_featured')),
+    ('ix_products_vendor_created', 'products', ['vendor_id', 'created_at', 'id'], None),
+    ('ix_products_created', 'products', ['created_at', 'id'], None),
+    ('ix_vendors_user_id', 'vendors', ['user_id'], None),
+    ('ix_vendors_status_created', 'vendors', ['status', 'created_at', 'id'], None),
+    ('ix_orders_user_created', 'orders', ['user_id', 'created_at', 'id'], None),
+    ('ix_orders_status_created', 'orders', ['status', 'created_at', 'id'], None),
+    ('ix_orders_created', 'orders', ['created_at', 'id'], None),
+    ('ix_order_items_order_id', 'order_items', ['order_id'], None),
+    ('ix_order_items_product_id', 'order_items', ['product_id'], None),
+    ('ix_users_created', 'users', ['created_at', 'id'], None),
+    ('ix_users_role_created', 'users', ['role', 'created_at', 'id'], None),
+]
+
+
+def upgrade():
+    # Build concurrently so the live tables stay writable during the deploy
+    with op.get_context().autocommit_block():
+        for name, table, columns, where in INDEXES:
+            op.create_index(
+                name, table, columns, unique=False,
+                postgresql_where=where, postgresql_concurrently=True, if_not_exists=True
+            )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, table, columns, where in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
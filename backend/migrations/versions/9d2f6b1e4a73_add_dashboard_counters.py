@@ -0,0 +1,35 @@
+"""add dashboard counters
+
+Revision ID: 9d2f6b1e4a73
+Revises: 0b7d4e9a2c81
+Create Date: 2026-10-17 20:21:37.552904
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9d2f6b1e4a73'
+down_revision = '0b7d4e9a2c81'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    counters = op.create_table(
+        'dashboard_counters',
+        sa.Column('name', sa.String(length=40), nullable=False),
+        sa.Column('shard', sa.SmallInteger(), nullable=False),
+        sa.Column('value', sa.Numeric(precision=14, scale=2), nullable=False),
+        sa.PrimaryKeyConstraint('name', 'shard')
+    )
+
+    # Seed shard 0 from the tables with the aggregation the app reconciles with
+    from app.services.stats_service import COUNTERS, live_totals
+    totals = op.get_bind().execute(sa.select(live_totals())).mappings().one()
+    op.bulk_insert(counters, [{'name': name, 'shard': 0, 'value': totals[name]} for name in COUNTERS])
+
+
+def downgrade():
+    op.drop_table('dashboard_counters')
@@ -0,0 +1,69 @@
+"""add products.is_listable
+
+Revision ID: a7c3d9e15b42
+Revises: d41b6e0f27c8
+Create Date: 2026-10-17 14:25:37.904412
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a7c3d9e15b42'
+down_revision = 'd41b6e0f27c8'
+branch_labels = None
+depends_on = None
+
+# Storefront sort indexes move from is_active to is_listable:
+# (old name, new name, columns, extra predicate)
+STOREFRONT_INDEXES = [
+    ('ix_products_active_created', 'ix_products_listable_created', ['created_at', 'id'], None),
+    ('ix_products_active_price', 'ix_products_listable_price', ['price', 'id'], None),
+    ('ix_products_active_rating', 'ix_products_listable_rating', ['rating', 'id'], None),
+    ('ix_products_active_name', 'ix_products_listable_name', ['name', 'id'], None),
+    ('ix_products_active_featured', 'ix_products_listable_featured', ['created_at', 'id'], 'is_featured'),
+]
+
+
+def _predicate(flag, extra):
+    return sa.text(f'{flag} AND {extra}' if extra else flag)
+
+
+def upgrade():
+    op.add_column('products', sa.Column('is_listable', sa.Boolean(), nullable=False, server_default=sa.false()))
+    op.execute("""
+        UPDATE products AS p
+        SET is_listable = true
+        FROM vendors AS v
+        WHERE v.id = p.vendor_id AND p.is_active AND v.status = 'APPROVED'
+    """)
+
+    with op.get_context().autocommit_block():
+        for old_name, new_name, columns, extra in STOREFRONT_INDEXES:
+            op.create_index(
+                new_name, 'products', columns, unique=False,
+                postgresql_where=_predicate('is_listable', extra),
+                postgresql_concurrently=True, if_not_exists=True
+            )
+        op.create_index(
+            'ix_products_listable_category', 'products', ['category_id', 'created_at', 'id'], unique=False,
+            postgresql_where=sa.text('is_listable'), postgresql_concurrently=True, if_not_exists=True
+        )
+        for old_name, new_name, columns, extra in STOREFRONT_INDEXES:
+            op.drop_index(old_name, table_name='products', postgresql_concurrently=True, if_exists=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for old_name, new_name, columns, extra in STOREFRONT_INDEXES:
+            op.create_index(
+                old_name, 'products', columns, unique=False,
+                postgresql_where=_predicate('is_active', extra),
+                postgresql_concurrently=True, if_not_exists=True
+            )
+        op.drop_index('ix_products_listable_category', table_name='products', postgresql_concurrently=True, if_exists=True)
+        for old_name, new_name, columns, extra in STOREFRONT_INDEXES:
+            op.drop_index(new_name, table_name='products', postgresql_concurrently=True, if_exists=True)
+
+    op.drop_column('products', 'is_listable')
@@ -0,0 +1,52 @@
+"""add product snapshot to order items
+
+Revision ID: b92d5f3e6a17
+Revises: 5e8f1a2b9c30
+Create Date: 2026-10-17 15:51:20.663187
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b92d5f3e6a17'
+down_revision = '5e8f1a2b9c30'
+branch_labels = None
+depends_on = None
+
+SNAPSHOT_COLUMNS = [
+    sa.Column('product_name', sa.String(length=200), nullable=True),
+    sa.Column('product_image', sa.Text(), nullable=True),
+    sa.Column('vendor_id', sa.Integer(), nullable=True),
+    sa.Column('vendor_name', sa.String(length=255), nullable=True),
+    sa.Column('category_id', sa.Integer(), nullable=True),
+    sa.Column('category_name', sa.String(length=50), nullable=True),
+]
+
+
+def upgrade():
+    for column in SNAPSHOT_COLUMNS:
+        op.add_column('order_items', column.copy())
+
+    # Existing lines get the product as it is today, the best record left.
+    # The first image URL is read from the JSON array text without a cast,
+    # so a malformed images value can't abort the migration.
+    op.execute(r"""
+        UPDATE order_items AS oi
+        SET product_name = p.name,
+            product_image = substring(p.images from '^\s*\[\s*"([^"]*)"'),
+            vendor_id = p.vendor_id,
+            vendor_name = v.name,
+            category_id = p.category_id,
+            category_name = c.name
+        FROM products AS p
+        LEFT JOIN vendors AS v ON v.id = p.vendor_id
+        LEFT JOIN categories AS c ON c.id = p.category_id
+        WHERE p.id = oi.product_id
+    """)
+
+
+def downgrade():
+    for column in reversed(SNAPSHOT_COLUMNS):
+        op.drop_column('order_items', column.name)
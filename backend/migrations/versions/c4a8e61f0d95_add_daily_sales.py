@@ -0,0 +1,50 @@
+"""add daily sales rollup
+
+Revision ID: c4a8e61f0d95
+Revises: 9d2f6b1e4a73
+Create Date: 2026-10-17 21:42:08.316554
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4a8e61f0d95'
+down_revision = '9d2f6b1e4a73'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'daily_sales',
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('vendor_id', sa.Integer(), nullable=False),
+        sa.Column('category_id', sa.Integer(), nullable=False),
+        sa.Column('orders', sa.Integer(), nullable=False),
+        sa.Column('units', sa.Integer(), nullable=False),
+        sa.Column('revenue', sa.Numeric(precision=14, scale=2), nullable=False),
+        sa.PrimaryKeyConstraint('day', 'vendor_id', 'category_id')
+    )
+    op.create_index('ix_daily_sales_vendor_day', 'daily_sales', ['vendor_id', 'day'], unique=False)
+
+    # Backfill the whole history in one pass, as
+    # analytics_service.rebuild_daily_sales() does
+    op.execute("""
+        INSERT INTO daily_sales (day, vendor_id, category_id, orders, units, revenue)
+        SELECT date(o.created_at),
+               coalesce(oi.vendor_id, p.vendor_id),
+               coalesce(oi.category_id, p.category_id),
+               count(DISTINCT o.id), sum(oi.quantity), sum(oi.total_price)
+        FROM order_items AS oi
+        JOIN orders AS o ON o.id = oi.order_id
+        JOIN products AS p ON p.id = oi.product_id
+        WHERE o.status IN ('SHIPPED', 'DELIVERED')
+        GROUP BY 1, 2, 3
+    """)
+
+
+def downgrade():
+    op.drop_index('ix_daily_sales_vendor_day', table_name='daily_sales')
+    op.drop_table('daily_sales')
@@ -0,0 +1,29 @@
+"""add products updated_at index
+
+Revision ID: d41b6e0f27c8
+Revises: 8c4e27b05a93
+Create Date: 2026-10-17 13:42:05.118230
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd41b6e0f27c8'
+down_revision = '8c4e27b05a93'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_products_updated', 'products', ['updated_at'], unique=False,
+            postgresql_concurrently=True, if_not_exists=True
+        )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_products_updated', table_name='products', postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,57 @@
+"""add vendor sub-orders
+
+Revision ID: e3a7b2c9f140
+Revises: c6e1f8a4d259
+Create Date: 2026-10-17 17:04:51.226930
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'e3a7b2c9f140'
+down_revision = 'c6e1f8a4d259'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'vendor_orders',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('order_id', sa.Integer(), nullable=False),
+        sa.Column('vendor_id', sa.Integer(), nullable=False),
+        sa.Column('status', postgresql.ENUM(name='orderstatus', create_type=False), nullable=False),
+        sa.Column('subtotal', sa.Numeric(precision=10, scale=2), nullable=False),
+        sa.Column('item_count', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['order_id'], ['orders.id'], ),
+        sa.ForeignKeyConstraint(['vendor_id'], ['vendors.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('order_id', 'vendor_id', name='unique_order_vendor')
+    )
+
+    # Split existing orders from their items' vendor snapshots, falling
+    # back to the product's vendor for lines written before the snapshot
+    op.execute("""
+        INSERT INTO vendor_orders (order_id, vendor_id, status, subtotal, item_count, created_at, updated_at)
+        SELECT o.id, v.id, o.status, sum(oi.total_price), sum(oi.quantity), o.created_at, o.updated_at
+        FROM order_items AS oi
+        JOIN orders AS o ON o.id = oi.order_id
+        JOIN products AS p ON p.id = oi.product_id
+        JOIN vendors AS v ON v.id = coalesce(oi.vendor_id, p.vendor_id)
+        GROUP BY o.id, v.id
+    """)
+
+    # Built after the backfill rather than maintained through it
+    op.create_index('ix_vendor_orders_vendor_created', 'vendor_orders', ['vendor_id', 'created_at', 'id'], unique=False)
+    op.create_index('ix_vendor_orders_vendor_status_created', 'vendor_orders', ['vendor_id', 'status', 'created_at', 'id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_vendor_orders_vendor_status_created', table_name='vendor_orders')
+    op.drop_index('ix_vendor_orders_vendor_created', table_name='vendor_orders')
+    op.drop_table('vendor_orders')
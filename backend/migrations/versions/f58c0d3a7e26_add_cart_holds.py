@@ -0,0 +1,41 @@
+"""add cart holds
+
+Revision ID: f58c0d3a7e26
+Revises: e3a7b2c9f140
+Create Date: 2026-10-17 18:12:40.905317
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f58c0d3a7e26'
+down_revision = 'e3a7b2c9f140'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # A constant default doesn't rewrite the table on Postgres 11+
+    op.add_column('products', sa.Column('reserved', sa.Integer(), nullable=False, server_default='0'))
+
+    op.create_table(
+        'cart_holds',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('product_id', sa.Integer(), nullable=False),
+        sa.Column('quantity', sa.Integer(), nullable=False),
+        sa.Column('expires_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['product_id'], ['products.id'], ),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('user_id', 'product_id', name='unique_user_product_hold')
+    )
+    op.create_index('ix_cart_holds_expires', 'cart_holds', ['expires_at'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_cart_holds_expires', table_name='cart_holds')
+    op.drop_table('cart_holds')
+    op.drop_column('products', 'reserved')
@@ -1,17 +1,20 @@
+from flask_migrate import upgrade
 from app import create_app, db
 from app.models.user import User, UserRole
 from app.models.vendor import Vendor, VendorStatus
 from app.models.category import Category
 from app.models.product import Product
+from app.services.stats_service import reconcile
 import json
+import os
 
 def seed_database():
     """Seed the database with initial data"""
     app = create_app()
     
     with app.app_context():
-        # Create tables
-        db.create_all()
+        # Create or update the schema
+        upgrade(directory=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations'))
         
         # Create admin user
         admin = User(
@@ -186,9 +189,12 @@ def seed_database():
                     is_featured=product_data['is_featured']
                 )
                 product.image_list = product_data['images']
+                product.refresh_listable(vendor)
                 db.session.add(product)
         
         db.session.commit()
+        # Count the seeded rows into the dashboard counters
+        reconcile()
         print("Database seeded successfully!")
 
 if __name__ == '__main__':
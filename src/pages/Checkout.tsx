@@ -108,7 +108,8 @@ export const Checkout: React.FC = () => {
       })),
       payment_method: backendPaymentMethod, // Use the mapped value
       payment_reference: referenceNumber,
-      total_amount: total,
+      // No total_amount: the backend computes it (shipping included) and
+      // refuses a total that doesn't match
       status: 'pending_payment',
       notes: `Payment reference: ${referenceNumber}`,
       shipping_address: {
@@ -129,7 +130,8 @@ export const Checkout: React.FC = () => {
     const response = await ordersAPI.createOrder(orderData);
     console.log('✅ Order created:', response);
 
-    setPaymentDetails(paymentDetails);
+    // Ask for the amount the order was placed at
+    setPaymentDetails({ ...paymentDetails, amount: response?.order?.total_amount ?? total });
     setOrderCreated(true);
     clearCart();
 